@@ -2,7 +2,7 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 from io import BytesIO
-from tjt_hosp_api import filtered_df_without_seats
+import tjt_data
 
 
 def run_app():
@@ -32,7 +32,7 @@ def run_app():
     Please note that sales from 'Platinum' package (Seasonal) have been excluded for finance as this is MBM only.
     """)
 
-    loaded_api_df = filtered_df_without_seats
+    loaded_api_df = tjt_data.get_sales()
 
     if loaded_api_df is not None:
         st.sidebar.success("✅ Data retrieved successfully.")
@@ -56,9 +56,9 @@ def run_app():
         for column in numeric_columns:
             filtered_data[column] = pd.to_numeric(filtered_data[column], errors='coerce')
 
-        # Convert 'CreatedOn' column to datetime format for both filtered_data and loaded_api_df
+        # Convert 'CreatedOn' column to datetime format (loaded_api_df is the shared
+        # snapshot frame, read-only here; its CreatedOn is already datetime)
         filtered_data['CreatedOn'] = pd.to_datetime(filtered_data['CreatedOn'], errors='coerce')
-        loaded_api_df['CreatedOn'] = pd.to_datetime(loaded_api_df['CreatedOn'], errors='coerce')
 
         # Filtered data based on excluding 'Platinum' package
         filtered_data = filtered_data[filtered_data['Package Name'] != 'Platinum']
@@ -145,25 +145,25 @@ def run_app():
             st.write(f"Accumulated sales with 'Other' payments included: **£{other_sales_total:,.2f}**")
 
             # Apply discount filter to total_discount_value table
-            total_discount_value = filtered_data.groupby(['Order Id', 'Country Code', 'First Name', 'Surname', 'Fixture Name', 'GLCode', 'CreatedOn'])[['Discount', 'DiscountValue', 'TotalPrice']].sum().reset_index()
+            total_discount_value = filtered_data.groupby(['Order Id', 'Country Code', 'First Name', 'Surname', 'Fixture Name', 'GLCode', 'CreatedOn'], observed=True)[['Discount', 'DiscountValue', 'TotalPrice']].sum().reset_index()
             total_discount_value['TotalPrice'] = total_discount_value['TotalPrice'].apply(lambda x: f"£{x:,.2f}")
             total_discount_value['DiscountValue'] = total_discount_value['DiscountValue'].apply(lambda x: f"£{x:,.2f}")
             st.dataframe(total_discount_value)
 
             st.write("### ⚽ Total Sales Per Fixture")
-            total_sold_per_match = filtered_data.groupby('Fixture Name')['TotalPrice'].sum().reset_index()
+            total_sold_per_match = filtered_data.groupby('Fixture Name', observed=True)['TotalPrice'].sum().reset_index()
             st.write(f"Total Match Fixture: **£{total_sold_per_match['TotalPrice'].sum():,.2f}**")
             total_sold_per_match['TotalPrice'] = total_sold_per_match['TotalPrice'].apply(lambda x: f"£{x:,.2f}")
             st.dataframe(total_sold_per_match)
 
             st.write("### 🎟️ Total Sales Per Package")
-            total_sold_per_package = filtered_data.groupby('Package Name')['TotalPrice'].sum().reset_index()
+            total_sold_per_package = filtered_data.groupby('Package Name', observed=True)['TotalPrice'].sum().reset_index()
             st.write(f"Total Package Sales (Excluding 'Platinum'): **£{total_sold_per_package['TotalPrice'].sum():,.2f}**")
             total_sold_per_package['TotalPrice'] = total_sold_per_package['TotalPrice'].apply(lambda x: f"£{x:,.2f}")
             st.dataframe(total_sold_per_package)
 
             st.write("### 🏟️ Total Sales Per Location")
-            total_sold_per_location = filtered_data.groupby('SaleLocation')['TotalPrice'].sum().reset_index()
+            total_sold_per_location = filtered_data.groupby('SaleLocation', observed=True)['TotalPrice'].sum().reset_index()
             st.write(f"Total Location Sales: **£{total_sold_per_location['TotalPrice'].sum():,.2f}**")
             total_sold_per_location['TotalPrice'] = total_sold_per_location['TotalPrice'].apply(lambda x: f"£{x:,.2f}")
             st.dataframe(total_sold_per_location)
@@ -1,10 +1,10 @@
 import time
 import os
 import base64
-import importlib
 import pandas as pd
 import numpy as np
 import streamlit as st
+import tjt_data
 from datetime import datetime, timedelta
 from datetime import datetime
 from streamlit_autorefresh import st_autorefresh
@@ -15,19 +15,19 @@ from streamlit_autorefresh import st_autorefresh
 
 def load_live_data():
     """
-    Dynamically reloads tjt_hosp_api and accesses filtered_df_without_seats.
-    Returns a DataFrame of live hospitality sales data.
+    Returns the latest published hospitality sales snapshot at once (see
+    tjt_data); a stale one is refreshed in the background for the next
+    autorefresh. Returns a DataFrame of live hospitality sales data.
     """
     try:
-        tjt_hosp_api = importlib.reload(importlib.import_module("tjt_hosp_api"))
-        filtered_df_without_seats = getattr(tjt_hosp_api, "filtered_df_without_seats", None)
+        filtered_df_without_seats = tjt_data.get_sales()
 
-        if filtered_df_without_seats is None:
-            raise ImportError("filtered_df_without_seats is not available in tjt_hosp_api.")
+        if filtered_df_without_seats.empty:
+            raise ValueError("No sales snapshot has been published yet (is tjt_refresher.py running?).")
         return filtered_df_without_seats
 
-    except ImportError as e:
-        st.error(f"Error reloading tjt_hosp_api: {e}")
+    except Exception as e:
+        st.error(f"Error loading sales snapshot: {e}")
         return pd.DataFrame(columns=[
             "CreatedBy", "Price", "CreatedOn", "SaleLocation",
             "KickOffEventStart", "Fixture Name", "Package Name",
@@ -36,18 +36,16 @@ def load_live_data():
 
 def load_inventory_data():
     """
-    Dynamically reloads tjt_inventory.py and runs get_inventory_data()
-    to retrieve merged (events + stock) data. Returns a DataFrame.
+    Returns the latest published merged (events + stock) inventory table at
+    once, refreshing a stale one in the background. Returns a DataFrame.
     """
     try:
-        tjt_inventory = importlib.reload(importlib.import_module("tjt_inventory"))
-        if hasattr(tjt_inventory, "get_inventory_data"):
-            return tjt_inventory.get_inventory_data()
-        else:
-            st.warning("No function 'get_inventory_data()' found in tjt_inventory.py")
-            return pd.DataFrame()
-    except ImportError as e:
-        st.error(f"Error reloading tjt_inventory: {e}")
+        df_inventory = tjt_data.get_inventory()
+        if df_inventory.empty:
+            st.warning("No inventory has been published yet (is tjt_refresher.py running?).")
+        return df_inventory
+    except Exception as e:
+        st.error(f"Error loading inventory table: {e}")
         return pd.DataFrame()
 
 # ------------------------------------------------------------------------------
@@ -144,7 +142,7 @@ def calculate_monthly_progress(data, start_date, end_date, targets_data):
         (data["CreatedOn"] >= today_start) & (data["CreatedOn"] < today_end)
     ]
     today_sales = (
-        today_sales_data.groupby("CreatedBy")["Price"]
+        today_sales_data.groupby("CreatedBy", observed=True)["Price"]
         .sum()
         .reindex(targets_data.columns, fill_value=0)
     )
@@ -157,14 +155,14 @@ def calculate_monthly_progress(data, start_date, end_date, targets_data):
         (data["CreatedOn"] >= start_of_week) & (data["CreatedOn"] < today_end)
     ]
     weekly_sales = (
-        weekly_sales_data.groupby("CreatedBy")["Price"]
+        weekly_sales_data.groupby("CreatedBy", observed=True)["Price"]
         .sum()
         .reindex(targets_data.columns, fill_value=0)
     )
 
     # ✅ Calculate total progress per executive
     progress = (
-        filtered_data.groupby("CreatedBy")["Price"]
+        filtered_data.groupby("CreatedBy", observed=True)["Price"]
         .sum()
         .reindex(targets_data.columns, fill_value=0)
     )
@@ -395,8 +393,8 @@ def generate_scrolling_messages(data, budget_df, df_inventory):
     # ✅ **Top Fixture of the Day**
     today_sales = data[data["CreatedOn"].dt.floor('D') == pd.to_datetime(datetime.now().date())]
     if not today_sales.empty:
-        top_fixture = today_sales.groupby("Fixture Name")["Price"].sum().idxmax()
-        top_fixture_revenue = today_sales.groupby("Fixture Name")["Price"].sum().max()
+        top_fixture = today_sales.groupby("Fixture Name", observed=True)["Price"].sum().idxmax()
+        top_fixture_revenue = today_sales.groupby("Fixture Name", observed=True)["Price"].sum().max()
         top_fixture_message = f"📈 Top Selling Fixture Today: {top_fixture} with £{top_fixture_revenue:,.2f} generated."
     else:
         top_fixture_message = "📉 No sales recorded today."
@@ -424,8 +422,8 @@ def generate_scrolling_messages(data, budget_df, df_inventory):
 
     if not exec_sales_today.empty:
         # Get the top-selling executive (username)
-        top_executive_username = exec_sales_today.groupby("CreatedBy")["Price"].sum().idxmax()
-        top_executive_revenue = exec_sales_today.groupby("CreatedBy")["Price"].sum().max()
+        top_executive_username = exec_sales_today.groupby("CreatedBy", observed=True)["Price"].sum().idxmax()
+        top_executive_revenue = exec_sales_today.groupby("CreatedBy", observed=True)["Price"].sum().max()
 
         # Convert username to full name using mapping
         top_executive_name = user_mapping.get(top_executive_username, top_executive_username)
@@ -631,7 +629,7 @@ def display_inventory_details(fixture_row, merged_inventory, full_sales_data):
     else:
         sales_agg = (
             df_sales_for_fixture
-            .groupby(["Package Name", "EventCompetition"])["Seats"]
+            .groupby(["Package Name", "EventCompetition"], observed=True)["Seats"]
             .sum()
             .reset_index()
             .rename(columns={"Seats": "Seats Sold"})
@@ -727,7 +725,7 @@ def calculate_monthly_performance(data, targets_data, valid_sales_executives):
     # sum up revenue
     rev = (
         df
-        .groupby(["Month","Year","CreatedBy"])["Price"]
+        .groupby(["Month","Year","CreatedBy"], observed=True)["Price"]
         .sum()
         .reset_index()
     )
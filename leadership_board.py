@@ -1,8 +1,10 @@
 import time
 import os
 import base64
-import importlib
 import pandas as pd
+import tjt_data
+import tjt_query
+import tjt_store
 import numpy as np
 import streamlit as st
 from datetime import datetime, timedelta
@@ -15,19 +17,26 @@ from streamlit_autorefresh import st_autorefresh
 
 def load_live_data():
     """
-    Dynamically reloads tjt_hosp_api and accesses filtered_df_without_seats.
+    Reads the latest hospitality sales snapshot published by tjt_refresher.py
+    without waiting on TJT (a stale one is refreshed in the background, see
+    tjt_data), skipping season partitions with no sales since the current
+    season began, and warns if some events are served from their last good
+    refresh.
     Returns a DataFrame of live hospitality sales data.
     """
     try:
-        tjt_hosp_api = importlib.reload(importlib.import_module("tjt_hosp_api"))
-        filtered_df_without_seats = getattr(tjt_hosp_api, "filtered_df_without_seats", None)
-
-        if filtered_df_without_seats is None:
-            raise ImportError("filtered_df_without_seats is not available in tjt_hosp_api.")
+        season_start, _ = tjt_store.season_bounds(tjt_store.current_season())
+        filtered_df_without_seats = tjt_data.get_sales(created_from=season_start)
+
+        if filtered_df_without_seats.empty:
+            raise ValueError("No sales snapshot has been published yet (is tjt_refresher.py running?).")
+        stale_warning = tjt_store.stale_warning()
+        if stale_warning:
+            st.warning(stale_warning)
         return filtered_df_without_seats
 
-    except ImportError as e:
-        st.error(f"Error reloading tjt_hosp_api: {e}")
+    except Exception as e:
+        st.error(f"Error loading sales snapshot: {e}")
         return pd.DataFrame(columns=[
             "CreatedBy", "Price", "CreatedOn", "SaleLocation",
             "KickOffEventStart", "Fixture Name", "Package Name",
@@ -36,18 +45,17 @@ def load_live_data():
 
 def load_inventory_data():
     """
-    Dynamically reloads tjt_inventory.py and runs get_inventory_data()
-    to retrieve merged (events + stock) data. Returns a DataFrame.
+    Reads the merged (events + stock) inventory table published by
+    tjt_refresher.py, refreshing a stale one in the background. Returns a
+    DataFrame.
     """
     try:
-        tjt_inventory = importlib.reload(importlib.import_module("tjt_inventory"))
-        if hasattr(tjt_inventory, "get_inventory_data"):
-            return tjt_inventory.get_inventory_data()
-        else:
-            st.warning("No function 'get_inventory_data()' found in tjt_inventory.py")
-            return pd.DataFrame()
-    except ImportError as e:
-        st.error(f"Error reloading tjt_inventory: {e}")
+        df_inventory = tjt_data.get_inventory()
+        if df_inventory.empty:
+            st.warning("No inventory has been published yet (is tjt_refresher.py running?).")
+        return df_inventory
+    except Exception as e:
+        st.error(f"Error loading inventory table: {e}")
         return pd.DataFrame()
 
 # ------------------------------------------------------------------------------
@@ -106,6 +114,22 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
+def exec_sales_totals(data, execs, start, end):
+    """
+    Sums Price per exec over CreatedOn in [start, end). The sum is pushed
+    down to the snapshot's SQLite sales table (see tjt_query); without one,
+    it is taken from the data frame. Returns a Series indexed by execs.
+    """
+    if start >= end:
+        return pd.Series(0.0, index=execs)
+    try:
+        totals = tjt_query.sales_totals(["CreatedBy"], ["Price"], filters={"CreatedBy": list(execs)}, start=start, end=end)
+        sales = totals.set_index("CreatedBy")["Price"]
+    except tjt_query.QueryError:
+        in_range = data[(data["CreatedOn"] >= start) & (data["CreatedOn"] < end) & data["CreatedBy"].isin(list(execs))]
+        sales = in_range.groupby("CreatedBy", observed=True)["Price"].sum()
+    return sales.reindex(execs, fill_value=0)
+
 def calculate_monthly_progress(data, start_date, end_date, targets_data):
     """
     Calculates the monthly progress for specified executives within a date range.
@@ -138,35 +162,20 @@ def calculate_monthly_progress(data, start_date, end_date, targets_data):
     today_start = pd.to_datetime(datetime.now().date())  # Midnight today
     today_end = today_start + pd.Timedelta(days=1)  # Midnight next day
 
+    # ✅ Sums per exec are taken within the selected range (end_date is the last second of its day)
+    range_end = end_date + pd.Timedelta(seconds=1)
+
     # ✅ Ensure today's sales are correctly filtered
-    today_sales_data = data[
-        (data["CreatedOn"] >= today_start) & (data["CreatedOn"] < today_end)
-    ]
-    today_sales = (
-        today_sales_data.groupby("CreatedBy")["Price"]
-        .sum()
-        .reindex(targets_data.columns, fill_value=0)
-    )
+    today_sales = exec_sales_totals(data, targets_data.columns, max(today_start, start_date), min(today_end, range_end))
 
     # ✅ Calculate start of the current week (Monday)
     start_of_week = today_start - pd.Timedelta(days=today_start.weekday())
 
     # ✅ Ensure weekly sales include today
-    weekly_sales_data = data[
-        (data["CreatedOn"] >= start_of_week) & (data["CreatedOn"] < today_end)
-    ]
-    weekly_sales = (
-        weekly_sales_data.groupby("CreatedBy")["Price"]
-        .sum()
-        .reindex(targets_data.columns, fill_value=0)
-    )
+    weekly_sales = exec_sales_totals(data, targets_data.columns, max(start_of_week, start_date), min(today_end, range_end))
 
     # ✅ Calculate total progress per executive
-    progress = (
-        filtered_data.groupby("CreatedBy")["Price"]
-        .sum()
-        .reindex(targets_data.columns, fill_value=0)
-    )
+    progress = exec_sales_totals(data, targets_data.columns, start_date, range_end)
 
     # ✅ Retrieve correct monthly targets
     monthly_targets = targets_data.loc[(current_month, current_year)]
@@ -393,8 +402,8 @@ def generate_scrolling_messages(data, budget_df, df_inventory):
     # ✅ **Top Fixture of the Day**
     today_sales = data[data["CreatedOn"].dt.floor('D') == pd.to_datetime(datetime.now().date())]
     if not today_sales.empty:
-        top_fixture = today_sales.groupby("Fixture Name")["Price"].sum().idxmax()
-        top_fixture_revenue = today_sales.groupby("Fixture Name")["Price"].sum().max()
+        top_fixture = today_sales.groupby("Fixture Name", observed=True)["Price"].sum().idxmax()
+        top_fixture_revenue = today_sales.groupby("Fixture Name", observed=True)["Price"].sum().max()
         top_fixture_message = f"📈 Top Selling Fixture Today: {top_fixture} with £{top_fixture_revenue:,.2f} generated."
     else:
         top_fixture_message = "📉 No sales recorded today."
@@ -421,8 +430,8 @@ def generate_scrolling_messages(data, budget_df, df_inventory):
 
     if not exec_sales_today.empty:
         # Get the top-selling executive (username)
-        top_executive_username = exec_sales_today.groupby("CreatedBy")["Price"].sum().idxmax()
-        top_executive_revenue = exec_sales_today.groupby("CreatedBy")["Price"].sum().max()
+        top_executive_username = exec_sales_today.groupby("CreatedBy", observed=True)["Price"].sum().idxmax()
+        top_executive_revenue = exec_sales_today.groupby("CreatedBy", observed=True)["Price"].sum().max()
 
         # Convert username to full name using mapping
         top_executive_name = user_mapping.get(top_executive_username, top_executive_username)
@@ -628,7 +637,7 @@ def display_inventory_details(fixture_row, merged_inventory, full_sales_data):
     else:
         sales_agg = (
             df_sales_for_fixture
-            .groupby(["Package Name", "EventCompetition"])["Seats"]
+            .groupby(["Package Name", "EventCompetition"], observed=True)["Seats"]
             .sum()
             .reset_index()
             .rename(columns={"Seats": "Seats Sold"})
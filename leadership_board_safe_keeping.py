@@ -3,20 +3,20 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 import os
-import importlib
+import tjt_data
 from streamlit_autorefresh import st_autorefresh
 import base64
 
-# Import live data and reload the module
+# Read the latest published sales snapshot (see tjt_data)
 def load_live_data():
     try:
-        tjt_hosp_api = importlib.reload(importlib.import_module("tjt_hosp_api"))
-        filtered_df_without_seats = getattr(tjt_hosp_api, "filtered_df_without_seats", None)
-        if filtered_df_without_seats is None:
-            raise ImportError("filtered_df_without_seats is not available in tjt_hosp_api.")
-        return filtered_df_without_seats
-    except ImportError as e:
-        st.error(f"Error reloading tjt_hosp_api: {e}")
+        filtered_df_without_seats = tjt_data.get_sales()
+        if filtered_df_without_seats.empty:
+            raise ValueError("No sales snapshot has been published yet (is tjt_refresher.py running?).")
+        # The helpers below convert columns in place; the snapshot frame is shared
+        return filtered_df_without_seats.copy()
+    except Exception as e:
+        st.error(f"Error loading sales snapshot: {e}")
         return pd.DataFrame(columns=["CreatedBy", "Price", "CreatedOn", "SaleLocation", "KickOffEventStart", "Fixture Name", "Package Name", "TotalPrice", "Seats"])
 
 # Load data
@@ -86,7 +86,7 @@ def calculate_monthly_progress(data, start_date, end_date):
     # Today's sales
     end_date_sales_data = data[data["CreatedOn"].dt.date == pd.to_datetime(end_date).date()]
     end_date_sales = (
-        end_date_sales_data.groupby("CreatedBy")["Price"]
+        end_date_sales_data.groupby("CreatedBy", observed=True)["Price"]
         .sum()
         .reindex(targets_data.columns, fill_value=0)
     )
@@ -98,7 +98,7 @@ def calculate_monthly_progress(data, start_date, end_date):
         (data["CreatedOn"] <= pd.to_datetime(end_date))
     ]
     weekly_sales = (
-        weekly_sales_data.groupby("CreatedBy")["Price"]
+        weekly_sales_data.groupby("CreatedBy", observed=True)["Price"]
         .sum()
         .add(end_date_sales, fill_value=0)  # Ensure today's sales are included
         .reindex(targets_data.columns, fill_value=0)
@@ -106,7 +106,7 @@ def calculate_monthly_progress(data, start_date, end_date):
 
     # Progress to monthly target
     progress = (
-        filtered_data.groupby("CreatedBy")["Price"]
+        filtered_data.groupby("CreatedBy", observed=True)["Price"]
         .sum()
         .reindex(targets_data.columns, fill_value=0)
     )
@@ -249,7 +249,7 @@ def get_next_fixture(data, budget_df):
 
     # Aggregate data to find the earliest fixture for each unique `Fixture Name` and `EventCompetition`
     aggregated_data = (
-        future_data.groupby(["Fixture Name", "EventCompetition"], as_index=False)
+        future_data.groupby(["Fixture Name", "EventCompetition"], as_index=False, observed=True)
         .agg({
             "KickOffEventStart": "min",  # Take the earliest kickoff time
             "Price": "sum",             # Sum all prices for revenue
@@ -348,8 +348,8 @@ def generate_scrolling_messages(data, budget_df):
     # Top Fixture of the Day
     today_sales = data[data["CreatedOn"].dt.date == datetime.now().date()]
     if not today_sales.empty:
-        top_fixture = today_sales.groupby("Fixture Name")["Price"].sum().idxmax()
-        top_fixture_revenue = today_sales.groupby("Fixture Name")["Price"].sum().max()
+        top_fixture = today_sales.groupby("Fixture Name", observed=True)["Price"].sum().idxmax()
+        top_fixture_revenue = today_sales.groupby("Fixture Name", observed=True)["Price"].sum().max()
         top_fixture_message = f"📈 Top Selling Fixture Today: {top_fixture} with £{top_fixture_revenue:,.2f} generated."
     else:
         top_fixture_message = "📉 No sales recorded today."
@@ -371,8 +371,8 @@ def generate_scrolling_messages(data, budget_df):
 
     if not exec_sales_today.empty:
         # Calculate the top-selling executive among the specified list
-        top_executive_username = exec_sales_today.groupby("CreatedBy")["Price"].sum().idxmax()
-        top_executive_revenue = exec_sales_today.groupby("CreatedBy")["Price"].sum().max()
+        top_executive_username = exec_sales_today.groupby("CreatedBy", observed=True)["Price"].sum().idxmax()
+        top_executive_revenue = exec_sales_today.groupby("CreatedBy", observed=True)["Price"].sum().max()
 
         # Map username to real name
         top_executive_full_name = user_mapping.get(top_executive_username, top_executive_username)
@@ -85,16 +85,16 @@ if "dashboard_data" not in st.session_state:
 # Function to reload data
 def reload_data():
     import importlib
-    logging.info("🔄 Reloading tjt_hosp_api...")
+    import tjt_data
+    logging.info("🔄 Loading latest sales snapshot...")
     try:
-        # Reload the module dynamically
-        tjt_hosp_api = importlib.import_module('tjt_hosp_api')
-        importlib.reload(tjt_hosp_api)
-
-        # Validate the reloaded data
-        filtered_df_without_seats = getattr(tjt_hosp_api, 'filtered_df_without_seats', None)
+        # Serve what was last published right away; fresh TJT data is fetched in
+        # the background (never in this session) and shows up on a later rerun
+        filtered_df_without_seats = tjt_data.get_sales()
         if filtered_df_without_seats is None or filtered_df_without_seats.empty:
-            raise ValueError("filtered_df_without_seats is None or empty after reload.")
+            raise ValueError("No sales snapshot has been published yet (is tjt_refresher.py running?).")
+        if tjt_data.request_refresh('sales') or tjt_data.refreshing('sales'):
+            st.info("🔄 Fetching the latest sales from TJT in the background.")
 
         # Log successful reload
         logging.info(f"✅ Data reloaded successfully. Rows: {len(filtered_df_without_seats)}")
@@ -109,7 +109,7 @@ def reload_data():
 
     except Exception as e:
         # Handle and log errors gracefully
-        logging.error(f"❌ Failed to reload tjt_hosp_api: {e}")
+        logging.error(f"❌ Failed to load sales snapshot: {e}")
         st.error(f"❌ Failed to reload data: {e}")
 
 
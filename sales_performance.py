@@ -1,10 +1,8 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, time
 from io import BytesIO
-import importlib
 import sys
-import re
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 
@@ -16,15 +14,54 @@ from charts_ import (
     generate_event_level_concert_cumulative_sales_chart
 )
 
-# ─── Dynamically import tjt_hosp_api ────────────────────────────────────────────
-try:
-    tjt_hosp_api = importlib.import_module('tjt_hosp_api')
-    filtered_df_without_seats = getattr(tjt_hosp_api, 'filtered_df_without_seats', None)
-    if filtered_df_without_seats is None:
-        raise ImportError("filtered_df_without_seats is not available in tjt_hosp_api.")
-except ImportError as e:
-    st.error(f"❌ Error importing tjt_hosp_api: {e}")
-    filtered_df_without_seats = None
+import tjt_cube
+import tjt_data
+import tjt_store
+
+# ─── Sales data is read from the snapshot published by tjt_refresher.py ────────
+# (tjt_data serves it at once and refreshes a stale one in the background)
+# Only the fixtures of the season on sale are read: it rolls over on the day
+# the next season's sales open, before the season starts (override with TJT_SEASON)
+
+def load_sales_data(season):
+    try:
+        sales_df = tjt_data.get_sales(seasons=[season])
+        stale_warning = tjt_store.stale_warning()
+        if stale_warning:
+            st.warning(f"⚠️ {stale_warning}")
+        return sales_df
+    except Exception as e:
+        st.error(f"❌ Error loading sales snapshot: {e}")
+        return None
+
+# Encoded full sales report for the snapshot frame last read: (frame, CSV bytes)
+_sales_report = (None, None)
+
+def sales_report_csv(sales_df):
+    """
+    The whole sales frame as CSV bytes, encoded once per snapshot rather than
+    on every rerun.
+    """
+    global _sales_report
+    if _sales_report[0] is not sales_df:
+        _sales_report = (sales_df, sales_df.to_csv(index=False).encode('utf-8'))
+    return _sales_report[1]
+
+def filter_sales_rows(sales_df, filters, min_dt=None, max_dt=None):
+    """
+    Returns the sales rows matching the page's filters (column -> selected
+    values, as passed to tjt_cube.slice_cube) and CreatedOn window: the
+    transactions behind the filtered cube, with Discount and IsPaid as strings
+    (as in the cube).
+    """
+    mask = pd.Series(True, index=sales_df.index)
+    if min_dt and max_dt:
+        mask &= (sales_df['CreatedOn'] >= min_dt) & (sales_df['CreatedOn'] <= max_dt)
+    for col, values in filters.items():
+        column = sales_df[col].astype(str) if col in ('IsPaid', 'Discount') else sales_df[col]
+        mask &= column.isin(values)
+    rows = sales_df[mask]
+    return rows.assign(Discount=rows['Discount'].astype(str), IsPaid=rows['IsPaid'].astype(str))
 
 def load_budget_targets():
     """
@@ -82,8 +119,9 @@ def run_app():
         - Contact [cmunthali@arsenal.co.uk](mailto:cmunthali@arsenal.co.uk) for any issues or inquiries.
         """)
 
-    # Dynamically fetch hospitality data on app start
-    loaded_api_df = filtered_df_without_seats
+    # Latest published hospitality data (re-read only when a new snapshot lands)
+    season = tjt_store.sales_season()
+    loaded_api_df = load_sales_data(season)
     if loaded_api_df is None or loaded_api_df.empty:
         st.warning("⚠️ No data available. Please refresh to load the latest data.")
         return
@@ -98,58 +136,17 @@ def run_app():
         for pct in [10, 30, 50, 100]:
             st.sidebar.progress(pct)
 
-        # Initialize filtered_data
-        filtered_data = loaded_api_df.copy()
-
-        # Ensure types
-        filtered_data['Discount'] = filtered_data['Discount'].astype(str)
-        filtered_data['IsPaid']   = filtered_data['IsPaid'].astype(str)
-        filtered_data['DiscountValue'] = pd.to_numeric(filtered_data['DiscountValue'], errors='coerce')
-        for col in ['TotalPrice', 'DiscountValue']:
-            filtered_data[col] = pd.to_numeric(filtered_data[col], errors='coerce')
-
-        # Convert 'CreatedOn'
-        filtered_data['CreatedOn'] = pd.to_datetime(
-            filtered_data['CreatedOn'], format='%d-%m-%Y %H:%M', errors='coerce'
-        )
-        loaded_api_df['CreatedOn'] = pd.to_datetime(
-            loaded_api_df['CreatedOn'], format='%d-%m-%Y %H:%M', errors='coerce'
-        )
-
-        # ─── STEP 1: parse KickOffEventStart in sales DataFrame to datetime ────────
-        filtered_data['KickOffEventStart'] = pd.to_datetime(
-            filtered_data['KickOffEventStart'],
-            format='%d-%m-%Y %H:%M',
-            errors='coerce'
-        )
-
-        # ─── STEP 1b: create a date-only column to fuse on ─────────────────────────
-        filtered_data['KO_date'] = filtered_data['KickOffEventStart'].dt.floor('D')
-        budget_df   ['KO_date'] = budget_df   ['KickOffEventStart'].dt.floor('D')
-
-        # ─── STEP 2: Merge against budget file on name, competition, and date only ─
-        filtered_data = filtered_data.merge(
-            budget_df,
-            how='left',
-            on=['Fixture Name','EventCompetition','KO_date'],
-            suffixes=('','_bud')
-        )
-
-        # ─── STEP 3: clean up helper column ────────────────────────────────────────
-        filtered_data.drop(columns=['KO_date'], inplace=True)
-
-        # ─── Finally: Add 'Days to Fixture' using the original KickOffEventStart ──
+        # Sales pre-aggregated once per snapshot (see tjt_cube); the metric cards
+        # and tables below are rollups of a slice of it
+        cube = tjt_cube.sales_cube(loaded_api_df, specified_users)
         today = pd.Timestamp.now()
-        filtered_data['Days to Fixture'] = (
-            filtered_data['KickOffEventStart'] - today
-        ).dt.days.fillna(-1).astype(int)
-
 
         # Sidebar filters: Date & Time
         st.sidebar.header("Filter Data by Date and Time")
         date_range  = st.sidebar.date_input("📅 Select Date Range", [])
         start_time  = st.sidebar.time_input("⏰ Start Time", datetime.now().replace(hour=0, minute=0).time())
         end_time    = st.sidebar.time_input("⏰ End Time", datetime.now().replace(hour=23, minute=59).time())
+        end_time    = end_time.replace(second=59, microsecond=999999)  # The end minute is included
 
         if len(date_range) == 1:
             min_dt = datetime.combine(date_range[0], start_time)
@@ -160,47 +157,49 @@ def run_app():
         else:
             min_dt = max_dt = None
 
+        # The cube is per day: a window that cuts days short gets a cube of its own
+        whole_days = min_dt is None or (start_time == time.min and end_time == time.max)
+        if not whole_days:
+            in_window = (loaded_api_df['CreatedOn'] >= min_dt) & (loaded_api_df['CreatedOn'] <= max_dt)
+            cube = tjt_cube.build_cube(loaded_api_df[in_window], specified_users)
+
         # Sidebar filters: Users, Events, Categories, Locations, Paid
-        valid_usernames     = [u for u in specified_users if u in filtered_data['CreatedBy'].unique()]
-        event_names         = filtered_data['Fixture Name'].unique().tolist()
-        competition_vals    = filtered_data['EventCompetition'].unique().tolist()
-        if 'EventCategory' in filtered_data.columns:
-            competition_vals = sorted(set(competition_vals + filtered_data['EventCategory'].unique().tolist()))
+        valid_usernames     = [u for u in specified_users if u in cube['CreatedBy'].unique()]
+        event_names         = cube['Fixture Name'].unique().tolist()
+        competition_vals    = cube['EventCompetition'].unique().tolist()
+        if 'EventCategory' in loaded_api_df.columns:
+            competition_vals = sorted(set(competition_vals + loaded_api_df['EventCategory'].unique().tolist()))
 
         selected_categories    = st.sidebar.multiselect("Select Event Category", options=competition_vals)
         selected_events        = st.sidebar.multiselect("🎫 Select Events",      options=event_names)
-        selected_sale_location = st.sidebar.multiselect("📍 Select SaleLocation",options=filtered_data['SaleLocation'].unique())
+        selected_sale_location = st.sidebar.multiselect("📍 Select SaleLocation",options=cube['SaleLocation'].unique())
         selected_users         = st.sidebar.multiselect("👤 Select Execs",       options=valid_usernames)
-        paid_options           = filtered_data['IsPaid'].unique().tolist()
+        paid_options           = cube['IsPaid'].unique().tolist()
         selected_paid          = st.sidebar.selectbox("💰 Filter by IsPaid", options=paid_options)
 
-        # ─── APPLY the above filters to filtered_data ────────────────────────────────
-        if min_dt and max_dt:
-            filtered_data = filtered_data[(filtered_data['CreatedOn'] >= min_dt) & (filtered_data['CreatedOn'] <= max_dt)]
-        if selected_sale_location:
-            filtered_data = filtered_data[filtered_data['SaleLocation'].isin(selected_sale_location)]
-        if selected_users:
-            filtered_data = filtered_data[filtered_data['CreatedBy'].isin(selected_users)]
-        if selected_categories:
-            filtered_data = filtered_data[filtered_data['EventCompetition'].isin(selected_categories)]
-        if selected_events:
-            filtered_data = filtered_data[filtered_data['Fixture Name'].isin(selected_events)]
-        if selected_paid:
-            filtered_data = filtered_data[filtered_data['IsPaid'] == selected_paid]
+        # ─── APPLY the above filters to the cube ─────────────────────────────────────
+        filters = {
+            'SaleLocation': selected_sale_location,
+            'CreatedBy': selected_users,
+            'EventCompetition': selected_categories,
+            'Fixture Name': selected_events,
+            'IsPaid': [selected_paid] if selected_paid else [],
+        }
+        filters = {col: values for col, values in filters.items() if values}
+        filtered_cube = tjt_cube.slice_cube(cube, filters,
+                                            start=min_dt if whole_days else None,
+                                            end=max_dt if whole_days else None)
 
         # ─── NEW: Kickoff-time filter ───────────────────────────────────────────────
-        kickoff_times     = sorted(filtered_data["KickOffEventStart"].dropna().unique())
-        display_kickoffs  = [ts.strftime("%Y-%m-%d %H:%M") for ts in kickoff_times]
+        kickoff_times     = sorted(filtered_cube["KickOffEventStart"].dropna().unique())
+        display_kickoffs  = [pd.Timestamp(ts).strftime("%Y-%m-%d %H:%M") for ts in kickoff_times]
         selected_kickoffs = st.sidebar.multiselect("⏰ Select Kickoff time", options=display_kickoffs)
         if selected_kickoffs:
-            keep_ts = [kickoff_times[display_kickoffs.index(label)] for label in selected_kickoffs]
-            filtered_data = filtered_data[filtered_data["KickOffEventStart"].isin(keep_ts)]
+            filters['KickOffEventStart'] = [kickoff_times[display_kickoffs.index(label)] for label in selected_kickoffs]
+            filtered_cube = filtered_cube[filtered_cube["KickOffEventStart"].isin(filters['KickOffEventStart'])]
 
         # ─── Continue with Discount filter and exclusions ────────────────────────────
-        if selected_events:
-            available_discounts = filtered_data[filtered_data['Fixture Name'].isin(selected_events)]['Discount'].unique()
-        else:
-            available_discounts = filtered_data['Discount'].unique()
+        available_discounts = filtered_cube['Discount'].astype(str).unique()
         select_all_discounts = st.sidebar.checkbox("Select All Discounts", value=True)
         if select_all_discounts:
             selected_discount_options = available_discounts.tolist()
@@ -210,34 +209,38 @@ def run_app():
                 options=available_discounts,
                 default=available_discounts.tolist()
             )
-        filtered_data = filtered_data[filtered_data['Discount'].isin(selected_discount_options)]
+        filters['Discount'] = selected_discount_options
+        filtered_cube = filtered_cube[filtered_cube['Discount'].isin(selected_discount_options)]
 
-        # Exclude Platinum & Woolwich Restaurant
-        filtered_data_excluding_packages = filtered_data[
-            ~filtered_data['Package Name'].isin(['Platinum', 'Woolwich Restaurant'])
+        # Exclude Platinum & Woolwich Restaurant; credit / voucher discounts aren't pending payments
+        cube_excluding_packages = filtered_cube[
+            ~filtered_cube['Package Name'].isin(['Platinum', 'Woolwich Restaurant'])
         ]
-        mask = ~filtered_data_excluding_packages['Discount'].str.contains(
-            '|'.join([re.escape(k) for k in ["credit","voucher","gift voucher","discount","pldl"]]),
-            case=False, na=False
-        )
-        filtered_data_without_excluded_keywords = filtered_data_excluding_packages[mask]
+        cube_without_excluded_keywords = cube_excluding_packages[
+            cube_excluding_packages['DiscountClass'] != 'credit'
+        ]
+
+        # Transaction rows behind the filtered cube, for the pending payments table, charts and downloads
+        filtered_data = filter_sales_rows(loaded_api_df, filters, min_dt, max_dt)
 
         # Static and dynamic totals
-        static_start_date = datetime(2024, 6, 18)
-        static_total      = loaded_api_df[
-            (loaded_api_df['CreatedOn'] >= static_start_date) &
-            ~loaded_api_df['Package Name'].isin(['Platinum', 'Woolwich Restaurant'])
+        static_start_date = tjt_store.sales_open_date(season)
+        season_cube       = tjt_cube.sales_cube(loaded_api_df, specified_users)
+        static_total      = season_cube[
+            (season_cube['Day'] >= static_start_date) &
+            ~season_cube['Package Name'].isin(['Platinum', 'Woolwich Restaurant'])
         ]['TotalPrice'].sum()
-        dynamic_total     = filtered_data_excluding_packages['TotalPrice'].sum()
-        other_sales_total = dynamic_total + filtered_data_without_excluded_keywords['DiscountValue'].sum()
+        dynamic_total     = cube_excluding_packages['TotalPrice'].sum()
+        other_sales_total = dynamic_total + cube_without_excluded_keywords['DiscountValue'].sum()
 
         # Metric cards
-        raw_loc   = filtered_data_excluding_packages.groupby('SaleLocation')['TotalPrice'].sum().reset_index()
-        other_loc = filtered_data_without_excluded_keywords.groupby('SaleLocation')['DiscountValue'].sum().reset_index()
+        raw_loc   = tjt_cube.rollup(cube_excluding_packages, ['SaleLocation'], ['TotalPrice'])
+        other_loc = tjt_cube.rollup(cube_without_excluded_keywords, ['SaleLocation'], ['DiscountValue'])
         raw_loc   = pd.merge(raw_loc, other_loc, on='SaleLocation', how='left').rename(columns={'DiscountValue':'OtherPayments'})
         raw_loc['TotalWithOtherPayments'] = raw_loc['TotalPrice'] + raw_loc['OtherPayments'].fillna(0)
-        top_channel = raw_loc.sort_values('TotalWithOtherPayments', ascending=False).iloc[0]
-        payment_channel_metric = f"{top_channel['SaleLocation']} (Sales: £{top_channel['TotalWithOtherPayments']:,.2f})"
+        if not raw_loc.empty:
+            top_channel = raw_loc.sort_values('TotalWithOtherPayments', ascending=False).iloc[0]
+            payment_channel_metric = f"{top_channel['SaleLocation']} (Sales: £{top_channel['TotalWithOtherPayments']:,.2f})"
 
         c1, c2, c3, c4 = st.columns(4)
         c1.metric("Total Confirmed Sales",                f"£{static_total:,.2f}")
@@ -249,10 +252,23 @@ def run_app():
         st.write("### ⚽ Total Sales Summary")
         st.write(f"RTS sales = confirmed, OtherSales = pending: **£{other_sales_total:,.2f}**")
 
-        # build the summary off of filtered_data_excluding_packages
+        # build the summary off of cube_excluding_packages, matching budgets on name, competition and KO date
+        per_fixture = tjt_cube.rollup(
+            cube_excluding_packages, ['Fixture Name', 'EventCompetition', 'KickOffEventStart'], ['TotalPrice']
+        )
+        per_fixture['KO_date'] = per_fixture['KickOffEventStart'].dt.floor('D')
+        per_fixture = per_fixture.merge(
+            budget_df.assign(KO_date=budget_df['KickOffEventStart'].dt.floor('D')),
+            how='left',
+            on=['Fixture Name','EventCompetition','KO_date'],
+            suffixes=('','_bud')
+        )
+        per_fixture['Days to Fixture'] = (
+            per_fixture['KickOffEventStart'] - today
+        ).dt.days.fillna(-1).astype(int)
         total_sold_per_match = (
-            filtered_data_excluding_packages
-            .groupby(["Fixture Name","KickOffEventStart"])
+            per_fixture
+            .groupby(["Fixture Name","KickOffEventStart"], observed=True)
             .agg(
                 DaysToFixture=("Days to Fixture","min"),
                 RTS_Sales=("TotalPrice","sum"),
@@ -261,7 +277,8 @@ def run_app():
             .reset_index()
         )
         other_sales = (
-            filtered_data_without_excluded_keywords.groupby("Fixture Name")['DiscountValue'].sum()
+            tjt_cube.rollup(cube_without_excluded_keywords, ['Fixture Name'], ['DiscountValue'])
+            .set_index('Fixture Name')['DiscountValue']
         )
         total_sold_per_match = pd.merge(
             total_sold_per_match,
@@ -270,7 +287,10 @@ def run_app():
             how="left"
         )
         total_sold_per_match['OtherSales'] = total_sold_per_match['OtherSales'].fillna(0) + total_sold_per_match['RTS_Sales']
-        covers = filtered_data_excluding_packages.groupby("Fixture Name")['Seats'].sum().rename("CoversSold")
+        covers = (
+            tjt_cube.rollup(cube_excluding_packages, ['Fixture Name'], ['Seats'])
+            .set_index('Fixture Name')['Seats'].rename("CoversSold")
+        )
         total_sold_per_match = pd.merge(total_sold_per_match, covers, on="Fixture Name", how="left")
         total_sold_per_match['CoversSold'] = total_sold_per_match['CoversSold'].fillna(0).astype(int)
         total_sold_per_match['Avg Spend'] = total_sold_per_match.apply(
@@ -293,10 +313,14 @@ def run_app():
         ]]
         st.dataframe(total_sold_per_match)
 
-        # Table with Pending Payments
+        # Table with Pending Payments (per order, so built from the transaction rows)
         st.write("### Table with Pending Payments")
+        filtered_data_without_excluded_keywords = filtered_data[
+            ~filtered_data['Package Name'].isin(['Platinum', 'Woolwich Restaurant']) &
+            (tjt_cube.discount_class(filtered_data['Discount']).to_numpy() != 'credit')
+        ]
         total_discount_value = filtered_data_without_excluded_keywords.groupby(
-            ['Order Id','Country Code','First Name','Surname','Fixture Name','GLCode','CreatedOn']
+            ['Order Id','Country Code','First Name','Surname','Fixture Name','GLCode','CreatedOn'], observed=True
         )[['Discount','DiscountValue','TotalPrice']].sum().reset_index()
         total_discount_value['TotalPrice']    = total_discount_value['TotalPrice'].apply(lambda x: f"£{x:,.2f}")
         total_discount_value['DiscountValue']= total_discount_value['DiscountValue'].apply(lambda x: f"£{x:,.2f}")
@@ -304,9 +328,9 @@ def run_app():
 
         # Package Sales
         st.write("### 🎟️ MBM Package Sales")
-        other_pkg = filtered_data_without_excluded_keywords.groupby('Package Name')['DiscountValue'].sum().rename("OtherPayments")
-        pkg       = filtered_data_excluding_packages.groupby('Package Name')['TotalPrice'].sum().rename("TotalPrice")
-        total_sold_per_package = pd.merge(pkg.reset_index(), other_pkg.reset_index(), on='Package Name', how='left')
+        other_pkg = tjt_cube.rollup(cube_without_excluded_keywords, ['Package Name'], ['DiscountValue']).rename(columns={'DiscountValue': 'OtherPayments'})
+        pkg       = tjt_cube.rollup(cube_excluding_packages, ['Package Name'], ['TotalPrice'])
+        total_sold_per_package = pd.merge(pkg, other_pkg, on='Package Name', how='left')
         total_sold_per_package['TotalWithOtherPayments'] = total_sold_per_package['TotalPrice'] + total_sold_per_package['OtherPayments'].fillna(0)
         for col in ['TotalPrice','OtherPayments','TotalWithOtherPayments']:
             total_sold_per_package[col] = total_sold_per_package[col].apply(lambda x: f"£{x:,.2f}")
@@ -314,9 +338,9 @@ def run_app():
 
         # Payment Channel table
         st.write("### 🏟️ Payment Channel")
-        other_loc = filtered_data_without_excluded_keywords.groupby('SaleLocation')['DiscountValue'].sum().rename("OtherPayments")
-        loc       = filtered_data_excluding_packages.groupby('SaleLocation')['TotalPrice'].sum().rename("TotalPrice")
-        total_sold_per_location = pd.merge(loc.reset_index(), other_loc.reset_index(), on='SaleLocation', how='left')
+        other_loc = tjt_cube.rollup(cube_without_excluded_keywords, ['SaleLocation'], ['DiscountValue']).rename(columns={'DiscountValue': 'OtherPayments'})
+        loc       = tjt_cube.rollup(cube_excluding_packages, ['SaleLocation'], ['TotalPrice'])
+        total_sold_per_location = pd.merge(loc, other_loc, on='SaleLocation', how='left')
         total_sold_per_location['TotalWithOtherPayments'] = total_sold_per_location['TotalPrice'] + total_sold_per_location['OtherPayments'].fillna(0)
         for col in ['TotalPrice','OtherPayments','TotalWithOtherPayments']:
             total_sold_per_location[col] = total_sold_per_location[col].apply(lambda x: f"£{x:,.2f}")
@@ -324,20 +348,24 @@ def run_app():
 
         # Woolwich Restaurant Sales
         st.write("### 🍴 Woolwich Restaurant Sales")
-        wool = filtered_data[
-            (filtered_data['Package Name'].isin(['Platinum','Woolwich Restaurant'])) &
-            (filtered_data['IsPaid'].str.upper()=='TRUE')
+        wool_cube = filtered_cube[
+            (filtered_cube['Package Name'].isin(['Platinum','Woolwich Restaurant'])) &
+            (filtered_cube['IsPaid'].str.upper()=='TRUE')
         ]
-        total_sales_revenue = wool['TotalPrice'].sum()
-        total_covers_sold  = wool['Seats'].sum()
+        total_sales_revenue = wool_cube['TotalPrice'].sum()
+        total_covers_sold  = wool_cube['Seats'].sum()
         st.write(f"Total Sales Revenue: **£{total_sales_revenue:,.0f}**")
         st.write(f"Total Covers Sold: **{int(total_covers_sold)}**")
-        wool_summary = wool.groupby(['Fixture Name','KickOffEventStart']).agg({'Seats':'sum','TotalPrice':'sum'}).reset_index()
+        wool_summary = tjt_cube.rollup(wool_cube, ['Fixture Name','KickOffEventStart'], ['Seats','TotalPrice'])
         wool_summary = wool_summary.rename(columns={
             'Fixture Name':'Event','KickOffEventStart':'Event Date','Seats':'Covers Sold','TotalPrice':'Revenue'
         })
         wool_summary['Revenue'] = wool_summary['Revenue'].apply(lambda x: f"£{x:,.0f}")
         st.dataframe(wool_summary)
+        wool = filtered_data[
+            (filtered_data['Package Name'].isin(['Platinum','Woolwich Restaurant'])) &
+            (filtered_data['IsPaid'].str.upper()=='TRUE')
+        ]
 
         # Cumulative sales charts
         st.header("Cumulative Sales as Percentage of Budget")
@@ -366,14 +394,24 @@ def run_app():
             output.seek(0)
             st.download_button("💾 Download Woolwich Restaurant Data", data=output, file_name='woolwich_restaurant_sales_data.csv', mime='text/csv')
         if not filtered_data.empty:
+            # Export the filtered rows with their budget and days to fixture, as before
+            filtered_export = filtered_data.assign(
+                KO_date=filtered_data['KickOffEventStart'].dt.floor('D')
+            ).merge(
+                budget_df.assign(KO_date=budget_df['KickOffEventStart'].dt.floor('D')),
+                how='left',
+                on=['Fixture Name','EventCompetition','KO_date'],
+                suffixes=('','_bud')
+            ).drop(columns=['KO_date'])
+            filtered_export['Days to Fixture'] = (
+                filtered_export['KickOffEventStart'] - today
+            ).dt.days.fillna(-1).astype(int)
             fd = BytesIO()
-            fd.write(filtered_data.to_csv(index=False).encode('utf-8'))
+            fd.write(filtered_export.to_csv(index=False).encode('utf-8'))
             fd.seek(0)
             st.download_button("💾 Download Filtered Data", data=fd, file_name='filtered_data.csv', mime='text/csv')
         if not loaded_api_df.empty:
-            sd = BytesIO()
-            sd.write(loaded_api_df.to_csv(index=False).encode('utf-8'))
-            sd.seek(0)
+            sd = BytesIO(sales_report_csv(loaded_api_df))
             st.download_button("💾 Download Sales Report", data=sd, file_name='sales_report.csv', mime='text/csv')
 
     else:
@@ -1,6 +1,6 @@
 import streamlit as st
 import pandas as pd
-import requests
+import tjt_client
 import time
 import math
 from datetime import datetime
@@ -137,26 +137,14 @@ def run():
     end_date = st.sidebar.date_input("End Date", datetime.now())
     
     # --- API Config ---
-    token_url = "https://www.tjhub3.com/export_arsenal/token"
-    events_url = "https://www.tjhub3.com/export_arsenal/Events/List"
-    preorders_url_template = "https://www.tjhub3.com/export_arsenal/CateringPreorders/List?EventId={}"
-    USERNAME = "hospitality"
-    PASSWORD = "OkMessageSectionType000!"
+    preorders_url_template = tjt_client.BASE_URL + "/CateringPreorders/List?EventId={}"
 
-    @st.cache_data
-    def get_access_token():
-        data = {"Username": USERNAME, "Password": PASSWORD, "grant_type": "password"}
-        resp = requests.post(token_url, data=data)
-        if resp.status_code == 200:
-            return resp.json().get("access_token")
-        return None
-
-    @st.cache_data
-    def fetch_event_details(headers):
-        r = requests.get(events_url, headers=headers)
-        if r.status_code != 200:
+    @st.cache_data(ttl=300)
+    def fetch_event_details():
+        try:
+            events = tjt_client.get_events()
+        except tjt_client.TJTError:
             return []
-        events = r.json().get("Data", {}).get("Events", [])
         return [
             {
                 "EventId": e["Id"],
@@ -166,13 +154,15 @@ def run():
             for e in events
         ]
 
-    @st.cache_data
-    def fetch_api_preorders(event_ids, headers):
+    @st.cache_data(ttl=300)
+    def fetch_api_preorders(event_ids):
         all_data = []
         for eid in event_ids:
-            r = requests.get(preorders_url_template.format(eid), headers=headers)
-            if r.status_code == 200:
-                all_data.extend(r.json().get("Data", {}).get("CateringPreorders", []))
+            try:
+                payload, _ = tjt_client.client.get_json(preorders_url_template.format(eid))
+            except tjt_client.TJTError:
+                continue
+            all_data.extend(payload.get("Data", {}).get("CateringPreorders", []))
         return pd.DataFrame(all_data)
 
     @st.cache_data
@@ -324,16 +314,15 @@ def run():
             time.sleep(0.2)
 
             # Get API Token
-            token = get_access_token()
+            token = tjt_client.get_access_token()
             if not token:
                 st.error("❌ Failed to retrieve API token.")
                 st.stop()
-            headers = {"Authorization": f"Bearer {token}"}
             process_progress_bar.progress(30)
             time.sleep(0.2)
 
             # Fetch event details
-            events_list = fetch_event_details(headers)
+            events_list = fetch_event_details()
             df_events = pd.DataFrame(events_list)
             process_progress_bar.progress(40)
             time.sleep(0.2)
@@ -342,7 +331,7 @@ def run():
 
             # Fetch API Preorders
             event_ids = df_events["EventId"].unique().tolist() if not df_events.empty else []
-            df_api_pre = fetch_api_preorders(event_ids, headers)
+            df_api_pre = fetch_api_preorders(event_ids)
             process_progress_bar.progress(50)
             time.sleep(0.2)
 
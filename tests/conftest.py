@@ -0,0 +1,59 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tjt_store
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """
+    Points tjt_store at an empty store under tmp_path.
+    """
+    root = tmp_path / 'tjt_store'
+    monkeypatch.setattr(tjt_store, 'STORE_DIR', str(root))
+    monkeypatch.setattr(tjt_store, 'SNAPSHOT_DIR', str(root / 'snapshots'))
+    monkeypatch.setattr(tjt_store, 'LATEST_FILE', str(root / 'snapshots' / 'LATEST'))
+    monkeypatch.setattr(tjt_store, 'TABLE_DIR', str(root / 'tables'))
+    monkeypatch.setattr(tjt_store, 'HISTORY_DIR', str(root / 'history'))
+    monkeypatch.setattr(tjt_store, 'LOCK_DIR', str(root / 'locks'))
+    monkeypatch.setattr(tjt_store, '_latest_cache', {})
+    return tjt_store
+
+
+@pytest.fixture
+def mock_tjt(tmp_path, monkeypatch, store):
+    """
+    Serves a few events of synthetic data (tjt_synthetic) from tjt_mock_server
+    and points tjt_client and tjt_hosp_api at it, with a fresh guest index.
+    Returns the server; edit the files under server.config.data_dir and call
+    server.payloads.reload() to change what it serves.
+    """
+    import tjt_client
+    import tjt_hosp_api
+    import tjt_mock_server
+    import tjt_synthetic
+
+    data_dir = str(tmp_path / 'tjt_mock_data')
+    tjt_synthetic.generate(data_dir, scale=0.08)
+    server, base_url = tjt_mock_server.start_server(tjt_mock_server.MockConfig(data_dir))
+
+    tokens = tjt_client.TokenProvider(token_url=f"{base_url}/token")
+    client = tjt_client.TJTClient(base_url, tokens=tokens, max_retries=0,
+                                  limiter=tjt_client.RateLimiter(rate=1000, burst=1000))
+    monkeypatch.setattr(tjt_client, 'client', client)
+    # Every refresh sees the event list as it is now
+    monkeypatch.setattr(tjt_client, 'events_payload', tjt_client.SharedPayload(tjt_client.EVENTS_PATH, 0, client))
+    monkeypatch.setattr(tjt_hosp_api, 'accounts_url', f"{base_url}/Accounts/List")
+    monkeypatch.setattr(tjt_hosp_api, 'transaction_url_template', base_url + "/HospitalitySaleTransactions/List?EventId={}")
+    monkeypatch.setattr(tjt_hosp_api, 'guest_index', {})
+    monkeypatch.setattr(tjt_hosp_api, '_guests_synced_at', None)
+    monkeypatch.setattr(tjt_hosp_api, '_unknown_guests', set())
+    monkeypatch.setattr(tjt_hosp_api, '_changed_guests', set())
+
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,85 @@
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tjt_client
+import tjt_hosp_api
+
+
+def chunked(document, size):
+    body = document.encode()
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+def test_scalar_split_one_byte_at_a_time():
+    assert list(tjt_client.iter_json_array(chunked('{"K": [1.25]}', 1), 'K')) == [1.25]
+
+
+def test_mixed_elements_split_at_every_boundary():
+    document = '{"K": [1.25, -3e5 ,true,null,"x",{"a":[1]},[2.5]], "Other": 1}'
+    expected = [1.25, -3e5, True, None, "x", {"a": [1]}, [2.5]]
+    for size in range(1, len(document) + 1):
+        assert list(tjt_client.iter_json_array(chunked(document, size), 'K')) == expected
+
+
+class FlakySession(requests.Session):
+    """
+    Session whose first `failures` POSTs fail to connect.
+    """
+
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def post(self, *args, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise requests.ConnectionError("connection reset")
+        return super().post(*args, **kwargs)
+
+
+def test_token_fetch_retries_connection_errors(mock_tjt):
+    base_url = tjt_client.client.base_url
+    tokens = tjt_client.TokenProvider(token_url=f"{base_url}/token", session=FlakySession(1), backoff=0)
+
+    assert tokens.get_token().startswith('mock-token-')
+    assert mock_tjt.stats['token'] == 1
+
+
+def test_unreachable_token_endpoint_raises_tjt_error(mock_tjt, monkeypatch):
+    base_url = tjt_client.client.base_url
+    tokens = tjt_client.TokenProvider(token_url=f"{base_url}/token", session=FlakySession(10), max_retries=1, backoff=0)
+    client = tjt_client.TJTClient(base_url, tokens=tokens, max_retries=0)
+
+    with pytest.raises(tjt_client.TJTError):
+        client.get_json(tjt_client.EVENTS_PATH)
+    assert tokens.session.failures == 8
+
+    # In a crawl that is one failed event each, not an aborted crawl
+    monkeypatch.setattr(tjt_client, 'client', client)
+    results, failures = tjt_hosp_api.fetch_all_event_transactions([1, 2])
+    assert results == [None, None] and set(failures) == {1, 2}
+
+
+def test_expired_token_is_refreshed_once_for_concurrent_callers(mock_tjt):
+    tokens = tjt_client.TokenProvider(token_url=f"{tjt_client.client.base_url}/token")
+    tokens.get_token()
+    tokens._expires_at = 0.0   # Expired
+    fetched = mock_tjt.stats['token']
+
+    start = threading.Barrier(8)
+
+    def call():
+        start.wait()
+        return tokens.get_token()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = [pool.submit(call) for _ in range(8)]
+    assert mock_tjt.stats['token'] - fetched == 1
+    assert {result.result() for result in results} == {tokens.get_token()}
@@ -0,0 +1,73 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tjt_cube
+import tjt_hosp_api
+
+
+def sales_frame():
+    rows = [
+        # Fixture, kick-off, created, creator, location, package, paid, discount, total, discount value, seats
+        ("Arsenal v Chelsea", "2024-09-21 17:30", "2024-09-01 09:15", "dmontague", "Phone", "Dial Square", True, None, 690.0, 0.0, 2),
+        ("Arsenal v Chelsea", "2024-09-21 17:30", "2024-09-01 16:40", "dmontague", "Phone", "Dial Square", False, "Credit Note", 500.0, 120.0, 2),
+        ("Arsenal v Chelsea", "2024-09-21 17:30", "2024-09-02 11:05", "jedwards", "Online", "Platinum", True, None, 1200.0, 0.0, 1),
+        ("Arsenal v Chelsea", "2024-09-21 17:30", "2024-09-02 12:00", "webguest1", "Online", "Dial Square", True, "Invoice", 621.0, 80.0, 3),
+        ("Arsenal v Everton", "2024-10-05 15:00", "2024-09-02 13:30", "webguest2", "Online", "Woolwich Restaurant", True, None, 300.0, 0.0, 2),
+        ("Arsenal v Everton", "2024-10-05 15:00", "2024-09-03 10:00", "jedwards", "Box Office", "Dial Square", False, "Gift Voucher", 450.0, 50.0, 1),
+    ]
+    df = pd.DataFrame(rows, columns=[
+        "Fixture Name", "KickOffEventStart", "CreatedOn", "CreatedBy", "SaleLocation", "Package Name", "IsPaid",
+        "Discount", "TotalPrice", "DiscountValue", "Seats",
+    ])
+    df["EventCompetition"] = "Premier League"
+    for col in ("KickOffEventStart", "CreatedOn"):
+        df[col] = pd.to_datetime(df[col])
+    return tjt_hosp_api.apply_schema(df)
+
+
+def test_rollups_match_raw_row_totals():
+    sales = sales_frame()
+    cube = tjt_cube.build_cube(sales, execs=["dmontague", "jedwards"])
+
+    totals = tjt_cube.rollup(cube)
+    assert totals["TotalPrice"] == sales["TotalPrice"].sum()
+    assert totals["Seats"] == sales["Seats"].sum()
+    assert totals["Rows"] == len(sales)
+
+    by_package = tjt_cube.rollup(cube, ["Package Name"], ["TotalPrice", "Seats"]).set_index("Package Name")
+    raw = sales.groupby("Package Name", observed=True)[["TotalPrice", "Seats"]].sum()
+    pd.testing.assert_frame_equal(by_package.sort_index(), raw.sort_index(), check_dtype=False, check_names=False)
+
+
+def test_slices_match_filtered_rows():
+    sales = sales_frame()
+    cube = tjt_cube.build_cube(sales, execs=["dmontague", "jedwards"])
+
+    day = tjt_cube.slice_cube(cube, {"CreatedBy": ["jedwards"]}, start="2024-09-02", end="2024-09-02")
+    assert tjt_cube.rollup(day)["TotalPrice"] == 1200.0
+
+    others = tjt_cube.slice_cube(cube, {"CreatedBy": tjt_cube.OTHER_CREATOR})
+    assert tjt_cube.rollup(others)["TotalPrice"] == 621.0 + 300.0
+
+    unpaid = tjt_cube.slice_cube(cube, {"IsPaid": ["False"]})
+    assert tjt_cube.rollup(unpaid)["Rows"] == 2
+
+
+def test_credit_discounts_are_classed_apart():
+    sales = sales_frame()
+    cube = tjt_cube.build_cube(sales)
+
+    pending = cube[cube["DiscountClass"] != "credit"]
+    assert tjt_cube.rollup(pending)["DiscountValue"] == 80.0
+
+
+def test_sales_cube_is_built_once_per_frame():
+    sales = sales_frame()
+    cube = tjt_cube.sales_cube(sales, ["dmontague"])
+
+    assert tjt_cube.sales_cube(sales, ["dmontague"]) is cube
+    assert tjt_cube.sales_cube(sales_frame(), ["dmontague"]) is not cube
@@ -0,0 +1,33 @@
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tjt_data
+
+
+def test_get_sales_reads_only_the_requested_seasons(store, monkeypatch):
+    sales = pd.DataFrame({
+        "EventId": [1, 2, 3],
+        "KickOffEventStart": pd.to_datetime(["2023-09-02 15:00", "2024-09-21 17:30", "2025-01-18 15:00"]),
+        "CreatedOn": pd.to_datetime(["2023-07-10 09:00", "2024-08-01 11:00", "2024-11-20 12:00"]),
+        "TotalPrice": [400.0, 690.0, 621.0],
+    })
+    store.write_snapshot(sales, sales)
+    refreshes = []
+    monkeypatch.setattr(tjt_data, 'request_refresh', lambda name, max_age=0.0: refreshes.append(name))
+
+    current = tjt_data.get_sales(seasons=['2024-25'], max_age=3600)
+    assert current['EventId'].tolist() == [2, 3]
+    assert tjt_data.get_sales(seasons=['2024-25'], max_age=3600) is current   # Cached until a new snapshot
+    assert tjt_data.get_sales(created_from=datetime(2024, 1, 1), max_age=3600)['EventId'].tolist() == [2, 3]
+    assert sorted(tjt_data.get_sales(max_age=3600)['EventId']) == [1, 2, 3]
+    assert refreshes == []
+
+    store.write_snapshot(sales.iloc[:2], sales.iloc[:2])
+    assert tjt_data.get_sales(seasons=['2024-25'], max_age=3600)['EventId'].tolist() == [2]
+    tjt_data.get_sales(max_age=0)
+    assert refreshes == ['sales']
@@ -0,0 +1,194 @@
+import json
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tjt_hosp_api
+
+
+def merged_row(transaction_id, guest_id, total_price, created_on, session=None):
+    return {
+        "Id": transaction_id, "EventId": 33, "Fixture Name": "Arsenal v Chelsea", "Name": "Dial Square Gallery",
+        "Type": "Matchday", "PackageId": 43, "GuestId": guest_id, "Price": total_price, "TotalPrice": total_price,
+        "IsPaid": True, "CreatedOn": created_on, "CreatedBy": "dmontague",
+        "Locations": [{"Id": 2765, "LocationName": "Dial Square Gallery"}],
+        "TMSessionId": json.dumps(session) if session else None,
+    }
+
+
+def test_sales_sharing_a_location_id_are_both_kept():
+    # Two sales in filtered_hosp_data2.xlsx share EventId 33, Order Id 2765, PackageId 43 and location
+    merged = pd.DataFrame([
+        merged_row(5101, 191, 690.0, "2024-06-18T13:44:00"),
+        merged_row(5102, 206, 621.0, "2024-06-18T14:48:00"),
+    ])
+    sales = tjt_hosp_api.filter_without_seats(tjt_hosp_api.build_final_df(merged, seats=False))
+
+    assert sorted(sales["GuestId"]) == [191, 206]
+    assert sales["TotalPrice"].sum() == 1311.0
+    assert "Id" not in sales.columns
+
+
+def test_seat_rows_collapse_to_one_row_per_transaction():
+    seats = {"Seats": [{"Row": "A", "Number": 1}, {"Row": "A", "Number": 2}, {"Row": "A", "Number": 3}]}
+    merged = pd.DataFrame([merged_row(5101, 191, 690.0, "2024-06-18T13:44:00", session=seats)])
+    final = tjt_hosp_api.build_final_df(merged)
+
+    assert len(final) == 3
+    assert len(tjt_hosp_api.filter_without_seats(final)) == 1
+
+
+def test_dedupe_on_key_keeps_rows_that_differ():
+    df = pd.DataFrame({"Key": [1, 1, 1, 2], "Value": ["a", "a", "b", "c"]})
+    deduped, conflicts = tjt_hosp_api.dedupe_on_key(df, ["Key"])
+
+    assert deduped["Value"].tolist() == ["a", "b", "c"]
+    assert conflicts == 1
+
+
+def test_parse_datetimes_reads_iso_and_day_first_strings():
+    parsed = tjt_hosp_api.parse_datetimes(pd.Series([
+        "2024-11-18T15:48:38.46", "2024-11-18T15:48:38+01:00", "22-07-2024 06:03", "01-02-2024 10:00", None, "not a date",
+    ]))
+
+    assert pd.api.types.is_datetime64_any_dtype(parsed)
+    assert parsed.tolist()[:4] == [
+        pd.Timestamp("2024-11-18 15:48"), pd.Timestamp("2024-11-18 15:48"),
+        pd.Timestamp("2024-07-22 06:03"), pd.Timestamp("2024-02-01 10:00"),
+    ]
+    assert parsed[4:].isna().all()
+
+
+def test_apply_schema_dtypes_and_missing_values():
+    merged = pd.DataFrame([
+        {**merged_row(5101, 191, 690.0, "22-07-2024 06:03"), "IsPaid": "True", "Seats": "2", "Discount": None},
+        {**merged_row(5102, "206", "621.5", "2024-07-23T09:15:00"), "IsPaid": 0, "Seats": None, "Discount": "Invoice"},
+        {**merged_row(5103, None, None, None), "IsPaid": "maybe", "Seats": 1, "Discount": "Invoice",
+         "PackageId": "n/a", "Locations": [{"Id": 2766, "LocationName": "Club Level"}]},
+    ])
+    merged["KickOffEventStart"] = "2024-08-17T15:00:00"
+    sales = tjt_hosp_api.apply_schema(tjt_hosp_api.filter_without_seats(tjt_hosp_api.build_final_df(merged, seats=False)))
+
+    for col in ("CreatedOn", "KickOffEventStart"):
+        assert pd.api.types.is_datetime64_any_dtype(sales[col])
+    assert sales["CreatedOn"].tolist()[:2] == [pd.Timestamp("2024-07-22 06:03"), pd.Timestamp("2024-07-23 09:15")]
+    assert pd.isna(sales["CreatedOn"].iloc[2])
+
+    for col in ("Fixture Name", "Package Name", "LocationName", "Type", "CreatedBy", "Discount"):
+        assert isinstance(sales[col].dtype, pd.CategoricalDtype), col
+    assert sales["Discount"].isna().tolist() == [True, False, False]
+    assert sorted(sales["Discount"].cat.categories) == ["Invoice"]
+
+    for col in ("Order Id", "PackageId", "EventId", "GuestId", "Seats"):
+        assert str(sales[col].dtype) == "Int64", col
+    assert sales["GuestId"].tolist()[:2] == [191, 206] and sales["GuestId"].isna().tolist() == [False, False, True]
+    assert sales["Seats"].isna().tolist() == [False, True, False]
+    assert sales["PackageId"].isna().tolist() == [False, False, True]
+    assert sales["Order Id"].tolist() == [2765, 2765, 2766]
+
+    for col in ("Price", "TotalPrice"):
+        assert sales[col].dtype == "float64", col
+    assert sales["TotalPrice"].tolist()[:2] == [690.0, 621.5] and pd.isna(sales["TotalPrice"].iloc[2])
+
+    assert str(sales["IsPaid"].dtype) == "boolean"
+    assert sales["IsPaid"].tolist()[:2] == [True, False] and pd.isna(sales["IsPaid"].iloc[2])
+
+
+def row_by_row_final_df(df):
+    """
+    The row-by-row loop build_final_df replaced, kept as the reference its
+    output must match (timestamps parsed rather than formatted as strings).
+    """
+    final_data = []
+    for _, row in df.iterrows():
+        locations = row.get('Locations')
+        location = locations[0] if isinstance(locations, list) and locations else None
+        package_name = row.get('Name')
+        if row.get('Type') == 'Seasonal Membership' and 'Platinum' in row.get('Name', ''):
+            package_name = 'Platinum'
+        if pd.notna(row['TMSessionId']) and row['TMSessionId']:
+            for seat in json.loads(row['TMSessionId']).get('Seats', []):
+                seat_record = {out_col: row.get(field) for out_col, (source, field) in tjt_hosp_api.SEAT_RECORD_FIELDS.items()
+                               if source == 'row'}
+                seat_record.update({
+                    "Package Name": package_name,
+                    "LocationName": location.get('LocationName', '') if location else '',
+                    "Seats": row.get("Seats", seat.get("Seats")),
+                    "PriceBandName": seat.get("PriceBandName"),
+                    "Row": seat.get("Row"),
+                    "Seat Number": seat.get("Number"),
+                    "AreaName": seat.get("AreaName"),
+                    "BlockId": seat.get("BlockId"),
+                })
+                final_data.append(seat_record)
+        else:
+            row = row.copy()
+            row['LocationName'] = location.get('LocationName', '') if location else ''
+            row['Order Id'] = (location.get('Id') if location else None) or row["Id"]
+            row['Package Name'] = package_name
+            final_data.append(row)
+    final_df = pd.DataFrame(final_data).reset_index(drop=True)
+    for col in tjt_hosp_api.TIMESTAMP_COLUMNS:
+        final_df[col] = pd.to_datetime(final_df[col], format='ISO8601').dt.floor('min')
+    return final_df
+
+
+def test_build_final_df_matches_the_row_by_row_loop():
+    seats = [{"Row": 23, "Number": number, "AreaName": "Dial Square Gallery", "BlockId": 309, "PriceBandName": "Club 1886"}
+             for number in (19, 20, 21)]
+    merged = pd.DataFrame([
+        merged_row(5101, 191, 1380.0, "2024-07-22T06:03:40.803", session={"Seats": seats}),
+        merged_row(5102, 206, 621.0, "2024-07-22T08:10:00"),                       # No TMSessionId
+        {**merged_row(5103, 207, 900.0, "2024-07-23T10:00:00", session={"Seats": seats[:1]}),
+         "Type": "Seasonal Membership", "Name": "Platinum Seasonal"},
+        {**merged_row(5104, 208, 300.0, "2024-07-24T11:30:00"), "Locations": []},
+        merged_row(5105, 209, 0.0, "2024-07-25T12:00:00", session={"Seats": []}),  # Session without seats: no rows
+    ])
+    merged["KickOffEventStart"] = "2024-08-17T15:00:00"
+    merged["PaymentTime"] = None
+    merged["Seats"] = [3, 1, 1, 2, 0]
+    expected = row_by_row_final_df(merged)
+
+    with_seats = tjt_hosp_api.filter_with_seats(tjt_hosp_api.build_final_df(merged))
+    expected_with_seats = tjt_hosp_api.filter_with_seats(expected)
+    assert len(with_seats) == 3 + 1 + 1 + 1
+    pd.testing.assert_frame_equal(with_seats.astype(str), expected_with_seats[list(with_seats.columns)].astype(str))
+
+    # Without seats: one row per sale, as the old drop_duplicates() gave
+    without_seats = tjt_hosp_api.filter_without_seats(tjt_hosp_api.build_final_df(merged, seats=False)).reset_index(drop=True)
+    expected_without_seats = tjt_hosp_api.filter_without_seats(expected).reset_index(drop=True)
+    old_projection = expected[[col for col in expected.columns if col in tjt_hosp_api.filtered_columns_without_seat_data]]
+    assert len(without_seats) == len(old_projection.drop_duplicates()) == 4
+    pd.testing.assert_frame_equal(without_seats.astype(str), expected_without_seats[list(without_seats.columns)].astype(str))
+    assert without_seats["Package Name"].tolist() == ["Dial Square Gallery", "Dial Square Gallery", "Platinum", "Dial Square Gallery"]
+    assert without_seats["Order Id"].tolist() == [5101, 2765, 5103, 5104]
+
+
+def test_seat_level_view_has_one_row_per_seat(store, monkeypatch):
+    monkeypatch.setattr(tjt_hosp_api, '_seat_views', {})
+    seats = [{"Row": 23, "Number": number, "AreaName": "Dial Square Gallery", "BlockId": 309, "PriceBandName": "Club 1886"}
+             for number in (19, 20, 21)]
+    merged = pd.DataFrame([
+        merged_row(5101, 191, 1380.0, "2024-07-22T06:03:40", session={"Seats": seats}),
+        merged_row(5102, 206, 621.0, "2024-07-22T08:10:00"),
+        {**merged_row(5103, 207, 460.0, "2024-07-23T10:00:00", session={"Seats": seats[:1]}), "EventId": 34},
+    ])
+    merged["KickOffEventStart"] = "2024-08-17T15:00:00"
+    store.write_snapshot(merged, tjt_hosp_api.filter_without_seats(tjt_hosp_api.build_final_df(merged, seats=False)))
+
+    view = tjt_hosp_api.seat_level_view()
+    assert len(view) == 3 + 1 + 1
+    assert set(view.columns) <= set(tjt_hosp_api.filtered_columns_with_seat_data)
+    assert {"AreaName", "PriceBandName", "Seat Number", "Row", "BlockId"} <= set(view.columns)
+    first_sale = view[view["Order Id"] == 5101]
+    assert first_sale["Seat Number"].tolist() == [19, 20, 21]
+    assert first_sale["Row"].tolist() == [23, 23, 23]
+    assert set(first_sale["AreaName"]) == {"Dial Square Gallery"} and set(first_sale["BlockId"]) == {309}
+    assert set(first_sale["PriceBandName"]) == {"Club 1886"}
+    assert view.loc[view["Order Id"] == 2765, "Seat Number"].isna().all()   # Sale without seat data
+
+    assert len(tjt_hosp_api.seat_level_view(event_ids=[34])) == 1
+    assert tjt_hosp_api.seat_level_view() is view
@@ -0,0 +1,75 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tjt_hosp_api
+import tjt_query
+
+
+def sales_frame(rows):
+    df = pd.DataFrame(rows, columns=["EventId", "KickOffEventStart", "CreatedOn", "CreatedBy", "Price", "IsPaid"])
+    for col in ("KickOffEventStart", "CreatedOn"):
+        df[col] = pd.to_datetime(df[col])
+    return tjt_hosp_api.apply_schema(df)
+
+
+FIRST = sales_frame([
+    (1, "2024-09-21 17:30", "2024-09-01 09:15", "dmontague", 690.0, True),
+    (1, "2024-09-21 17:30", "2024-09-02 10:00", "jedwards", 621.0, False),
+    (2, "2024-10-05 15:00", "2024-09-02 11:30", "dmontague", 300.0, True),
+    (3, "2025-08-16 15:00", "2025-06-20 12:00", "jedwards", 450.0, True),
+])
+
+# Event 1 unchanged, event 2 edited, event 3 gone, event 4 new
+SECOND = sales_frame([
+    (1, "2024-09-21 17:30", "2024-09-01 09:15", "dmontague", 690.0, True),
+    (1, "2024-09-21 17:30", "2024-09-02 10:00", "jedwards", 621.0, False),
+    (2, "2024-10-05 15:00", "2024-09-02 11:30", "dmontague", 350.0, True),
+    (2, "2024-10-05 15:00", "2024-09-03 08:00", "bgardiner", 200.0, True),
+    (4, "2024-11-02 20:00", "2024-09-03 09:00", "jedwards", 125.0, True),
+])
+
+
+def totals(df, start=None, end=None):
+    if start is not None:
+        df = df[(df["CreatedOn"] >= start) & (df["CreatedOn"] < end)]
+    return df.groupby(df["CreatedBy"].astype(str))["Price"].sum().sort_index()
+
+
+@pytest.fixture
+def sqlite_store(store, monkeypatch):
+    monkeypatch.setattr(store, 'SQLITE_ENABLED', True)
+    full_writes = []
+    write_sqlite = store._write_sqlite
+    monkeypatch.setattr(store, '_write_sqlite', lambda df, path: (full_writes.append(path), write_sqlite(df, path)))
+    store.full_writes = full_writes
+    return store
+
+
+def test_sales_totals_match_pandas(sqlite_store):
+    sqlite_store.write_snapshot(FIRST, FIRST)
+    result = tjt_query.sales_totals(["CreatedBy"], ["Price"]).set_index("CreatedBy")["Price"]
+    pd.testing.assert_series_equal(result, totals(FIRST), check_names=False)
+
+    window = tjt_query.sales_totals(["CreatedBy"], ["Price"], start=pd.Timestamp("2024-09-02"), end=pd.Timestamp("2024-09-03"))
+    expected = totals(FIRST, pd.Timestamp("2024-09-02"), pd.Timestamp("2024-09-03"))
+    pd.testing.assert_series_equal(window.set_index("CreatedBy")["Price"], expected, check_names=False)
+
+
+def test_changed_events_are_replaced_in_place(sqlite_store):
+    first = sqlite_store.write_snapshot(FIRST, FIRST)
+    sqlite_store.write_snapshot(SECOND, SECOND, base_version=first, unchanged_events={1})
+
+    assert len(sqlite_store.full_writes) == 1
+    rows = tjt_query.sales_rows(["EventId", "CreatedBy", "Price"]).sort_values(["EventId", "Price"])
+    expected = SECOND[["EventId", "CreatedBy", "Price"]].sort_values(["EventId", "Price"])
+    assert rows.values.tolist() == expected.astype(object).values.tolist()
+
+
+def test_no_database_raises_query_error(store):
+    with pytest.raises(tjt_query.QueryError):
+        tjt_query.sales_totals(["CreatedBy"])
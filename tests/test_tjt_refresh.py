@@ -0,0 +1,156 @@
+import json
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tjt_hosp_api
+
+
+def read_data(server, *parts):
+    with open(os.path.join(server.config.data_dir, *parts)) as f:
+        return json.load(f)
+
+
+def write_data(server, records, *parts):
+    with open(os.path.join(server.config.data_dir, *parts), 'w') as f:
+        json.dump(records, f)
+
+
+def sorted_rows(df):
+    df = df[sorted(df.columns)].astype(str)
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+def test_incremental_refresh_matches_full_rebuild(mock_tjt, store, monkeypatch):
+    tjt_hosp_api.refresh(full=True)
+
+    events = read_data(mock_tjt, 'events.json')
+    first, second = events[0]['Id'], events[1]['Id']
+
+    # An in-place edit (no new timestamp), a removal and a new sale in one event
+    transactions = read_data(mock_tjt, 'transactions', f'{first}.json')
+    edited = transactions[0]
+    edited['IsPaid'] = not edited['IsPaid']
+    edited['TotalPrice'] += 100.0
+    removed = transactions.pop(1)
+    added = {**transactions[2], 'Id': 999_999, 'CreatedOn': '2030-01-01T10:00:00.000'}
+    transactions.append(added)
+    write_data(mock_tjt, transactions, 'transactions', f'{first}.json')
+
+    # A whole event's transactions withdrawn
+    write_data(mock_tjt, [], 'transactions', f'{second}.json')
+
+    # An edited guest, picked up by the next accounts sync
+    accounts = read_data(mock_tjt, 'accounts.json')
+    guest = next(account for account in accounts if account['GuestId'] == edited['GuestId'])
+    guest['Surname'] = 'Renamed'
+    write_data(mock_tjt, accounts, 'accounts.json')
+
+    mock_tjt.payloads.reload()
+    monkeypatch.setattr(tjt_hosp_api, 'GUEST_TTL', 0)
+    incremental = tjt_hosp_api.refresh()
+    incremental_merged = tjt_hosp_api.load_store()
+
+    # Events whose rows were re-fetched, plus those the edited guest has rows in
+    guest_events = set(incremental_merged.loc[incremental_merged['GuestId'] == guest['GuestId'], 'EventId'])
+    assert set(store.load_meta()['changed_events']) == {first, second} | guest_events
+    merged_ids = set(incremental_merged['Id'])
+    assert removed['Id'] not in merged_ids and added['Id'] in merged_ids
+    assert not incremental_merged['EventId'].eq(second).any()
+    assert (incremental_merged.loc[incremental_merged['GuestId'] == guest['GuestId'], 'Surname'] == 'Renamed').all()
+
+    rebuilt = tjt_hosp_api.refresh(full=True)
+    rebuilt_merged = tjt_hosp_api.load_store()
+
+    pd.testing.assert_frame_equal(sorted_rows(incremental), sorted_rows(rebuilt))
+    pd.testing.assert_frame_equal(sorted_rows(incremental_merged), sorted_rows(rebuilt_merged))
+
+
+def test_unchanged_refresh_keeps_every_event(mock_tjt, store):
+    rebuilt = tjt_hosp_api.refresh(full=True)
+    incremental = tjt_hosp_api.refresh()
+
+    assert store.load_meta()['changed_events'] == []
+    pd.testing.assert_frame_equal(sorted_rows(incremental), sorted_rows(rebuilt))
+
+
+def test_failed_event_keeps_its_last_good_rows(mock_tjt, store):
+    first_refresh = tjt_hosp_api.refresh(full=True)
+    failing = read_data(mock_tjt, 'events.json')[0]['Id']
+    good_rows = sorted_rows(first_refresh[first_refresh['EventId'] == failing])
+
+    transactions = read_data(mock_tjt, 'transactions', f'{failing}.json')
+    write_data(mock_tjt, transactions[1:], 'transactions', f'{failing}.json')
+    mock_tjt.payloads.reload()
+    mock_tjt.config.fail_events = {str(failing)}
+
+    for full in (False, True):
+        served = tjt_hosp_api.refresh(full=full)
+        pd.testing.assert_frame_equal(sorted_rows(served[served['EventId'] == failing]), good_rows)
+        assert len(served) == len(first_refresh)
+
+    stale = store.stale_events()
+    assert list(stale) == [str(failing)]
+    assert stale[str(failing)]['attempts'] == 2
+    assert stale[str(failing)]['last_refreshed'] is not None
+    assert store.stale_warning() is not None
+
+    # Once TJT answers again the event is caught up and no longer stale
+    mock_tjt.config.fail_events = set()
+    served = tjt_hosp_api.refresh()
+    assert store.stale_events() == {}
+    assert len(served) < len(first_refresh)
+    pd.testing.assert_frame_equal(sorted_rows(served), sorted_rows(tjt_hosp_api.refresh(full=True)))
+
+
+def test_history_as_of_matches_each_refresh(mock_tjt, store):
+    tjt_hosp_api.refresh(full=True)
+    before = tjt_hosp_api.load_store()
+    between = datetime.now()
+
+    event_id = read_data(mock_tjt, 'events.json')[0]['Id']
+    transactions = read_data(mock_tjt, 'transactions', f'{event_id}.json')
+    transactions[0]['TotalPrice'] += 50.0
+    write_data(mock_tjt, transactions[:-1], 'transactions', f'{event_id}.json')
+    mock_tjt.payloads.reload()
+    tjt_hosp_api.refresh()
+    after = tjt_hosp_api.load_store()
+
+    for when, merged in ((between, before), (datetime.now(), after)):
+        history = store.history_as_of(when).set_index('Id').sort_index()
+        merged = merged.set_index('Id').sort_index()
+        assert history.index.tolist() == merged.index.tolist()
+        assert history['TotalPrice'].tolist() == merged['TotalPrice'].tolist()
+
+
+def test_guests_missed_by_a_failed_sync_are_backfilled(mock_tjt, store, monkeypatch):
+    tjt_hosp_api.refresh(full=True)
+
+    # A sale for a guest created since the last accounts sync
+    event_id = read_data(mock_tjt, 'events.json')[0]['Id']
+    accounts = read_data(mock_tjt, 'accounts.json')
+    new_guest = {**accounts[0], 'GuestId': 999_999, 'Surname': 'Newcomer', 'Email': 'newcomer@example.com'}
+    write_data(mock_tjt, accounts + [new_guest], 'accounts.json')
+    transactions = read_data(mock_tjt, 'transactions', f'{event_id}.json')
+    sale = {**transactions[0], 'Id': 999_999, 'GuestId': 999_999, 'CreatedOn': '2030-01-01T10:00:00.000'}
+    write_data(mock_tjt, transactions + [sale], 'transactions', f'{event_id}.json')
+    mock_tjt.payloads.reload()
+
+    fetch_accounts = tjt_hosp_api.fetch_accounts
+    monkeypatch.setattr(tjt_hosp_api, 'fetch_accounts', lambda: None)
+    tjt_hosp_api.refresh()
+    stored = tjt_hosp_api.load_store().set_index('Id')
+    assert pd.isna(stored.loc[999_999, 'Surname'])
+    assert tjt_hosp_api._guests_synced_at is None
+
+    # The next refresh syncs again (within GUEST_TTL) and fills in the stored row
+    monkeypatch.setattr(tjt_hosp_api, 'fetch_accounts', fetch_accounts)
+    tjt_hosp_api.refresh()
+    stored = tjt_hosp_api.load_store().set_index('Id')
+    assert stored.loc[999_999, 'Surname'] == 'Newcomer'
+    assert stored.loc[999_999, 'Email'] == 'newcomer@example.com'
+    assert 999_999 not in tjt_hosp_api._unknown_guests
@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tjt_schedule
+
+NOW = datetime(2024, 10, 1, 12, 0)
+
+
+def event(event_id, kick_off, go_live=None):
+    return {'Id': event_id, 'KickOffEventStart': kick_off, 'GoLiveDate': go_live}
+
+
+def test_classify_event_tiers():
+    assert tjt_schedule.classify_event(event(1, '2024-10-05T15:00:00'), NOW) == 'hot'
+    assert tjt_schedule.classify_event(event(2, '2024-09-30T20:00:00'), NOW) == 'hot'    # Matchday grace
+    assert tjt_schedule.classify_event(event(3, '2024-09-29T15:00:00'), NOW) == 'cold'
+    assert tjt_schedule.classify_event(event(4, '2025-02-01T15:00:00'), NOW) == 'warm'
+    assert tjt_schedule.classify_event(event(5, '2025-02-01T15:00:00', '2024-09-25T09:00:00'), NOW) == 'hot'
+    assert tjt_schedule.classify_event(event(6, '2025-08-16T15:00:00'), NOW) == 'cold'   # Next season
+    assert tjt_schedule.classify_event(event(7, None), NOW) == 'warm'
+
+
+def test_due_follows_tier_intervals():
+    schedule = tjt_schedule.TieredSchedule(intervals={'hot': 60, 'warm': 900, 'cold': 21600})
+    hot, warm, cold = event(1, '2024-10-05T15:00:00'), event(2, '2025-02-01T15:00:00'), event(3, '2024-09-01T15:00:00')
+    events = [hot, warm, cold]
+
+    assert schedule.due(events, NOW) == events   # Never refreshed
+
+    schedule.mark([1, 2, 3])
+    assert schedule.due(events, NOW) == []
+
+    two_minutes_ago = time.time() - 120
+    schedule.last_refreshed = {'1': two_minutes_ago, '2': two_minutes_ago, '3': two_minutes_ago}
+    assert schedule.due(events, NOW) == [hot]
+
+    schedule.seed({'1': datetime.now().isoformat()})
+    assert schedule.due(events, NOW) == []
+
+
+def test_retry_backoff_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(tjt_schedule, 'RETRY_DELAY', 60)
+    monkeypatch.setattr(tjt_schedule, 'RETRY_MAX_DELAY', 300)
+
+    def due_after(attempts, seconds):
+        failure = {'attempts': attempts, 'last_attempt': NOW.isoformat()}
+        return tjt_schedule.retry_due(failure, NOW + timedelta(seconds=seconds))
+
+    assert not due_after(1, 59) and due_after(1, 60)
+    assert not due_after(2, 119) and due_after(2, 120)
+    assert not due_after(3, 239) and due_after(3, 240)
+    assert not due_after(5, 299) and due_after(5, 300)   # 960s, capped
+    assert tjt_schedule.retry_due({'attempts': 1, 'last_attempt': None})
+
+
+def test_failed_events_are_due_on_their_backoff_not_their_tier():
+    schedule = tjt_schedule.TieredSchedule()
+    hot, warm = event(1, '2024-10-05T15:00:00'), event(2, '2025-02-01T15:00:00')
+    failures = {'2': {'attempts': 1, 'last_attempt': NOW.isoformat()}}
+
+    assert schedule.due([hot, warm], NOW, failures=failures) == [hot]
+    assert schedule.due([hot, warm], NOW + timedelta(seconds=tjt_schedule.RETRY_DELAY), failures=failures) == [hot, warm]
@@ -0,0 +1,125 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tjt_store
+
+
+def test_sales_season_rolls_over_when_sales_open(monkeypatch):
+    monkeypatch.delenv('TJT_SEASON', raising=False)
+
+    assert tjt_store.sales_season(datetime(2025, 6, 17, 23, 59)) == '2024-25'
+    assert tjt_store.sales_season(datetime(2025, 6, 18)) == '2025-26'
+    assert tjt_store.sales_season(datetime(2025, 7, 1)) == '2025-26'
+    assert tjt_store.sales_season(datetime(2026, 1, 10)) == '2025-26'
+    assert tjt_store.sales_open_date('2025-26') == datetime(2025, 6, 18)
+
+
+def changes(*rows):
+    return pd.DataFrame(rows, columns=['Id', 'EventId', 'TotalPrice', 'Change'])
+
+
+def test_history_as_of_replays_changes_up_to_the_time(store):
+    store.append_history(changes((1, 10, 100.0, 'new'), (2, 10, 200.0, 'new')), datetime(2024, 9, 1), baseline=True)
+    store.append_history(changes((2, 10, 250.0, 'updated'), (3, 11, 300.0, 'new')), datetime(2024, 9, 2))
+    store.append_history(changes((1, 10, 100.0, 'removed')), datetime(2024, 9, 3))
+
+    def as_of(when, event_ids=None):
+        df = store.history_as_of(when, event_ids)
+        return dict(zip(df['Id'], df['TotalPrice']))
+
+    assert store.history_as_of(datetime(2024, 8, 31)).empty
+    assert as_of(datetime(2024, 9, 1)) == {1: 100.0, 2: 200.0}
+    assert as_of(datetime(2024, 9, 2, 12)) == {1: 100.0, 2: 250.0, 3: 300.0}
+    assert as_of(datetime(2024, 9, 3)) == {2: 250.0, 3: 300.0}
+    assert as_of(datetime(2024, 9, 3), event_ids=[11]) == {3: 300.0}
+
+
+def test_history_as_of_starts_from_the_latest_baseline(store):
+    store.append_history(changes((1, 10, 100.0, 'new')), datetime(2024, 9, 1), baseline=True)
+    store.append_history(changes((2, 10, 200.0, 'new')), datetime(2024, 9, 2))
+    # A full rebuild no longer returns either transaction
+    store.append_history(changes((3, 10, 300.0, 'new')), datetime(2024, 9, 3), baseline=True)
+
+    assert store.history_as_of(datetime(2024, 9, 2))['Id'].tolist() == [1, 2]
+    assert store.history_as_of(datetime(2024, 9, 4))['Id'].tolist() == [3]
+
+
+def two_season_sales():
+    rows = [
+        # EventId, kick-off, created, total
+        (1, "2023-09-02 15:00", "2023-07-10 09:00", 400.0),
+        (2, "2024-03-09 17:30", "2023-12-01 10:00", 500.0),
+        (3, "2024-09-21 17:30", "2024-08-01 11:00", 690.0),
+        (4, "2025-01-18 15:00", "2024-11-20 12:00", 621.0),
+    ]
+    df = pd.DataFrame(rows, columns=["EventId", "KickOffEventStart", "CreatedOn", "TotalPrice"])
+    for col in ("KickOffEventStart", "CreatedOn"):
+        df[col] = pd.to_datetime(df[col])
+    return df
+
+
+def read_partitions(store, monkeypatch):
+    """
+    Records the partition files each load reads.
+    """
+    paths = []
+    read = store._read_partitions
+
+    def recording(part_paths, columns=None):
+        paths.extend(os.path.basename(path) for path in part_paths)
+        return read(part_paths, columns)
+
+    monkeypatch.setattr(store, '_read_partitions', recording)
+    return paths
+
+
+def test_load_snapshot_prunes_season_partitions(store, monkeypatch):
+    sales = two_season_sales()
+    store.write_snapshot(sales, sales)
+    assert set(store.load_meta()['partitions']['sales']) == {'season=2023-24', 'season=2024-25'}
+    paths = read_partitions(store, monkeypatch)
+
+    current = store.load_snapshot('sales', seasons=['2024-25'])
+    assert current['EventId'].tolist() == [3, 4]
+    assert paths == ['season=2024-25.parquet']
+
+    paths.clear()
+    recent = store.load_snapshot('sales', created_from=datetime(2024, 1, 1))
+    assert recent['EventId'].tolist() == [3, 4]
+    assert paths == ['season=2024-25.parquet']
+
+    paths.clear()
+    assert store.load_snapshot('sales', seasons=['2022-23']).empty
+    assert paths == []
+
+    assert sorted(store.load_snapshot('sales')['EventId']) == [1, 2, 3, 4]
+
+
+def test_history_is_checkpointed_and_pruned(store, monkeypatch):
+    monkeypatch.setattr(store, 'HISTORY_CHECKPOINT_PARTS', 3)
+    monkeypatch.setattr(store, 'HISTORY_RETENTION_DAYS', 10)
+    start = datetime(2024, 9, 1)
+    store.append_history(changes((1, 10, 100.0, 'new')), start, baseline=True)
+    for day in range(1, 7):
+        store.append_history(changes((1, 10, 100.0 + day, 'updated'), (day + 1, 10, 10.0 * day, 'new')),
+                             start + timedelta(days=day))
+
+    kinds = [kind for _, kind, _ in store._history_parts()]
+    assert kinds == ['baseline'] + ['changes'] * 3 + ['checkpoint'] + ['changes'] * 3 + ['checkpoint']
+    # Reads replay from the checkpoint and match what the parts before it gave
+    as_of = store.history_as_of(start + timedelta(days=5))
+    assert dict(zip(as_of['Id'], as_of['TotalPrice'])) == {1: 105.0, 2: 10.0, 3: 20.0, 4: 30.0, 5: 40.0, 6: 50.0}
+    assert len(store.read_history()) == 1 + 2 * 6   # Checkpoints aren't changes
+
+    # Ten days on, only what as-of reads from the cutoff need is kept
+    store.append_history(changes((1, 10, 200.0, 'removed')), start + timedelta(days=14))
+    kinds = [kind for _, kind, _ in store._history_parts()]
+    assert kinds == ['checkpoint'] + ['changes'] * 3 + ['checkpoint', 'changes']
+    assert store.history_as_of(start + timedelta(days=2)).empty
+    assert sorted(store.history_as_of(start + timedelta(days=14))['Id']) == [2, 3, 4, 5, 6, 7]
+    assert store.history_as_of(start + timedelta(days=6)).set_index('Id')['TotalPrice'][1] == 106.0
@@ -0,0 +1,282 @@
+"""
+End-to-end benchmark for the tjt_hosp_api ingestion pipeline.
+
+For each data scale (multiples of one real season, see tjt_synthetic.py) this
+serves synthetic data from tjt_mock_server.py and times every pipeline stage
+in a fresh worker process:
+
+    token, accounts, events, transactions, enrichment, dates, seats (seat
+    split), dedup (tjt_hosp_api.dedupe_sales), persistence, seat_view
+    (on-demand seat rows), refresh (full end-to-end), refresh_incremental
+    (nothing changed)
+
+Each stage records wall time, peak RSS and rows/sec. Results are appended to
+tjt_benchmarks/results.jsonl (with the git commit) so runs can be compared
+over time; --compare prints the latest run against the previous one.
+
+Usage:
+    python tjt_benchmark.py                        # scales 1 and 10
+    python tjt_benchmark.py --scales 1 10 100 --latency 0.05
+    python tjt_benchmark.py --compare
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tjt_benchmarks')
+RESULTS_FILE = os.path.join(BENCHMARK_DIR, 'results.jsonl')
+DATA_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tjt_mock_data')
+DEFAULT_SCALES = [1, 10]
+REGRESSION_THRESHOLD = 0.10   # Flag stages more than 10% slower than the previous run
+
+
+class PeakRSS:
+    """
+    Context manager tracking the peak resident set size (bytes) of this
+    process while the block runs, by sampling /proc/self/statm. Where /proc
+    isn't available it falls back to the process-lifetime ru_maxrss.
+    """
+
+    INTERVAL = 0.005
+
+    def __init__(self):
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def current():
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.current())
+            self._stop.wait(self.INTERVAL)
+
+    def __enter__(self):
+        self.peak = self.current()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+class StageTimer:
+    """
+    Collects one result dict per timed stage.
+    """
+
+    def __init__(self):
+        self.results = []
+
+    def run(self, stage, func, rows=None):
+        """
+        Times func(); rows is an int or a callable taking func's result.
+        Returns func's result.
+        """
+        with PeakRSS() as rss:
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+        row_count = rows(result) if callable(rows) else rows
+        self.results.append({
+            'stage': stage,
+            'seconds': round(elapsed, 4),
+            'peak_rss_mb': round(rss.peak / 2 ** 20, 1),
+            'rows': row_count,
+            'rows_per_sec': round(row_count / elapsed, 1) if row_count and elapsed else None,
+        })
+        return result
+
+
+def run_stages():
+    """
+    Worker side: runs every pipeline stage once against TJT_BASE_URL and
+    returns the per-stage results. tjt_store writes go to TJT_STORE_DIR.
+    """
+    import pandas as pd
+    import tjt_client
+    import tjt_hosp_api
+    import tjt_store
+
+    timer = StageTimer()
+    timer.run('token', tjt_client.token_provider.get_token, rows=1)
+    accounts_df = timer.run('accounts', tjt_hosp_api.fetch_accounts, rows=len)
+    events = timer.run('events', tjt_hosp_api.fetch_events, rows=len)
+    all_transactions, _ = timer.run(
+        'transactions', lambda: tjt_hosp_api.fetch_all_event_transactions([event['Id'] for event in events]),
+        rows=lambda result: sum(len(transactions or []) for transactions in result[0]))
+
+    def enrich():
+        index = tjt_hosp_api.update_guest_index(accounts_df, {})
+        return pd.DataFrame([tjt_hosp_api.merge_transaction(event, transaction, index)
+                             for event, transactions in zip(events, all_transactions)
+                             for transaction in transactions or []])
+    df = timer.run('enrichment', enrich, rows=len)
+
+    def parse_dates():
+        tjt_hosp_api._timestamp_memo.clear()
+        for col in tjt_hosp_api.TIMESTAMP_COLUMNS:
+            if col in df.columns:
+                df[col] = tjt_hosp_api.parse_datetimes(df[col])
+        return df
+    timer.run('dates', parse_dates, rows=len(df))
+
+    def split_seats():
+        return tjt_hosp_api.project_without_seats(tjt_hosp_api.build_final_df(df, seats=False))
+    projected_df = timer.run('seats', split_seats, rows=len)
+
+    sales_df = timer.run('dedup', lambda: tjt_hosp_api.dedupe_sales(projected_df), rows=len(projected_df))
+
+    timer.run('persistence', lambda: tjt_store.write_snapshot(df, sales_df), rows=len(df))
+    timer.run('seat_view', tjt_hosp_api.seat_level_view, rows=len)
+
+    # The number the sales floor feels: a whole refresh, cold and then with nothing new
+    tjt_client.client.forget()
+    tjt_hosp_api._timestamp_memo.clear()
+    timer.run('refresh', lambda: tjt_hosp_api.refresh(full=True), rows=len)
+    timer.run('refresh_incremental', tjt_hosp_api.refresh, rows=len)
+    return timer.results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def benchmark_scale(scale, latency=0.0, seed=0):
+    """
+    Generates (or reuses) data for one scale, serves it from the mock server
+    and runs the stages in a fresh worker process. Returns the results.
+    """
+    import tjt_mock_server
+    import tjt_synthetic
+
+    data_dir = os.path.join(DATA_ROOT, f'x{scale:g}')
+    if not os.path.exists(os.path.join(data_dir, 'events.json')):
+        tjt_synthetic.generate(data_dir, scale, seed)
+
+    server, base_url = tjt_mock_server.start_server(tjt_mock_server.MockConfig(data_dir, latency=latency))
+    try:
+        with tempfile.TemporaryDirectory() as store_dir:
+            env = {
+                **os.environ,
+                'TJT_BASE_URL': base_url,
+                'TJT_STORE_DIR': store_dir,
+                'TJT_REQUESTS_PER_SECOND': '0',   # Measure the pipeline, not the request budget
+            }
+            worker = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker'],
+                                    env=env, capture_output=True, text=True)
+    finally:
+        server.shutdown()
+
+    if worker.returncode != 0:
+        print(worker.stdout[-2000:])
+        print(worker.stderr[-4000:])
+        raise RuntimeError(f"Benchmark worker failed at scale {scale} (exit code {worker.returncode})")
+    return json.loads(worker.stdout.strip().splitlines()[-1])
+
+
+def save_results(run):
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    with open(RESULTS_FILE, 'a') as f:
+        f.write(json.dumps(run) + '\n')
+
+
+def load_history():
+    try:
+        with open(RESULTS_FILE) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def print_run(run):
+    print(f"\nScale {run['scale']:g}x  (commit {run['commit']}, {run['timestamp']})")
+    print(f"{'stage':<22}{'seconds':>10}{'peak MB':>10}{'rows':>10}{'rows/s':>12}")
+    for result in run['stages']:
+        rows_per_sec = f"{result['rows_per_sec']:,.0f}" if result['rows_per_sec'] else '-'
+        print(f"{result['stage']:<22}{result['seconds']:>10.3f}{result['peak_rss_mb']:>10.1f}"
+              f"{result['rows'] or 0:>10}{rows_per_sec:>12}")
+
+
+def compare(history, threshold=REGRESSION_THRESHOLD):
+    """
+    Prints, for each scale, the latest run against the one before it and
+    flags stages that got slower by more than `threshold`.
+    Returns the number of regressions found.
+    """
+    regressions = 0
+    for scale in sorted({run['scale'] for run in history}):
+        runs = [run for run in history if run['scale'] == scale]
+        if len(runs) < 2:
+            print(f"\nScale {scale:g}x: only one run recorded")
+            continue
+        previous, latest = runs[-2], runs[-1]
+        before = {result['stage']: result for result in previous['stages']}
+        print(f"\nScale {scale:g}x: {previous['commit']} -> {latest['commit']}")
+        for result in latest['stages']:
+            old = before.get(result['stage'])
+            if not old or not old['seconds']:
+                continue
+            change = result['seconds'] / old['seconds'] - 1
+            flag = '  ⚠️ regression' if change > threshold else ''
+            regressions += bool(flag)
+            print(f"  {result['stage']:<22}{old['seconds']:>9.3f}s -> {result['seconds']:>9.3f}s ({change:+.0%}){flag}")
+    return regressions
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark the TJT ingestion pipeline.")
+    arg_parser.add_argument('--scales', type=float, nargs='+', default=DEFAULT_SCALES,
+                            help="Data scales to run (default: %(default)s)")
+    arg_parser.add_argument('--latency', type=float, default=0.0, help="Mock API latency per request, seconds")
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--compare', action='store_true', help="Compare the last two recorded runs and exit")
+    arg_parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args(argv)
+
+    if args.worker:
+        # Stage logs go to stderr so stdout carries only the results line
+        stdout, sys.stdout = sys.stdout, sys.stderr
+        results = run_stages()
+        sys.stdout = stdout
+        print(json.dumps(results))
+        return
+
+    if args.compare:
+        sys.exit(1 if compare(load_history()) else 0)
+
+    for scale in args.scales:
+        run = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'scale': scale,
+            'latency': args.latency,
+            'stages': benchmark_scale(scale, args.latency, args.seed),
+        }
+        save_results(run)
+        print_run(run)
+
+
+if __name__ == "__main__":
+    main()
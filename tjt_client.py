@@ -0,0 +1,590 @@
+"""
+Shared access to the TJT export API (https://www.tjhub3.com/export_arsenal).
+
+Every module that talks to TJT gets its bearer token from the one
+TokenProvider here, so a process makes one password-grant call per token
+lifetime however many pages, threads or refreshes need it.
+
+All GETs go through the shared TJTClient, which adds connection pooling,
+timeouts, jittered retries, a process-wide request budget and conditional
+requests (ETag / Last-Modified, falling back to payload hashing) so an
+unchanged endpoint is neither re-downloaded nor re-parsed. Large list
+endpoints can be streamed record by record (stream_records) instead of being
+decoded whole.
+
+Events/List feeds both the sales pipeline (tjt_hosp_api) and the inventory
+pipeline (tjt_inventory); get_events() shares one fetch of it between them
+for EVENTS_MAX_AGE seconds, so both are built from the same event list.
+"""
+import codecs
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Point TJT_BASE_URL at tjt_mock_server.py to run everything offline
+BASE_URL = os.getenv("TJT_BASE_URL", "https://www.tjhub3.com/export_arsenal").rstrip('/')
+TOKEN_URL = f"{BASE_URL}/token"
+
+# OAuth2 password-grant credentials
+USERNAME = os.getenv("TJT_USERNAME", "hospitality")
+PASSWORD = os.getenv("TJT_PASSWORD", "OkMessageSectionType000!")
+
+POOL_SIZE = int(os.getenv("TJT_POOL_SIZE", "16"))                      # Pooled connections to TJT
+REQUESTS_PER_SECOND = float(os.getenv("TJT_REQUESTS_PER_SECOND", "10"))  # Global request budget
+REQUEST_BURST = int(os.getenv("TJT_REQUEST_BURST", "20"))
+TIMEOUT = (10, 120)         # (connect, read) seconds
+MAX_RETRIES = 4
+BACKOFF = 0.5               # Base seconds for exponential backoff
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+STREAM_CHUNK_SIZE = 64 * 1024   # Bytes read at a time by stream_records
+SPOOL_MAX_SIZE = 8 * 1024 * 1024  # Bodies spooled for fingerprinting go to disk beyond this
+
+EVENTS_PATH = "Events/List"
+EVENTS_MAX_AGE = float(os.getenv("TJT_EVENTS_MAX_AGE", "30"))   # Seconds one Events/List fetch is shared
+
+DEFAULT_EXPIRES_IN = 3600   # Assumed token lifetime if TJT doesn't send expires_in
+REFRESH_MARGIN = 120        # Renew this many seconds before the token actually expires
+
+
+class TokenProvider:
+    """
+    Thread-safe, expiry-aware cache for the TJT bearer token.
+
+    The token is reused until REFRESH_MARGIN seconds before it expires.
+    Refreshes are single-flight: if many threads find the token stale at
+    once, one of them fetches a new token while the rest wait on the lock
+    and then reuse its result. Connection errors and timeouts on the token
+    endpoint are retried with the same backoff as TJTClient's GETs.
+    """
+
+    def __init__(self, token_url=TOKEN_URL, username=USERNAME, password=PASSWORD,
+                 refresh_margin=REFRESH_MARGIN, session=None, max_retries=MAX_RETRIES, backoff=BACKOFF):
+        self.token_url = token_url
+        self.username = username
+        self.password = password
+        self.refresh_margin = refresh_margin
+        self.session = session or requests.Session()
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._lock = threading.Lock()
+        self._token = None
+        self._expires_at = 0.0
+
+    def _is_fresh(self):
+        return self._token is not None and time.monotonic() < self._expires_at - self.refresh_margin
+
+    def get_token(self, force=False):
+        """
+        Returns a valid access token (fetching one if needed), or None if
+        TJT refuses the credentials. Raises TJTError if the token endpoint
+        can't be reached after all retries.
+        """
+        if not force and self._is_fresh():
+            return self._token
+
+        stale_token = self._token
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            if self._is_fresh() and (not force or self._token != stale_token):
+                return self._token
+            self._fetch()
+            return self._token
+
+    def invalidate(self):
+        """
+        Drops the cached token, e.g. after TJT answers 401 with it.
+        """
+        with self._lock:
+            self._token = None
+            self._expires_at = 0.0
+
+    def _fetch(self):
+        data = {
+            'Username': self.username,
+            'Password': self.password,
+            'grant_type': 'password'
+        }
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(self.token_url, headers=headers, data=data, timeout=30)
+                break
+            except requests.RequestException as e:
+                if attempt >= self.max_retries:
+                    self._token = None
+                    self._expires_at = 0.0
+                    raise TJTError(self.token_url, str(e))
+                time.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+                attempt += 1
+        if response.status_code == 200:
+            token_data = response.json()
+            self._token = token_data.get('access_token')
+            expires_in = token_data.get('expires_in', DEFAULT_EXPIRES_IN)
+            self._expires_at = time.monotonic() + float(expires_in)
+        else:
+            print(f"Failed to retrieve access token: {response.status_code} - {response.text}")
+            self._token = None
+            self._expires_at = 0.0
+
+
+class TJTError(Exception):
+    """
+    Raised when a TJT request still fails after all retries.
+    """
+
+    def __init__(self, url, message, status_code=None):
+        super().__init__(f"{url}: {message}")
+        self.url = url
+        self.status_code = status_code
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket: allows `rate` requests per second on average,
+    with bursts of up to `burst`.
+    """
+
+    def __init__(self, rate=REQUESTS_PER_SECOND, burst=REQUEST_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_WHITESPACE = ' \t\n\r'
+
+def iter_json_array(chunks, key):
+    """
+    Yields the elements of the first JSON array stored under `key` (e.g.
+    "HospitalitySaleTransactions") in a JSON document arriving as byte chunks.
+    Elements are decoded one at a time, so only the current element and one
+    chunk are held in memory rather than the whole body and object graph.
+    Yields nothing if the key never appears.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    marker = f'"{key}"'
+    buffer = ''
+    pos = 0
+    in_array = False
+    finished = False
+    chunks = iter(chunks)
+
+    def read_more():
+        nonlocal buffer, pos, finished
+        chunk = next(chunks, None)
+        if chunk is None:
+            finished = True
+            buffer = buffer[pos:] + text_decoder.decode(b'', final=True)
+        else:
+            buffer = buffer[pos:] + text_decoder.decode(chunk)
+        pos = 0
+
+    while True:
+        if not in_array:
+            # Look for "key" : [
+            found = buffer.find(marker, pos)
+            if found >= 0:
+                cursor = found + len(marker)
+                while cursor < len(buffer) and buffer[cursor] in _WHITESPACE:
+                    cursor += 1
+                if cursor < len(buffer) and buffer[cursor] == ':':
+                    cursor += 1
+                    while cursor < len(buffer) and buffer[cursor] in _WHITESPACE:
+                        cursor += 1
+                if cursor >= len(buffer) and not finished:
+                    pos = found
+                    read_more()
+                    continue
+                if buffer[cursor:cursor + 1] == '[':
+                    in_array = True
+                    pos = cursor + 1
+                else:
+                    pos = found + len(marker)
+                continue
+            if finished:
+                return
+            # Keep enough of the tail to catch a marker split across chunks
+            pos = max(pos, len(buffer) - len(marker))
+            read_more()
+            continue
+
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE + ',':
+            pos += 1
+        if pos >= len(buffer):
+            if finished:
+                raise ValueError(f"JSON array '{key}' is truncated")
+            read_more()
+            continue
+        if buffer[pos] == ']':
+            return
+        try:
+            element, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if finished:
+                raise
+            read_more()
+            continue
+        if not finished and not isinstance(element, (dict, list, str)) and (
+                end >= len(buffer) or buffer[end] not in _WHITESPACE + ',]'):
+            # A number (or literal) not followed by a delimiter may continue in
+            # the next chunk: '1' of '1.25' decodes fine on its own
+            read_more()
+            continue
+        pos = end
+        yield element
+
+
+class ColumnBuffer:
+    """
+    Collects records column-wise ({column: [values]}) as they are streamed,
+    so no per-record dicts are kept. Columns first seen part-way through are
+    back-filled with None; pass .columns straight to pd.DataFrame.
+    """
+
+    def __init__(self):
+        self.columns = {}
+        self.length = 0
+
+    def append(self, record):
+        for name, value in record.items():
+            column = self.columns.get(name)
+            if column is None:
+                column = self.columns[name] = [None] * self.length
+            column.append(value)
+        self.length += 1
+        if len(record) < len(self.columns):
+            for column in self.columns.values():
+                if len(column) < self.length:
+                    column.append(None)
+
+    def __len__(self):
+        return self.length
+
+
+class TJTClient:
+    """
+    Pooled, rate-limited, retrying GET client for the TJT export API.
+
+    get_json(path, params) returns (payload, changed). When TJT answers 304
+    Not Modified, or returns a body byte-identical to the last one for the
+    same URL, the previously parsed payload is returned with changed=False,
+    so callers can also skip their own processing.
+    """
+
+    def __init__(self, base_url=BASE_URL, tokens=None, pool_size=POOL_SIZE, timeout=TIMEOUT,
+                 max_retries=MAX_RETRIES, backoff=BACKOFF, limiter=None):
+        self.base_url = base_url.rstrip('/')
+        self.tokens = tokens or token_provider
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.limiter = limiter or RateLimiter()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._validators = {}   # url -> {'etag', 'last_modified', 'digest', 'payload'}
+        self._validators_lock = threading.Lock()
+
+    def url(self, path):
+        return path if path.startswith('http') else f"{self.base_url}/{path.lstrip('/')}"
+
+    def _sleep_before_retry(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = float(retry_after)
+        else:
+            delay = self.backoff * (2 ** attempt)
+        time.sleep(delay * random.uniform(0.5, 1.5))
+
+    def get(self, path, params=None, headers=None, stream=False):
+        """
+        GET with auth, timeout, rate limiting and retries on connection errors,
+        timeouts, 429 and 5xx. A 401 drops the cached token and retries once
+        with a fresh one. Returns the final requests.Response (any status);
+        raises TJTError if every attempt failed at the connection level.
+        With stream=True the body is left unread; close the response when done.
+        """
+        url = self.url(path)
+        reauthenticated = False
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                # The token fetch retries on its own and raises TJTError when TJT can't be reached
+                request_headers = {
+                    'Authorization': f'Bearer {self.tokens.get_token()}',
+                    'Content-Type': 'application/json',
+                    **(headers or {}),
+                }
+                response = self.session.get(url, params=params, headers=request_headers, timeout=self.timeout, stream=stream)
+            except requests.RequestException as e:
+                if attempt >= self.max_retries:
+                    raise TJTError(url, str(e))
+                self._sleep_before_retry(attempt)
+                attempt += 1
+                continue
+
+            if response.status_code == 401 and not reauthenticated:
+                response.close()
+                self.tokens.invalidate()
+                reauthenticated = True
+                continue
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                response.close()
+                self._sleep_before_retry(attempt, response)
+                attempt += 1
+                continue
+            return response
+
+    def get_json(self, path, params=None, conditional=True):
+        """
+        Returns (payload, changed) for a JSON endpoint. Raises TJTError on a
+        non-200/304 answer. With conditional=False the validator cache is
+        bypassed and changed is always True.
+        """
+        url = self.url(path)
+        cache_key, cached, headers = self._conditional(url, params, conditional)
+        if cached and cached.get('payload') is None:
+            # Validators recorded by stream_records carry no payload to reuse
+            cached, headers = None, {}
+
+        response = self.get(url, params=params, headers=headers)
+        if response.status_code == 304 and cached:
+            return cached['payload'], False
+        if response.status_code != 200:
+            raise TJTError(url, f"{response.status_code} - {response.text[:500]}", response.status_code)
+
+        digest = hashlib.sha1(response.content).hexdigest()
+        if cached and cached['digest'] == digest:
+            return cached['payload'], False
+
+        payload = json.loads(response.content)
+        if conditional:
+            with self._validators_lock:
+                self._validators[cache_key] = {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'digest': digest,
+                    'payload': payload,
+                }
+        return payload, True
+
+    def _conditional(self, url, params, conditional):
+        """
+        Returns (cache_key, cached validators or None, conditional request headers).
+        """
+        cache_key = (url, tuple(sorted((params or {}).items())))
+        with self._validators_lock:
+            cached = self._validators.get(cache_key) if conditional else None
+
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+        return cache_key, cached, headers
+
+    def stream_records(self, path, key, sink=None, params=None, conditional=True):
+        """
+        Streams the records of the JSON array under `key` (e.g. "Guests") into
+        sink.append() one at a time, reading the body in STREAM_CHUNK_SIZE
+        chunks, so large list endpoints are decoded with bounded memory.
+        sink defaults to a list; a ColumnBuffer keeps records column-wise.
+
+        Returns (sink, changed). Only validators are cached, not the records,
+        so when TJT answers 304 Not Modified, or sends a body with the same
+        SHA-1 fingerprint as last time, the sink is returned untouched with
+        changed=False: callers must already hold the previous records (e.g.
+        in the stored snapshot). When a fingerprint is known the body is
+        spooled and hashed before decoding, so an unchanged one is never parsed.
+        Raises TJTError on a non-200/304 answer or if the stream breaks.
+        """
+        sink = [] if sink is None else sink
+        url = self.url(path)
+        cache_key, cached, headers = self._conditional(url, params, conditional)
+        known_digest = cached.get('digest') if cached else None
+
+        response = self.get(url, params=params, headers=headers, stream=True)
+        try:
+            if response.status_code == 304 and cached:
+                return sink, False
+            if response.status_code != 200:
+                raise TJTError(url, f"{response.status_code} - {response.text[:500]}", response.status_code)
+
+            hasher = hashlib.sha1()
+            try:
+                if known_digest:
+                    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as spool:
+                        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                            hasher.update(chunk)
+                            spool.write(chunk)
+                        if hasher.hexdigest() != known_digest:
+                            spool.seek(0)
+                            for record in iter_json_array(iter(lambda: spool.read(STREAM_CHUNK_SIZE), b''), key):
+                                sink.append(record)
+                else:
+                    def chunks():
+                        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                            hasher.update(chunk)
+                            yield chunk
+
+                    body = chunks()
+                    for record in iter_json_array(body, key):
+                        sink.append(record)
+                    for _ in body:  # Hash whatever follows the array
+                        pass
+            except (requests.RequestException, ValueError) as e:
+                raise TJTError(url, f"Failed reading streamed response: {e}")
+        finally:
+            response.close()
+
+        digest = hasher.hexdigest()
+        if conditional:
+            with self._validators_lock:
+                self._validators[cache_key] = {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'digest': digest,
+                    'payload': None,
+                }
+        return sink, digest != known_digest
+
+    def fingerprint(self, path, params=None):
+        """
+        Returns the validators (etag, last_modified, digest) recorded for a
+        URL, e.g. to persist them, or None.
+        """
+        cache_key, cached, _ = self._conditional(self.url(path), params, True)
+        if not cached:
+            return None
+        return {name: cached.get(name) for name in ('etag', 'last_modified', 'digest')}
+
+    def remember(self, path, fingerprint, params=None):
+        """
+        Seeds validators persisted from an earlier process (see fingerprint())
+        so the next stream_records() call can be conditional. Validators
+        already recorded in this process are kept.
+        """
+        if not fingerprint:
+            return
+        cache_key = (self.url(path), tuple(sorted((params or {}).items())))
+        with self._validators_lock:
+            self._validators.setdefault(cache_key, {**fingerprint, 'payload': None})
+
+    def forget(self, path=None):
+        """
+        Drops cached validators/payloads (for one path, or all of them).
+        """
+        with self._validators_lock:
+            if path is None:
+                self._validators.clear()
+            else:
+                url = self.url(path)
+                for key in [key for key in self._validators if key[0] == url]:
+                    del self._validators[key]
+
+
+class SharedPayload:
+    """
+    One JSON endpoint's payload shared by every pipeline in the process.
+    get() returns the cached payload while it is younger than max_age and
+    otherwise fetches it again; concurrent callers wait for a single fetch.
+    If a fetch fails, the last good payload is returned when there is one
+    (check fetched_at) and the caller allows stale data, else TJTError is
+    raised.
+    """
+
+    def __init__(self, path, max_age, client):
+        self.path = path
+        self.max_age = max_age
+        self.client = client
+        self.payload = None
+        self.fetched_at = None   # time.time() of the fetch that produced payload
+        self._lock = threading.Lock()
+
+    def get(self, max_age=None, allow_stale=True):
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            if self.payload is not None and time.time() - self.fetched_at < max_age:
+                return self.payload
+            try:
+                self.payload, _ = self.client.get_json(self.path)
+            except TJTError as e:
+                if self.payload is None or not allow_stale:
+                    raise
+                print(f"Failed to refresh {self.path}, reusing the copy from "
+                      f"{time.time() - self.fetched_at:.0f}s ago: {e}")
+                return self.payload
+            self.fetched_at = time.time()
+            return self.payload
+
+    def invalidate(self):
+        with self._lock:
+            self.payload = None
+            self.fetched_at = None
+
+
+# Process-wide provider and client shared by tjt_hosp_api, tjt_inventory and the portal pages
+token_provider = TokenProvider()
+client = TJTClient()
+events_payload = SharedPayload(EVENTS_PATH, EVENTS_MAX_AGE, client)
+
+
+def get_events(max_age=None, allow_stale=True):
+    """
+    Returns the events from Events/List (each with its HospitalityPackages and
+    Locations), fetched at most once per EVENTS_MAX_AGE seconds (or max_age)
+    for every caller in the process. If a due fetch fails, the last good list
+    is returned; pipelines that publish from it pass allow_stale=False to get
+    the TJTError instead. Raises TJTError if it has never been fetched
+    successfully.
+    """
+    payload = events_payload.get(max_age, allow_stale)
+    return payload.get('Data', {}).get('Events', [])
+
+
+def get_access_token(force=False):
+    """
+    Returns the shared access token, or None if it can't be fetched.
+    """
+    try:
+        return token_provider.get_token(force=force)
+    except TJTError as e:
+        print(f"Failed to retrieve access token: {e}")
+        return None
+
+
+def auth_headers():
+    """
+    Request headers carrying a valid bearer token.
+    """
+    return {
+        'Authorization': f'Bearer {get_access_token()}',
+        'Content-Type': 'application/json'
+    }
@@ -0,0 +1,133 @@
+"""
+Pre-aggregated sales cube behind the MBM Sales page (sales_performance).
+
+The sales frame is summed once per snapshot at the grain
+
+    Fixture Name x KickOffEventStart x EventCompetition x Day (CreatedOn) x
+    CreatedBy x SaleLocation x Package Name x IsPaid x Discount x DiscountClass
+
+with measures TotalPrice, DiscountValue, Seats and Rows (transaction count).
+Every measure is additive, so the page's tables and metric cards are rollups
+of a slice of the cube (filter with slice_cube, then group and sum) rather
+than recomputations over every transaction on each widget change.
+
+IsPaid and Discount hold the strings the page filters on ('True', 'nan', ...).
+Given the execs the page can filter on, every other CreatedBy (mostly web
+guests) is collapsed into OTHER_CREATOR, which is what keeps the cube small.
+DiscountClass is 'credit' for credit / voucher style discounts (see
+CREDIT_KEYWORDS), whose DiscountValue is not a pending payment, else 'other'.
+
+Usage:
+    cube = tjt_cube.sales_cube(sales_df, execs)   # cached until sales_df changes
+    today = tjt_cube.slice_cube(cube, {'CreatedBy': ['dmontague']}, start=date.today())
+    by_package = tjt_cube.rollup(today, ['Package Name'])
+"""
+import re
+from datetime import timedelta
+
+import pandas as pd
+
+CUBE_DIMENSIONS = [
+    "Fixture Name", "KickOffEventStart", "EventCompetition", "Day", "CreatedBy",
+    "SaleLocation", "Package Name", "IsPaid", "Discount", "DiscountClass",
+]
+CUBE_MEASURES = ["TotalPrice", "DiscountValue", "Seats", "Rows"]
+
+# Discounts matching these are credits / vouchers rather than pending payments
+CREDIT_KEYWORDS = ["credit", "voucher", "gift voucher", "discount", "pldl"]
+
+OTHER_CREATOR = "(other)"
+
+# (sales frame id, execs) -> (sales frame, cube), for the frame the page last read
+_cubes = {}
+
+
+def discount_class(discounts):
+    """
+    Maps Discount strings to 'credit' (matches CREDIT_KEYWORDS) or 'other'.
+    """
+    pattern = '|'.join(re.escape(keyword) for keyword in CREDIT_KEYWORDS)
+    credit = pd.Series(discounts).str.contains(pattern, case=False, na=False)
+    return credit.map({True: 'credit', False: 'other'})
+
+
+def build_cube(sales_df, execs=None):
+    """
+    Aggregates a sales frame (filtered_df_without_seats) to the cube grain.
+    Rows with missing dimension values are kept (as NaN / NaT keys). With
+    execs, CreatedBy values not in it become OTHER_CREATOR.
+    """
+    created_by = sales_df["CreatedBy"]
+    if execs is not None:
+        created_by = created_by.astype(object).where(created_by.isin(list(execs)), OTHER_CREATOR)
+    frame = pd.DataFrame({
+        "Fixture Name": sales_df["Fixture Name"],
+        "KickOffEventStart": pd.to_datetime(sales_df["KickOffEventStart"], errors='coerce'),
+        "EventCompetition": sales_df["EventCompetition"],
+        "Day": pd.to_datetime(sales_df["CreatedOn"], errors='coerce').dt.floor('D'),
+        "CreatedBy": created_by,
+        "SaleLocation": sales_df["SaleLocation"],
+        "Package Name": sales_df["Package Name"],
+        "IsPaid": sales_df["IsPaid"].astype(str),
+        # Work on the (few) distinct discounts, not on every row
+        "Discount": sales_df["Discount"].astype(str).astype("category"),
+        "TotalPrice": pd.to_numeric(sales_df["TotalPrice"], errors='coerce'),
+        "DiscountValue": pd.to_numeric(sales_df["DiscountValue"], errors='coerce'),
+        "Seats": pd.to_numeric(sales_df["Seats"], errors='coerce'),
+        "Rows": 1,
+    })
+    classes = discount_class(frame["Discount"].cat.categories).to_numpy()
+    frame["DiscountClass"] = classes[frame["Discount"].cat.codes] if len(classes) else "other"
+
+    cube = (
+        frame.groupby(CUBE_DIMENSIONS, observed=True, dropna=False, sort=False)[CUBE_MEASURES]
+        .sum()
+        .reset_index()
+    )
+    for col in ("Fixture Name", "EventCompetition", "CreatedBy", "SaleLocation", "Package Name", "Discount"):
+        cube[col] = cube[col].astype("category")
+    return cube
+
+
+def sales_cube(sales_df, execs=None):
+    """
+    Returns the cube for a sales frame, building it only the first time this
+    frame object is seen (tjt_data / tjt_store.read_latest hand out the same
+    frame until a new snapshot is published). Treat it as read-only.
+    """
+    key = (id(sales_df), tuple(execs) if execs is not None else None)
+    cached = _cubes.get(key)
+    if cached is None or cached[0] is not sales_df:
+        # Sessions run in threads: another one may drop the same keys first
+        for stale_key in [k for k, (frame, _) in list(_cubes.items()) if frame is not sales_df]:
+            _cubes.pop(stale_key, None)
+        cached = _cubes[key] = (sales_df, build_cube(sales_df, execs))
+    return cached[1]
+
+
+def slice_cube(cube, filters=None, start=None, end=None):
+    """
+    Returns the cube rows matching filters (column -> value, or list of
+    values for IN) with start <= Day <= end (dates, either optional).
+    """
+    mask = pd.Series(True, index=cube.index)
+    if start is not None:
+        mask &= cube["Day"] >= pd.Timestamp(start).floor('D')
+    if end is not None:
+        mask &= cube["Day"] < pd.Timestamp(end).floor('D') + timedelta(days=1)
+    for column, value in (filters or {}).items():
+        if isinstance(value, (list, tuple, set, frozenset, pd.Index, pd.Series)):
+            mask &= cube[column].isin(list(value))
+        else:
+            mask &= cube[column] == value
+    return cube[mask]
+
+
+def rollup(cube, by=(), measures=CUBE_MEASURES):
+    """
+    Sums the measures over a (sliced) cube, grouped by the `by` dimensions.
+    With no `by`, returns a Series of totals.
+    """
+    if not by:
+        return cube[list(measures)].sum()
+    return cube.groupby(list(by), observed=True, dropna=False)[list(measures)].sum().reset_index()
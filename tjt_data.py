@@ -0,0 +1,142 @@
+"""
+Stale-while-revalidate access to the published TJT data for the dashboards.
+
+Every read returns the latest complete snapshot (or inventory table) straight
+from tjt_store, so rendering a page never waits on the TJT API. When what was
+read is older than its max age, a refresh is started in a background thread
+and the next render picks up the result. Refresh requests collapse into one:
+within a process a second request is ignored while one is running, and across
+processes (other Streamlit servers, tjt_refresher.py) tjt_store.refresh_lock
+lets only one of them refresh at a time.
+
+tjt_refresher.py stays the primary publisher; this keeps the dashboards fresh
+when it is not running or has fallen behind.
+
+Usage:
+    import tjt_data
+    sales_df = tjt_data.get_sales(seasons=[tjt_store.current_season()])
+    inventory_df = tjt_data.get_inventory()
+
+Settings (env):
+    TJT_SALES_MAX_AGE, TJT_INVENTORY_MAX_AGE, TJT_REFRESH_COOLDOWN
+"""
+import logging
+import os
+import threading
+import time
+
+import tjt_store
+
+SALES_MAX_AGE = float(os.getenv('TJT_SALES_MAX_AGE', '300'))          # seconds before sales are revalidated
+INVENTORY_MAX_AGE = float(os.getenv('TJT_INVENTORY_MAX_AGE', '600'))  # seconds before inventory is revalidated
+REFRESH_COOLDOWN = float(os.getenv('TJT_REFRESH_COOLDOWN', '60'))     # min seconds between background refreshes
+
+_lock = threading.Lock()
+_threads = {}    # 'sales' / 'inventory' -> running refresh thread
+_started = {}    # 'sales' / 'inventory' -> time.time() the last refresh started
+_schedule = None
+
+
+def _refresh_sales():
+    global _schedule
+    import tjt_hosp_api
+    import tjt_schedule
+    # Kept across refreshes so only events whose tier is due get fetched again;
+    # seeded with the refreshes published since (by tjt_refresher.py or other dashboards)
+    _schedule = _schedule or tjt_schedule.TieredSchedule()
+    _schedule.seed(tjt_store.load_meta().get('refreshed_at'))
+    sales_df = tjt_hosp_api.refresh(schedule=_schedule)
+    return f"{len(sales_df)} sales rows"
+
+
+def _refresh_inventory():
+    import tjt_inventory
+    inventory_df = tjt_inventory.get_inventory_data()
+    if inventory_df.empty:
+        # Events/List failed: an empty table would replace the last good one
+        logging.warning("⚠️ No inventory retrieved; dashboards keep serving the previous table")
+        return None
+    tjt_store.write_table('inventory', inventory_df)
+    return f"{len(inventory_df)} inventory rows"
+
+
+_REFRESHERS = {
+    'sales': (_refresh_sales, tjt_store.snapshot_age),
+    'inventory': (_refresh_inventory, lambda: tjt_store.table_age('inventory')),
+}
+
+
+def _run_refresh(name, max_age):
+    refresh, age = _REFRESHERS[name]
+    started = time.time()
+    try:
+        with tjt_store.refresh_lock(name) as acquired:
+            if not acquired:
+                logging.info(f"🔄 {name.capitalize()} refresh already running in another process")
+                return
+            current_age = age()
+            if current_age is not None and current_age < max_age:
+                return  # Published by another process since this refresh was requested
+            published = refresh()
+    except Exception:
+        logging.exception(f"❌ Background {name} refresh failed; dashboards keep serving the previous data")
+        return
+    if published is None:
+        return  # Nothing to publish; the refresh logged why
+    logging.info(f"✅ Background {name} refresh published {published} in {time.time() - started:.1f}s")
+
+
+def request_refresh(name, max_age=0.0):
+    """
+    Starts a background refresh of 'sales' or 'inventory' unless one is
+    already running in this process or started less than REFRESH_COOLDOWN
+    seconds ago. Never blocks. Returns True if a refresh was started.
+    """
+    with _lock:
+        thread = _threads.get(name)
+        if thread is not None and thread.is_alive():
+            return False
+        if time.time() - _started.get(name, 0.0) < REFRESH_COOLDOWN:
+            return False
+        thread = threading.Thread(target=_run_refresh, args=(name, max_age), name=f'tjt-refresh-{name}', daemon=True)
+        _threads[name] = thread
+        _started[name] = time.time()
+        thread.start()
+    logging.info(f"🔄 Background {name} refresh started")
+    return True
+
+
+def refreshing(name):
+    """
+    Returns True while a background refresh of `name` runs in this process.
+    """
+    thread = _threads.get(name)
+    return thread is not None and thread.is_alive()
+
+
+def _revalidate(name, max_age):
+    _, age = _REFRESHERS[name]
+    current_age = age()
+    if current_age is None or current_age >= max_age:
+        request_refresh(name, max_age)
+
+
+def get_sales(seasons=None, created_from=None, max_age=SALES_MAX_AGE):
+    """
+    Returns the latest published sales frame (see tjt_store.read_latest; an
+    empty DataFrame before the first snapshot), and starts a background
+    refresh if it is older than max_age seconds. Treat it as read-only.
+    """
+    sales_df = tjt_store.read_latest('sales', seasons=seasons, created_from=created_from)
+    _revalidate('sales', max_age)
+    return sales_df
+
+
+def get_inventory(max_age=INVENTORY_MAX_AGE):
+    """
+    Returns the latest published inventory table (empty before the first
+    one), and starts a background refresh if it is older than max_age seconds.
+    """
+    inventory_df = tjt_store.read_table('inventory')
+    _revalidate('inventory', max_age)
+    return inventory_df
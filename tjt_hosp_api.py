@@ -1,238 +1,636 @@
-import requests
 import json
-import pandas as pd 
-from datetime import datetime, timedelta
-
-# OAuth2 endpoint and credentials
-token_url = 'https://www.tjhub3.com/export_arsenal/token'
-Username = 'hospitality'
-Password = 'OkMessageSectionType000!'
-grant_type = 'password'
-
-# Global variable for storing token expiry time
-token_expiry_time = None
-
-def get_access_token():
-    global token_expiry_time
-    headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-    data = {
-        'Username': Username,
-        'Password': Password,
-        'grant_type': grant_type
-    }
-    response = requests.post(token_url, headers=headers, data=data, verify=True)
-    if response.status_code == 200:
-        token_data = response.json()
-        access_token = token_data.get('access_token')
-        expires_in = token_data.get('expires_in', 3600)  # Assuming 1 hour default if not provided
-        token_expiry_time = datetime.now() + timedelta(seconds=expires_in)
-        return access_token
-    else:
-        print(f"Failed to retrieve access token: {response.status_code} - {response.text}")
-        return None
-
-def refresh_token_if_needed():
-    global token_expiry_time, access_token
-    if token_expiry_time is None or datetime.now() >= token_expiry_time:
-        access_token = get_access_token()
-
-# Initial token retrieval
-access_token = get_access_token()
-
-# Set up the headers with the access token
-headers = {
-    'Authorization': f'Bearer {access_token}',
-    'Content-Type': 'application/json'
-}
-
-# Step 1: Retrieve the list of accounts (Guests)
-refresh_token_if_needed()
-accounts_url = "https://www.tjhub3.com/export_arsenal/Accounts/List"
-response = requests.get(accounts_url, headers=headers)
-
-if response.status_code == 200:
-    accounts_data = response.json().get('Data', {}).get('Guests', [])
-    # Create a DataFrame for accounts to merge later
-    accounts_df = pd.DataFrame(accounts_data)
-else:
-    print(f"Failed to retrieve accounts list: {response.status_code} - {response.text}")
-    accounts_df = pd.DataFrame()
-
-# Step 2: Retrieve the list of events
-refresh_token_if_needed()
-event_list_url = "https://www.tjhub3.com/export_arsenal/Events/List"
-response = requests.get(event_list_url, headers=headers)
-
-if response.status_code == 200:
-    events_data = response.json()
-    event_list = events_data.get('Data', {}).get('Events', [])
-else:
-    print(f"Failed to retrieve event list: {response.status_code} - {response.text}")
-    event_list = []
-
-# Step 3: Initialize an empty list to hold the merged data
-merged_data = []
-
-# Step 4: Retrieve transaction data for each event and merge with event details
-for event in event_list:
-    event_id = event['Id']
-    fixture_name = event['Name']  # Renamed as Fixture Name
-
-    refresh_token_if_needed()
-    transaction_url = f"https://www.tjhub3.com/export_arsenal/HospitalitySaleTransactions/List?EventId={event_id}"
-    response = requests.get(transaction_url, headers=headers)
-
-    if response.status_code == 200:
-        transactions_data = response.json().get('Data', {}).get('HospitalitySaleTransactions', [])
-
-        for transaction in transactions_data:
-            # Merge event details with transaction data
-            merged_record = {"Fixture Name": fixture_name, **event, **transaction}
-
-            # Merge with Accounts data based on GuestId
-            guest_info = accounts_df[accounts_df['GuestId'] == transaction.get('GuestId')].to_dict(orient='records')
-            if guest_info:
-                merged_record.update({
-                    "First Name": guest_info[0].get("FirstName", ""),
-                    "Surname": guest_info[0].get("Surname", ""),
-                    "Email": guest_info[0].get("Email", ""),
-                    "Country Code": guest_info[0].get("CountryCode", ""),
-                    "PostCode": guest_info[0].get("PostCode", ""),
-                     "City": guest_info[0].get("City", ""),
-                    "CompanyName": guest_info[0].get("CompanyName", ""),
-                    "DOB": guest_info[0].get("DOB", ""),
-                    "GuestId": guest_info[0].get("GuestId", ""),
-                    "Status": guest_info[0].get("Status", ""),
-                    "IsSeasonal": guest_info[0].get("IsSeasonal", ""),
-                })
-            
-            merged_data.append(merged_record)
-    else:
-        print(f"Failed to retrieve transactions for EventId {event_id}: {response.status_code} - {response.text}")
-
-# Step 5: Convert the merged data into a DataFrame
-df = pd.DataFrame(merged_data)
-
-# Step 6: Save the initial merged DataFrame
-df.to_excel('merged_events_transactions1.xlsx', index=False)
-print('initial_merged_events_transactions_with_accounts.csv saved to folder')
+import os
+import time
+import pandas as pd
+import tjt_client
+import tjt_store
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
+# API endpoints
+accounts_url = f"{tjt_client.BASE_URL}/Accounts/List"
+transaction_url_template = tjt_client.BASE_URL + "/HospitalitySaleTransactions/List?EventId={}"
+
+# Max concurrent HospitalitySaleTransactions/List calls per refresh
+MAX_IN_FLIGHT = int(os.getenv('TJT_MAX_IN_FLIGHT', '8'))
+
+# Extra passes over the events whose fetch failed, at the end of a crawl.
+# Events still failing keep their last good rows, marked stale, and are
+# retried on later refreshes (see tjt_schedule.retry_due)
+EVENT_RETRY_ROUNDS = int(os.getenv('TJT_EVENT_RETRY_ROUNDS', '1'))
+
+# Seconds the cached guest dimension (tjt_store table 'guests') is trusted
+# before Accounts/List is fetched again
+GUEST_TTL = float(os.getenv('TJT_GUEST_TTL', '21600'))
+GUEST_TABLE = 'guests'
+
+################################################################################
+# API fetches
+################################################################################
+
+def fetch_accounts():
+    """
+    Step 1: Retrieve the list of accounts (Guests) as a DataFrame.
+    Guests are streamed straight into column buffers rather than decoding the
+    whole response first. Returns an empty DataFrame when the list is
+    unchanged since the last call (guest_index already holds it), or None
+    if the fetch failed.
+    """
+    buffer = tjt_client.ColumnBuffer()
+    try:
+        _, changed = tjt_client.client.stream_records(accounts_url, 'Guests', sink=buffer)
+    except tjt_client.TJTError as e:
+        print(f"Failed to retrieve accounts list: {e}")
+        return None
 
-# Helper function to parse datetime with varying precision
-from datetime import datetime
+    if not changed:
+        return pd.DataFrame()
+    return pd.DataFrame(buffer.columns)
 
+def fetch_events():
+    """
+    Step 2: Retrieve the list of events, from the Events/List fetch shared
+    with the inventory pipeline (see tjt_client.get_events).
+    """
+    try:
+        # A stale list would be published as current: fail like a direct fetch
+        return tjt_client.get_events(allow_stale=False)
+    except tjt_client.TJTError as e:
+        print(f"Failed to retrieve event list: {e}")
+        return []
+
+def fetch_event_transactions(event_id, sink=None):
+    """
+    Streams the transactions for a single event into sink (a list by default)
+    one record at a time.
+    Returns (sink, error). sink is None when the call fails, so the caller can
+    keep the event's previously stored rows and watermark. If TJT reports the
+    event's transactions unchanged, the sink comes back without new records;
+    otherwise its close() (if it has one) is called once the whole payload
+    has been streamed.
+    """
+    try:
+        sink, changed = tjt_client.client.stream_records(
+            transaction_url_template.format(event_id), 'HospitalitySaleTransactions', sink=sink)
+    except tjt_client.TJTError as e:
+        return None, str(e)
+    if changed and hasattr(sink, 'close'):
+        sink.close()
+
+    return sink, None
+
+def fetch_all_event_transactions(event_ids, max_in_flight=MAX_IN_FLIGHT, sink_factory=None,
+                                 retry_rounds=0):
+    """
+    Step 4: Fetches transactions for every event concurrently through the
+    shared TJT client (pooled connections, retries, request budget), with at
+    most max_in_flight requests outstanding. sink_factory(event_id)
+    optionally creates each event's sink (see EventTransactions); by default
+    each event gets a list.
+
+    Events that fail are queued and fetched again, with a fresh sink, for up
+    to retry_rounds more rounds once the rest of the crawl is done.
+
+    Returns (results, failures): results is a list of sinks (None for a
+    failed event) in the same order as event_ids; failures maps
+    EventId -> error message. One event failing never aborts the crawl.
+    """
+    sink_factory = sink_factory or (lambda event_id: None)
+    results = [None] * len(event_ids)
+    queue = list(range(len(event_ids)))
+    failures = {}
+    for attempt in range(retry_rounds + 1):
+        if attempt:
+            print(f"Retrying {len(queue)} failed events (round {attempt} of {retry_rounds})")
+        queued_ids = [event_ids[i] for i in queue]
+        with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as pool:
+            outcomes = list(pool.map(fetch_event_transactions, queued_ids, map(sink_factory, queued_ids)))
+
+        failures = {}
+        for i, (transactions, error) in zip(queue, outcomes):
+            results[i] = transactions
+            if error is not None:
+                failures[event_ids[i]] = error
+        queue = [i for i in queue if event_ids[i] in failures]
+        if not queue:
+            break
+
+    for event_id, error in failures.items():
+        print(f"Failed to retrieve transactions for EventId {event_id}: {error}")
+    return results, failures
+
+
+################################################################################
+# Watermarks & persisted store
+################################################################################
 
 from dateutil import parser
 
-def parse_datetime(date_str):
-    if date_str is None:
-        return None  # Return None if input is None
-    
+def _to_datetime(value):
+    if not value:
+        return None
+    try:
+        # Fast path: TJT emits ISO 8601 ('2024-11-18T15:48:38.46')
+        return datetime.fromisoformat(value).replace(tzinfo=None)
+    except (TypeError, ValueError):
+        pass
     try:
-        dt = parser.parse(date_str)  # Auto-detects format
-        return dt.strftime("%d-%m-%Y %H:%M")
+        # Anything else is read day-first, like the old '%d-%m-%Y %H:%M' strings
+        return parser.parse(value, dayfirst=True).replace(tzinfo=None)
     except Exception:
-        return date_str  # Return original if parsing fails
-
+        return None
 
+def transaction_timestamp(transaction):
+    """
+    Latest of CreatedOn / PaymentTime for a transaction, i.e. the last time
+    TJT touched it. A payment landing on an existing order moves it forward.
+    """
+    stamps = [_to_datetime(transaction.get(col)) for col in ('CreatedOn', 'PaymentTime')]
+    stamps = [s for s in stamps if s is not None]
+    return max(stamps) if stamps else None
+
+def load_watermarks(meta=None):
+    """
+    Returns {EventId (str): high-water mark (datetime)} from a snapshot's
+    meta (the latest snapshot by default).
+    """
+    raw = (tjt_store.load_meta() if meta is None else meta).get('watermarks', {})
+    return {event_id: datetime.fromisoformat(mark) for event_id, mark in raw.items()}
+
+def load_store(version=None, event_ids=None):
+    """
+    Returns the merged (event + transaction + guest) rows from a snapshot
+    (the latest by default), optionally only some events' rows, or an empty
+    DataFrame on first run.
+    """
+    return tjt_store.load_snapshot('merged', version, event_ids=event_ids)
+
+def upsert_transactions(store_df, new_records, removed_ids=()):
+    """
+    Merges new/changed merged records into the store, replacing any stored
+    row with the same transaction Id, and drops removed transaction Ids.
+    """
+    if removed_ids and not store_df.empty:
+        store_df = store_df[~store_df['Id'].isin(list(removed_ids))]
+    if not new_records:
+        return store_df
+    new_df = pd.DataFrame(new_records)
+    if store_df.empty:
+        return new_df
+    store_df = store_df[~store_df['Id'].isin(new_df['Id'])]
+    return pd.concat([store_df, new_df], ignore_index=True)
+
+# Transaction columns kept in the change log (tjt_store.append_history)
+HISTORY_COLUMNS = [
+    "Id", "EventId", "Fixture Name", "KickOffEventStart", "EventCompetition", "Name", "Type", "PackageId",
+    "GuestId", "CreatedOn", "CreatedBy", "SaleLocation", "PaymentTime", "IsPaid", "IsCancel", "Seats",
+    "Price", "Discount", "DiscountValue", "TotalPrice",
+]
 
-final_data = []
+def log_changes(store_df, new_records, removed_ids, changed_at, baseline=False):
+    """
+    Appends this refresh's changes to the transaction history: each new
+    record is 'new' or 'updated' (its Id was already stored), each removed Id
+    is logged with its last stored values. A baseline (full refresh) logs
+    every transaction of the resulting store as 'new', including stored rows
+    kept as they are. Returns the number of changes logged.
+    """
+    if baseline:
+        changes = upsert_transactions(store_df, new_records, removed_ids).assign(Change='new')
+        changes = changes[[col for col in HISTORY_COLUMNS if col in changes.columns] + ['Change']]
+        tjt_store.append_history(changes, changed_at, baseline=True)
+        return len(changes)
+
+    new_df = pd.DataFrame(new_records)
+    if not new_df.empty:
+        stored_ids = store_df['Id'] if not store_df.empty else pd.Series(dtype=object)
+        new_df['Change'] = new_df['Id'].isin(stored_ids).map({True: 'updated', False: 'new'})
+    removed_df = pd.DataFrame()
+    if removed_ids and not store_df.empty:
+        removed_df = store_df[store_df['Id'].isin(list(removed_ids))].assign(Change='removed')
+
+    frames = [frame for frame in (new_df, removed_df) if not frame.empty]
+    changes = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['Change'])
+    changes = changes[[col for col in HISTORY_COLUMNS if col in changes.columns] + ['Change']]
+    tjt_store.append_history(changes, changed_at)
+    return len(changes)
+
+
+################################################################################
+# Merging
+################################################################################
+
+# Accounts (Guests) fields copied onto each transaction: merged column -> Accounts column
+GUEST_FIELDS = {
+    "First Name": "FirstName",
+    "Surname": "Surname",
+    "Email": "Email",
+    "Country Code": "CountryCode",
+    "PostCode": "PostCode",
+    "City": "City",
+    "CompanyName": "CompanyName",
+    "DOB": "DOB",
+    "GuestId": "GuestId",
+    "Status": "Status",
+    "IsSeasonal": "IsSeasonal",
+}
 
-for _, row in df.iterrows():
-    if row['TMSessionId']:
-        tm_session_data = json.loads(row['TMSessionId'])
-        seats = tm_session_data.get('Seats', [])
-        
-        # Extract LocationName from Locations if it's a list of dictionaries
-        if isinstance(row.get('Locations'), list) and row['Locations']:
-            location_info = row['Locations'][0]
-            location_name = location_info.get('LocationName', '')
-            location_order_id = location_info.get('Id')  # Extract the Order Id from the location
+# GuestId -> guest fields, kept across refreshes and updated from each accounts fetch
+guest_index = {}
+
+def _same_guest(old, new):
+    return all(old.get(col) == value or (pd.isna(old.get(col)) and pd.isna(value))
+               for col, value in new.items() if not isinstance(value, (list, dict)))
+
+def update_guest_index(accounts_df, index=None, changed=None):
+    """
+    Updates (in place) and returns a GuestId -> guest fields index built from
+    the accounts DataFrame. Where the export repeats a GuestId the first
+    record wins, as the old per-transaction scan did. GuestIds already in the
+    index whose details differ are added to the `changed` set, if given.
+    """
+    index = guest_index if index is None else index
+    if accounts_df.empty or 'GuestId' not in accounts_df.columns:
+        return index
+    records = accounts_df.drop_duplicates(subset='GuestId', keep='first').to_dict(orient='records')
+    for record in records:
+        guest = {merged_col: record.get(account_col, "") for merged_col, account_col in GUEST_FIELDS.items()}
+        previous = index.get(record['GuestId'])
+        if changed is not None and previous is not None and not _same_guest(previous, guest):
+            changed.add(record['GuestId'])
+        index[record['GuestId']] = guest
+    return index
+
+# time.time() of the last successful Accounts/List sync, and GuestIds no sync
+# has found yet (an orphan GuestId doesn't force another sync before the TTL
+# is up; rows stored for it get its details once a later sync finds it)
+_guests_synced_at = None
+_unknown_guests = set()
+# GuestIds whose details changed in a sync, until refresh() re-applies them to the stored rows
+_changed_guests = set()
+
+def load_guest_index():
+    """
+    Fills guest_index from the cached guest table when this process has none
+    yet. Returns the age of the cache in seconds (None if there isn't one).
+    """
+    global _guests_synced_at
+    age = tjt_store.table_age(GUEST_TABLE)
+    if not guest_index and age is not None:
+        guests_df = tjt_store.read_table(GUEST_TABLE)
+        for record in guests_df.to_dict(orient='records'):
+            guest_index[record['GuestId']] = record
+        _guests_synced_at = time.time() - age
+    return age
+
+def sync_guests():
+    """
+    Fetches Accounts/List, upserts it into guest_index by GuestId and saves
+    the whole index as the guest table. Guests whose details changed, and
+    previously unknown guests it finds, are queued for reapply_guests.
+    Returns the fetched accounts DataFrame (empty when the list is
+    unchanged), or None if the fetch failed; the guest dimension is then
+    left due, so the next refresh tries again.
+    """
+    global _guests_synced_at
+    accounts = fetch_accounts()
+    if accounts is None:
+        _guests_synced_at = None
+        return None
+    update_guest_index(accounts, changed=_changed_guests)
+    _guests_synced_at = time.time()
+    resolved = _unknown_guests & guest_index.keys()
+    _changed_guests.update(resolved)
+    _unknown_guests.difference_update(resolved)
+    if not accounts.empty:
+        tjt_store.write_table(GUEST_TABLE, pd.DataFrame(list(guest_index.values()), columns=list(GUEST_FIELDS)))
+    return accounts
+
+def refresh_guests(full=False):
+    """
+    Step 1b: Syncs the guest dimension if it is older than GUEST_TTL (or
+    full=True); otherwise the cached guests are reused. Returns the fetched
+    accounts DataFrame, empty when nothing was fetched (None if the fetch
+    failed).
+    """
+    load_guest_index()
+    if full or _guests_synced_at is None or time.time() - _guests_synced_at >= GUEST_TTL:
+        return sync_guests()
+    return pd.DataFrame()
+
+def attach_missing_guests(records):
+    """
+    Fills in guest details on merged records whose GuestId isn't in
+    guest_index yet, syncing Accounts/List once on demand for them.
+    Returns the number of records filled in.
+    """
+    missing = {record.get('GuestId') for record in records} - guest_index.keys() - _unknown_guests - {None}
+    if not missing:
+        return 0
+    print(f"Syncing accounts for {len(missing)} unseen guests")
+    sync_guests()
+    _unknown_guests.update(missing - guest_index.keys())
+    filled = 0
+    for record in records:
+        guest_id = record.get('GuestId')
+        if guest_id in missing and guest_id in guest_index:
+            record.update(guest_index[guest_id])
+            filled += 1
+    return filled
+
+def reapply_guests(store_df, guest_ids):
+    """
+    Copies the current guest_index details onto the stored rows of the given
+    GuestIds (guests edited since those rows were merged). Returns the
+    updated store and the EventIds whose rows changed.
+    """
+    guest_ids = [guest_id for guest_id in guest_ids if guest_id in guest_index]
+    if store_df.empty or not guest_ids or 'GuestId' not in store_df.columns:
+        return store_df, set()
+    rows = store_df['GuestId'].isin(guest_ids)
+    if not rows.any():
+        return store_df, set()
+    details = pd.DataFrame.from_dict({guest_id: guest_index[guest_id] for guest_id in guest_ids}, orient='index')
+    store_df = store_df.copy()
+    guest_of_row = store_df.loc[rows, 'GuestId']
+    for col in GUEST_FIELDS:
+        if col != 'GuestId' and col in store_df.columns and col in details.columns:
+            store_df[col] = store_df[col].astype(object)
+            store_df.loc[rows, col] = guest_of_row.map(details[col]).values
+    return store_df, set(store_df.loc[rows, 'EventId'].dropna().unique().tolist())
+
+def merge_transaction(event, transaction, index):
+    """
+    Merges event details and guest (Accounts) details onto a transaction,
+    looking the guest up in the GuestId index (O(1) per transaction).
+    """
+    merged_record = {"Fixture Name": event['Name'], **event, **transaction}
+
+    # Merge with Accounts data based on GuestId
+    guest_info = index.get(transaction.get('GuestId'))
+    if guest_info:
+        merged_record.update(guest_info)
+    return merged_record
+
+# Transaction fields compared against the stored row to spot in-place updates
+# (a payment, discount or cancellation that doesn't move the watermark)
+TRACKED_FIELDS = ["IsPaid", "PaymentTime", "Price", "Discount", "DiscountValue", "TotalPrice", "Seats",
+                  "PackageId", "GuestId", "IsCancel", "CancelTime"]
+
+def _tracked_value(value):
+    if value is None or value != value:   # None / NaN / NaT
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+def tracked_values(transaction):
+    return tuple(_tracked_value(transaction.get(field)) for field in TRACKED_FIELDS)
+
+def known_transactions(store_df):
+    """
+    Returns {EventId: {transaction Id: tracked_values}} for the stored rows.
+    """
+    known = {}
+    if store_df.empty:
+        return known
+    columns = [store_df[field] if field in store_df.columns else [None] * len(store_df) for field in TRACKED_FIELDS]
+    for event_id, transaction_id, *values in zip(store_df['EventId'], store_df['Id'], *columns):
+        known.setdefault(_tracked_value(event_id), {})[_tracked_value(transaction_id)] = tuple(map(_tracked_value, values))
+    return known
+
+class EventTransactions:
+    """
+    Sink for one event's streamed transactions (see fetch_event_transactions).
+    Keeps only transactions past the event's watermark, already merged with
+    event and guest details, so transactions we have stored are dropped as
+    they arrive instead of being held for the whole crawl. Tracks the new
+    high-water mark in .latest.
+
+    Given the event's stored transactions (`known`, see known_transactions),
+    transactions at or below the watermark are also kept when they are new
+    or their TRACKED_FIELDS changed, and once the whole payload has streamed
+    (close()) .removed holds the stored Ids TJT no longer returns.
+    """
+
+    def __init__(self, event, watermark=None, index=None, known=None):
+        self.event = event
+        self.watermark = watermark
+        self.latest = watermark
+        self.index = guest_index if index is None else index
+        self.known = known
+        self.records = []
+        self.seen = set()
+        self.removed = set()
+
+    def append(self, transaction):
+        stamp = transaction_timestamp(transaction)
+        if self.known is not None:
+            self.seen.add(transaction.get('Id'))
+        # Anything without a timestamp can't be watermarked, so always re-merge it
+        if self.watermark is not None and stamp is not None and stamp <= self.watermark:
+            stored = None if self.known is None else self.known.get(transaction.get('Id'))
+            if self.known is None or stored == tracked_values(transaction):
+                return
+        self.records.append(merge_transaction(self.event, transaction, self.index))
+        if stamp is not None and (self.latest is None or stamp > self.latest):
+            self.latest = stamp
+
+    def close(self):
+        if self.known is not None:
+            self.removed = self.known.keys() - self.seen
+
+
+# TJT timestamp columns normalised to datetime64 (minute precision) at ingest
+TIMESTAMP_COLUMNS = ["KickOffEventStart", "CreatedOn", "PaymentTime"]
+
+# Raw timestamp string -> parsed Timestamp. Kickoff values repeat on every
+# transaction of a fixture, and most CreatedOn values repeat across refreshes.
+_timestamp_memo = {}
+_TIMESTAMP_MEMO_LIMIT = 500_000
+
+def parse_datetimes(values):
+    """
+    Parses a column of TJT timestamp strings to datetime64[ns], floored to the
+    minute (the precision the old '%d-%m-%Y %H:%M' strings carried).
+
+    Only distinct, not-yet-seen strings are parsed: first in bulk as ISO 8601,
+    then per value with dateutil for anything the fast path rejects.
+    Unparseable values become NaT.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.floor('min')
+
+    if len(_timestamp_memo) > _TIMESTAMP_MEMO_LIMIT:
+        _timestamp_memo.clear()
+
+    unseen = [value for value in values.dropna().unique() if value not in _timestamp_memo]
+    if unseen:
+        try:
+            parsed = pd.to_datetime(pd.Series(unseen, dtype=object), format='ISO8601', errors='coerce')
+        except (TypeError, ValueError):
+            parsed = None
+        if parsed is not None and pd.api.types.is_datetime64_any_dtype(parsed):
+            if parsed.dt.tz is not None:
+                parsed = parsed.dt.tz_localize(None)
+            parsed = parsed.tolist()
         else:
-            location_name = ''
-            location_order_id = None
-
-        # Handle the extraction of the Package Name, especially for 'Platinum' under 'Seasonal Membership'
-        package_name = row.get('Name')
-        if row.get('Type') == 'Seasonal Membership' and 'Platinum' in row.get('Name', ''):
-            package_name = 'Platinum'
-        
-        for seat in seats:
-            seat_record = {
-                "Order Id": row["Id"],  # Use Location Id if available, otherwise use row Id
-                "EventId": row.get("EventId"),
-                "First Name": row.get("First Name"),
-                "Surname": row.get("Surname"),
-                "CompanyName": row.get("CompanyName"),
-                "DOB": row.get("DOB"),
-                "Email": row.get("Email"),
-                "IsSeasonal": row.get("IsSeasonal"),
-                "Country Code": row.get("Country Code"),
-                "PostCode": row.get("PostCode"),
-                "City": row.get("City"),
-                "Status": row.get("Status"),
-                "GLCode": row.get("GLCode"),
-                "PackageId": row.get("PackageId"),
-                "GuestId": row.get("GuestId"),
-                "CRCCode": row.get("CRCCode"),
-                "Fixture Name": row["Fixture Name"],
-                "EventCategory": row.get("EventCategory"),
-                "EventCompetition": row.get("EventCompetition"),
-                "Type": row.get("Type"),
-                "KickOffEventStart": parse_datetime(row.get("KickOffEventStart")),
-                "Package Name": package_name,  # Use the updated logic for Package Name
-                "LocationName": location_name,  # Adding the LocationName
-                "Price": row.get("Price"),
-                "Seats": row.get("Seats", seat.get("Seats")),
-                "PriceBandName": seat.get("PriceBandName"),
-                "Row": seat.get("Row"),
-                "Seat Number": seat.get("Number"),
-                "AreaName": seat.get("AreaName"),
-                "BlockId": seat.get("BlockId"),
-                "Discount": row.get("Discount"),
-                "DiscountValue": row.get("DiscountValue"),
-                "IsPaid": row.get("IsPaid"),
-                "TotalPrice": row.get("TotalPrice"),
-                "CreatedOn": parse_datetime(row.get("CreatedOn")),
-                "PaymentTime": parse_datetime(row.get("PaymentTime")),
-                "CreatedBy": row.get("CreatedBy"),
-                "SaleLocation": row.get("SaleLocation"),
-            }
-            
-            final_data.append(seat_record)
+            # Mixed offsets / non-string values: let the slow path handle them
+            parsed = [pd.NaT] * len(unseen)
+        for raw, stamp in zip(unseen, parsed):
+            if pd.isna(stamp):
+                stamp = pd.Timestamp(_to_datetime(raw) if isinstance(raw, str) else pd.NaT)
+            _timestamp_memo[raw] = stamp
+
+    parsed = pd.to_datetime(values.map(_timestamp_memo), errors='coerce')
+    return parsed.dt.floor('min')
+
+
+# Seat-level record layout: output column -> (source, field). Source 'row' reads
+# the merged transaction, 'seat' reads the seat from the TMSessionId JSON.
+SEAT_RECORD_FIELDS = {
+    "Id": ("row", "Id"),
+    "Order Id": ("row", "Id"),
+    "EventId": ("row", "EventId"),
+    "First Name": ("row", "First Name"),
+    "Surname": ("row", "Surname"),
+    "CompanyName": ("row", "CompanyName"),
+    "DOB": ("row", "DOB"),
+    "Email": ("row", "Email"),
+    "IsSeasonal": ("row", "IsSeasonal"),
+    "Country Code": ("row", "Country Code"),
+    "PostCode": ("row", "PostCode"),
+    "City": ("row", "City"),
+    "Status": ("row", "Status"),
+    "GLCode": ("row", "GLCode"),
+    "PackageId": ("row", "PackageId"),
+    "GuestId": ("row", "GuestId"),
+    "CRCCode": ("row", "CRCCode"),
+    "Fixture Name": ("row", "Fixture Name"),
+    "EventCategory": ("row", "EventCategory"),
+    "EventCompetition": ("row", "EventCompetition"),
+    "Type": ("row", "Type"),
+    "KickOffEventStart": ("row", "KickOffEventStart"),
+    "Package Name": ("row", "Package Name"),
+    "LocationName": ("row", "LocationName"),
+    "Price": ("row", "Price"),
+    "Seats": ("row", "Seats"),
+    "PriceBandName": ("seat", "PriceBandName"),
+    "Row": ("seat", "Row"),
+    "Seat Number": ("seat", "Number"),
+    "AreaName": ("seat", "AreaName"),
+    "BlockId": ("seat", "BlockId"),
+    "Discount": ("row", "Discount"),
+    "DiscountValue": ("row", "DiscountValue"),
+    "IsPaid": ("row", "IsPaid"),
+    "TotalPrice": ("row", "TotalPrice"),
+    "CreatedOn": ("row", "CreatedOn"),
+    "PaymentTime": ("row", "PaymentTime"),
+    "CreatedBy": ("row", "CreatedBy"),
+    "SaleLocation": ("row", "SaleLocation"),
+}
+
+def _column(frame, name):
+    """
+    frame[name], or an all-None column when the API didn't send that field.
+    """
+    if name in frame.columns:
+        return frame[name]
+    return pd.Series(None, index=frame.index, dtype=object)
+
+def _parse_sessions(session_strings):
+    """
+    Parses TMSessionId JSON strings in one json.loads call (as a JSON array),
+    falling back to per-value parsing if any payload is malformed.
+    """
+    if session_strings.empty:
+        return []
+    try:
+        return json.loads('[' + ','.join(session_strings) + ']')
+    except ValueError:
+        return [json.loads(value) for value in session_strings]
+
+def build_final_df(df, seats=True):
+    """
+    Step 7: Expands each merged transaction into one row per seat (from the
+    TMSessionId JSON), or keeps the transaction row as-is when there is no
+    seat data. Transactions whose session holds no seats produce no rows.
+
+    With seats=False, transactions with seats get a single row without the
+    seat fields (AreaName, PriceBandName, Row, Seat Number, BlockId): all
+    that filter_without_seats needs, at a fraction of the cost. Seat-level
+    rows are built on demand by seat_level_view().
+
+    Done column-wise: the session JSON is parsed in bulk, seats are exploded
+    in one operation and location/package fields are derived as columns.
+    Row order matches the merged input (seats stay next to their order).
+    """
+    df = df.reset_index(drop=True)
+
+    # Timestamps are normalised once, before the frame is split
+    for col in TIMESTAMP_COLUMNS:
+        if col in df.columns:
+            df[col] = parse_datetimes(df[col])
+
+    # First location on the order (name + location-level Order Id)
+    first_location = _column(df, 'Locations').map(lambda locs: locs[0] if isinstance(locs, list) and locs else {})
+    location_name = first_location.map(lambda loc: loc.get('LocationName', ''))
+    location_id = pd.Series([loc.get('Id') for loc in first_location], index=df.index, dtype=object)
+
+    # 'Platinum' packages under 'Seasonal Membership' are reported as plain 'Platinum'
+    names = _column(df, 'Name')
+    is_platinum = (_column(df, 'Type') == 'Seasonal Membership') & names.fillna('').astype(str).str.contains('Platinum', regex=False)
+    package_name = names.where(~is_platinum, 'Platinum')
+
+    tm_sessions = _column(df, 'TMSessionId')
+    has_session = tm_sessions.notna() & tm_sessions.astype(bool)
+
+    # Seat rows: one per seat in the session JSON (or one per seated transaction)
+    sessions = pd.Series(_parse_sessions(tm_sessions[has_session]), index=df.index[has_session], dtype=object)
+    seat_lists = sessions.map(lambda session: session.get('Seats', []) or [])
+    if seats:
+        seat_items = seat_lists.explode().dropna()
+        seat_fields = pd.DataFrame(seat_items.tolist(), index=seat_items.index)
     else:
-        # Handle the scenario where there is no TMSessionId
-        if isinstance(row.get('Locations'), list) and row['Locations']:
-            row['LocationName'] = row['Locations'][0].get('LocationName', '')
-            row['Order Id'] = row['Locations'][0].get('Id') or row["Id"]  # Use Location Id if available
-        else:
-            row['LocationName'] = ''
-            row['Order Id'] = row["Id"]
+        seat_items = seat_lists[seat_lists.map(lambda seat_list: any(seat is not None for seat in seat_list))]
+        seat_fields = pd.DataFrame(index=seat_items.index)
+    seat_rows = df.loc[seat_items.index]
+    seat_derived = {
+        "Package Name": package_name.loc[seat_items.index],
+        "LocationName": location_name.loc[seat_items.index],
+        "Seats": _column(seat_rows, 'Seats') if 'Seats' in df.columns else _column(seat_fields, 'Seats'),
+    }
+    seat_df = pd.DataFrame({
+        out_col: seat_derived[out_col] if out_col in seat_derived
+        else _column(seat_rows if source == 'row' else seat_fields, field)
+        for out_col, (source, field) in SEAT_RECORD_FIELDS.items()
+        if seats or source == 'row'
+    }, index=seat_items.index)
 
-        # Handle the extraction of the Package Name for rows without TMSessionId
-        if row.get('Type') == 'Seasonal Membership' and 'Platinum' in row.get('Name', ''):
-            row['Package Name'] = 'Platinum'
-        else:
-            row['Package Name'] = row.get('Name')
+    # Transactions without seat data keep every merged column
+    plain_df = df.loc[~has_session].copy()
+    plain_df['LocationName'] = location_name[~has_session]
+    plain_location_id = location_id[~has_session]
+    plain_df['Order Id'] = plain_location_id.where(plain_location_id.notna() & plain_location_id.astype(bool), plain_df['Id'])
+    plain_df['Package Name'] = package_name[~has_session]
 
-        # Convert date strings to desired format
-        row['CreatedOn'] = parse_datetime(row.get("CreatedOn"))
-        row['KickOffEventStart'] = parse_datetime(row.get("KickOffEventStart"))
-        
-        # Append the transaction without seat details
-        final_data.append(row)
+    # Step 8: Stitch both back together in the original transaction order
+    final_df = pd.concat([seat_df, plain_df], sort=False)
+    return final_df.sort_index(kind='stable').reset_index(drop=True).infer_objects()
 
-# Step 8: Convert final_data to a DataFrame
-final_df = pd.DataFrame(final_data)
 
 # Step 9: Filter the DataFrame to include only the desired columns
 filtered_columns_without_seat_data = [
     "Order Id", "KickOffEventStart", "EventCategory", "EventCompetition", "Fixture Name","Type", "Package Name", "LocationName", "PackageId", "EventId", "GuestId",
-    "Seats", "CRCCode", "Price", "Discount","DiscountValue", "IsPaid", "PaymentTime", "CreatedOn", "CreatedBy", "TotalPrice", "GLCode", "SaleLocation","DiscountValue",
-    "IsPaid", "PaymentTime", "CreatedOn", "CreatedBy", "TotalPrice", "GLCode", "SaleLocation", "CompanyName", "DOB",
-    "GuestId", "Status", "IsSeasonal","First Name", "Surname", "Email", "Country Code", "PostCode", "City"
+    "Seats", "CRCCode", "Price", "Discount","DiscountValue", "IsPaid", "PaymentTime", "CreatedOn", "CreatedBy", "TotalPrice", "GLCode", "SaleLocation",
+    "CompanyName", "DOB", "Status", "IsSeasonal","First Name", "Surname", "Email", "Country Code", "PostCode", "City"
 ]
 
+# One row of filtered_df_without_seats per transaction and location: the seat
+# rows of a transaction share all of these and collapse into one row. (Order Id
+# can't be used: for transactions without seats it is the location's Id, which
+# several transactions share.)
+SALES_KEY = ["EventId", "Id", "LocationName"]
+
 filtered_columns_with_seat_data = [
     "Order Id", "KickOffEventStart", "EventCategory", "EventCompetition", "Fixture Name", "Type", "Package Name", "LocationName","PackageId", "EventId", "GuestId",
     "Seats", "AreaName", "PriceBandName", "Seat Number", "Row", "BlockId", "CRCCode", "Price", "Discount",
@@ -240,45 +638,322 @@ filtered_columns_with_seat_data = [
     "First Name", "Surname", "Email", "Country Code", "PostCode"
 ]
 
-# Ensure that you are only selecting columns that exist in the final DataFrame
-filtered_columns_without_seats = [col for col in final_df.columns if col in filtered_columns_without_seat_data]
-
-# Filter the DataFrame based on the filtered columns
-filtered_df_without_seats = final_df[filtered_columns_without_seats].drop_duplicates()
-
-# Print the type to confirm it's a DataFrame
-print(type(filtered_df_without_seats))  # This will print <class 'pandas.core.frame.DataFrame'>
-
-# If you want to print the first 5 rows of the DataFrame, use:
-
-print(filtered_df_without_seats.head(5))
-
-# # Save the filtered DataFrames into separate tabs of an Excel file
-with pd.ExcelWriter('filtered_hosp_data2.xlsx') as writer:
-    filtered_df_without_seats.to_excel(writer, sheet_name='Without seating information', index=False)
-    print(f'filtered_hosp_data1 saved')
-    
-
-
+def dedupe_on_key(df, key):
+    """
+    Keeps one row for each value of the key columns, so the cost scales with
+    the key's width rather than the row's. Only rows sharing a key are
+    compared on their other columns: those that differ are all kept (they are
+    different sales) and counted as conflicts. Returns (deduplicated
+    DataFrame, number of conflicting keys).
+    """
+    key = [col for col in key if col in df.columns]
+    if not key or df.empty:
+        return df, 0
+    repeated = df.duplicated(subset=key, keep=False)
+    if not repeated.any():
+        return df, 0
+    distinct = ~df[repeated].duplicated(keep='first')
+    distinct_rows = df[repeated][distinct]
+    conflicts = len(distinct_rows[distinct_rows.duplicated(subset=key)].drop_duplicates(subset=key))
+    keep = ~repeated
+    keep[repeated] = distinct.to_numpy()
+    return df[keep], conflicts
+
+def project_without_seats(final_df):
+    """
+    Returns final_df's filtered_columns_without_seat_data columns, plus any
+    SALES_KEY column they don't include (filter_without_seats drops those
+    again after the dedup).
+    """
+    # Ensure that you are only selecting columns that exist in the final DataFrame
+    filtered_columns_without_seats = [col for col in final_df.columns if col in filtered_columns_without_seat_data]
+    key_columns = [col for col in SALES_KEY if col in final_df.columns and col not in filtered_columns_without_seats]
+    return final_df[filtered_columns_without_seats + key_columns]
+
+def dedupe_sales(projected_df):
+    """
+    Collapses seat rows of a project_without_seats() frame to one row per
+    transaction and location (see SALES_KEY) and drops the key-only columns.
+    """
+    deduped, conflicts = dedupe_on_key(projected_df, SALES_KEY)
+    if conflicts:
+        print(f"Warning: {conflicts} transactions under {SALES_KEY} have rows that differ; kept every distinct row")
+    return deduped.drop(columns=[col for col in SALES_KEY if col not in filtered_columns_without_seat_data], errors='ignore')
+
+def filter_without_seats(final_df):
+    return dedupe_sales(project_without_seats(final_df))
+
+def filter_with_seats(final_df):
+    # Seat-level projection: one row per seat, no dedup
+    filtered_columns_with_seats = [col for col in final_df.columns if col in filtered_columns_with_seat_data]
+    return final_df[filtered_columns_with_seats]
+
+# (snapshot version, seasons, event Ids) -> seat-level view, most recent last
+_seat_views = {}
+SEAT_VIEW_CACHE_SIZE = 4
+
+def seat_level_view(event_ids=None, seasons=None, version=None):
+    """
+    Returns seat-level sales (filtered_columns_with_seat_data, one row per
+    seat) for a snapshot (the latest by default), optionally limited to some
+    events / seasons. Refreshes don't build seat rows; they are expanded from
+    the snapshot's merged store on first request and cached per snapshot
+    version. Treat the frame as read-only.
+    """
+    version = version or tjt_store.latest_version()
+    if version is None:
+        return pd.DataFrame(columns=filtered_columns_with_seat_data)
+    key = (version, tuple(sorted(seasons)) if seasons is not None else None,
+           tuple(sorted(event_ids)) if event_ids is not None else None)
+    if key not in _seat_views:
+        merged = tjt_store.load_snapshot('merged', version, seasons=seasons, event_ids=event_ids)
+        view = filter_with_seats(build_final_df(merged)) if not merged.empty else pd.DataFrame(columns=filtered_columns_with_seat_data)
+        while len(_seat_views) >= SEAT_VIEW_CACHE_SIZE:
+            _seat_views.pop(next(iter(_seat_views)))
+        _seat_views[key] = view
+    return _seat_views[key]
+
+
+# Column dtypes for filtered_df_without_seats: categoricals for repeated text,
+# nullable integers for ids/counts, float64 for money, real booleans.
+# (Timestamps are already datetime64 from build_final_df.)
+SALES_SCHEMA = {
+    "Fixture Name": "category",
+    "Package Name": "category",
+    "LocationName": "category",
+    "Type": "category",
+    "EventCategory": "category",
+    "EventCompetition": "category",
+    "CreatedBy": "category",
+    "SaleLocation": "category",
+    "Discount": "category",
+    "GLCode": "category",
+    "Status": "category",
+    "Country Code": "category",
+    "City": "category",
+    "Order Id": "Int64",
+    "PackageId": "Int64",
+    "EventId": "Int64",
+    "GuestId": "Int64",
+    "Seats": "Int64",
+    "Price": "float64",
+    "DiscountValue": "float64",
+    "TotalPrice": "float64",
+    "IsPaid": "boolean",
+}
 
-# # Only select columns that exist in the DataFrame
-# filtered_columns_without_seats = [col for col in final_df.columns if col in filtered_columns_without_seat_data]
-# filtered_df_without_seats = final_df[filtered_columns_without_seats].drop_duplicates()
+_BOOLEAN_VALUES = {'true': True, '1': True, 'false': False, '0': False}
+
+def apply_schema(df, schema=SALES_SCHEMA):
+    """
+    Returns a copy of df with SALES_SCHEMA dtypes applied to the columns it
+    has. Values that don't fit (non-numeric ids, unknown booleans) become NA.
+    """
+    df = df.copy()
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if dtype == "boolean":
+            if not pd.api.types.is_bool_dtype(values):
+                values = values.map(lambda value: _BOOLEAN_VALUES.get(str(value).strip().lower()) if pd.notna(value) else None)
+            df[col] = values.astype("boolean")
+        elif dtype in ("Int64", "float64"):
+            df[col] = pd.to_numeric(values, errors='coerce').astype(dtype)
+        else:
+            df[col] = values.astype(dtype)
+    return df
+
+
+################################################################################
+# Refresh
+################################################################################
+
+def refresh(full=False, schedule=None):
+    """
+    Incrementally refreshes the hospitality sales data.
+
+    Guest details come from the cached guest dimension (see refresh_guests);
+    Accounts/List is only fetched when that is older than GUEST_TTL or new
+    transactions reference unseen GuestIds. Guests a sync finds edited are
+    re-applied to their stored rows (see reapply_guests), and those events'
+    sales rows are rebuilt.
+
+    For every event, transactions are fetched and only those whose
+    CreatedOn/PaymentTime is past the event's stored high-water mark, or
+    whose tracked fields differ from the stored row, are merged with
+    event/guest details and upserted into the merged frame from the latest
+    snapshot; stored transactions TJT no longer returns are dropped. Every
+    change is appended to the transaction history (tjt_store.history_as_of).
+    Pass full=True to discard the store and rebuild from scratch.
+
+    Failed event fetches are retried EVENT_RETRY_ROUNDS times at the end of
+    the crawl. An event that still fails keeps its last good rows, watermark
+    and fingerprint (also through a full rebuild) and is recorded in the
+    snapshot meta's stale_events (see tjt_store.stale_events) until a later
+    refresh fetches it; with a schedule it is retried on a backoff (see
+    tjt_schedule.retry_due). If Events/List itself fails, nothing is
+    published and the previous snapshot's sales frame is returned.
+
+    Each event's payload fingerprint (ETag / SHA-1) is kept in the snapshot
+    meta, so unchanged events are neither parsed nor merged, and only events
+    with new transactions go through seat expansion again; the sales rows of
+    all other events are carried over from the previous snapshot. (Run with
+    full=True after changing how rows are built.)
+
+    With a tjt_schedule.TieredSchedule, only the events it reports as due are
+    fetched (all of them when full=True) and successfully fetched events are
+    marked on it; the rest keep their stored rows until their tier (or their
+    retry backoff) comes round.
+    If nothing is due, the previous snapshot's sales frame is returned as is
+    (and the snapshot is marked current, see tjt_store.mark_current).
+
+    The result is written as a new Parquet snapshot (see tjt_store); use
+    tjt_store.export_excel() for the old Excel files.
+
+    Returns filtered_df_without_seats built from the whole store.
+    """
+    latest = tjt_store.latest_version()
+    version = None if full else latest
+    meta = tjt_store.load_meta(version) if version else {}
+    last_meta = meta if version or not latest else tjt_store.load_meta(latest)
+    stale = last_meta.get('stale_events', {})
+    store_df = load_store(version) if version else pd.DataFrame()
+    previous_sales = tjt_store.load_snapshot('sales', version) if version else pd.DataFrame()
+    watermarks = load_watermarks(meta)
+    fingerprints = meta.get('fingerprints', {})
+    if full:
+        # Unconditional requests: a 304 would leave nothing to rebuild from
+        tjt_client.client.forget()
+
+    event_list = fetch_events()
+    if not event_list:
+        # Never publish a snapshot without events because Events/List failed
+        print("No events retrieved; keeping the previous snapshot")
+        return tjt_store.load_snapshot('sales', latest) if latest else pd.DataFrame()
+    due_events = event_list if schedule is None or full else schedule.due(event_list, failures=stale)
+    if schedule is not None:
+        print(f"Event tiers {schedule.summary(event_list)}: {len(due_events)} of {len(event_list)} events due")
+    if not due_events and not previous_sales.empty:
+        tjt_store.mark_current()
+        return previous_sales
+    due_ids = {str(event['Id']) for event in due_events}
+
+    refresh_guests(full)
+
+    # Seed each event's payload fingerprint from the snapshot, so an unchanged
+    # payload is answered 304 or recognised by its hash and never parsed
+    for event in due_events:
+        tjt_client.client.remember(transaction_url_template.format(event['Id']), fingerprints.get(str(event['Id'])))
+
+    # Transactions are filtered by watermark (and compared with the stored
+    # rows) and merged as they stream in
+    known = known_transactions(store_df)
+    events_by_id = {event['Id']: event for event in due_events}
+
+    def new_sink(event_id):
+        return EventTransactions(events_by_id[event_id], watermarks.get(str(event_id)), known=known.get(event_id, {}))
+
+    results, failures = fetch_all_event_transactions([event['Id'] for event in due_events], sink_factory=new_sink,
+                                                     retry_rounds=EVENT_RETRY_ROUNDS)
+    if schedule is not None:
+        schedule.mark(event['Id'] for event, sink in zip(due_events, results) if sink is not None)
+
+    changed_at = datetime.now()
+    refreshed_at = dict(last_meta.get('refreshed_at', {}))
+    new_records = []
+    removed_ids = set()
+    changed_events = set()
+    for event, sink in zip(due_events, results):
+        event_id = str(event['Id'])
+        if sink is None:
+            continue
+        refreshed_at[event_id] = changed_at.isoformat()
+        fingerprint = tjt_client.client.fingerprint(transaction_url_template.format(event['Id']))
+        if fingerprint:
+            fingerprints[event_id] = fingerprint
+        if sink.records or sink.removed:
+            changed_events.add(event['Id'])
+            new_records.extend(sink.records)
+            removed_ids.update(sink.removed)
+        if sink.latest is not None:
+            watermarks[event_id] = sink.latest
+
+    if full and failures and latest:
+        # A rebuild keeps serving the last good rows of events it couldn't fetch
+        store_df = load_store(latest, event_ids=list(failures))
+        last_watermarks = load_watermarks(last_meta)
+        last_fingerprints = last_meta.get('fingerprints', {})
+        for event_id in map(str, failures):
+            if event_id in last_watermarks:
+                watermarks[event_id] = last_watermarks[event_id]
+            if event_id in last_fingerprints:
+                fingerprints[event_id] = last_fingerprints[event_id]
+
+    # Events that still failed are stale until a later refresh fetches them;
+    # events that weren't due keep their entry (and retry backoff)
+    stale_events = {event_id: entry for event_id, entry in stale.items()
+                    if event_id not in due_ids and event_id in {str(event['Id']) for event in event_list}}
+    for event_id, error in failures.items():
+        previous = stale.get(str(event_id), {})
+        stale_events[str(event_id)] = {
+            'name': events_by_id[event_id].get('Name'),
+            'error': error,
+            'attempts': previous.get('attempts', 0) + 1,
+            'failed_since': previous.get('failed_since', changed_at.isoformat()),
+            'last_attempt': changed_at.isoformat(),
+            'last_refreshed': refreshed_at.get(str(event_id)),
+        }
+
+    attach_missing_guests(new_records)
+    print(f"Merged {len(new_records)} new or changed transactions and {len(removed_ids)} removals from "
+          f"{len(changed_events)} events ({len(due_events) - len(changed_events) - len(failures)} unchanged, "
+          f"{len(failures)} failed)")
+    if stale_events:
+        print(f"Serving the last good rows of {len(stale_events)} stale events: {sorted(stale_events)}")
+    # Rows merged before a guest was edited (in events not re-fetched too)
+    store_df, guest_events = reapply_guests(store_df, _changed_guests)
+    _changed_guests.clear()
+    if guest_events:
+        print(f"Re-applied edited guest details to {len(guest_events)} events")
+        changed_events |= guest_events
+    log_changes(store_df, new_records, removed_ids, changed_at, baseline=full or store_df.empty)
+    df = upsert_transactions(store_df, new_records, removed_ids)
+
+    if df.empty:
+        final_df = df
+        filtered_df_without_seats = df
+    elif previous_sales.empty or 'EventId' not in previous_sales.columns:
+        final_df = build_final_df(df, seats=False)
+        filtered_df_without_seats = apply_schema(filter_without_seats(final_df))
+    else:
+        # Only events with new transactions are re-expanded; every other
+        # event's rows are reused from the previous snapshot as they are
+        rebuild = df[df['EventId'].isin(changed_events)]
+        final_df = build_final_df(rebuild, seats=False) if not rebuild.empty else rebuild
+        if not changed_events:
+            filtered_df_without_seats = previous_sales
+        else:
+            kept = previous_sales[~previous_sales['EventId'].isin(changed_events)]
+            rebuilt = [filter_without_seats(final_df)] if not rebuild.empty else []
+            filtered_df_without_seats = apply_schema(pd.concat([kept, *rebuilt], ignore_index=True))
 
-# # Convert filtered_columns_without_seat_data to a DataFrame if it's a list
-# if isinstance(filtered_columns_without_seat_data, list):
-#     filtered_columns_without_seat_data = pd.DataFrame(filtered_columns_without_seat_data)
+    # Step 10: Publish merged + filtered frames (and the watermarks they reflect) as one snapshot;
+    # partitions of untouched events are carried over from the snapshot we started from
+    unchanged_events = set(store_df['EventId'].dropna().unique()) - changed_events if not store_df.empty else set()
+    version = tjt_store.write_snapshot(df, filtered_df_without_seats, base_version=version,
+                                      unchanged_events=unchanged_events, meta={
+        'watermarks': {event_id: mark.isoformat() for event_id, mark in watermarks.items()},
+        'fingerprints': fingerprints,
+        'refreshed_at': refreshed_at,
+        'stale_events': stale_events,
+        'changed_events': sorted(changed_events),
+    })
+    print(f"Snapshot {version} written ({len(filtered_df_without_seats)} rows)")
 
-# # Only select columns that exist in the DataFrame
-# filtered_columns_without_seats = [col for col in final_df.columns if col in filtered_columns_without_seat_data.columns]
-# filtered_df_without_seats = final_df[filtered_columns_without_seats].drop_duplicates()
+    return filtered_df_without_seats
 
 
-# # Only select columns that exist in the DataFrame
-# filtered_columns_with_seats = [col for col in final_df.columns if col in filtered_columns_with_seat_data]
-# filtered_df_with_seats = final_df[filtered_columns_with_seats]
 
-# # Save the filtered DataFrames into separate tabs of an Excel file
-# with pd.ExcelWriter('filtered_hosp_data.xlsx') as writer:
-#     filtered_df_without_seats.to_excel(writer, sheet_name='Without seat data', index=False)
-#     filtered_df_with_seats.to_excel(writer, sheet_name='With seat data', index=False)
+if __name__ == "__main__":
+    refresh()
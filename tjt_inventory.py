@@ -1,53 +1,17 @@
-import requests
-import json
 import pandas as pd 
-from datetime import datetime, timedelta
-
-# OAuth2 endpoint and credentials
-token_url = 'https://www.tjhub3.com/export_arsenal/token'
-event_list_url = "https://www.tjhub3.com/export_arsenal/Events/List"
-Username = 'hospitality'
-Password = 'OkMessageSectionType000!'
-grant_type = 'password'
-
-def get_access_token():
-    global token_expiry_time
-    headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-    data = {
-        'Username': Username,
-        'Password': Password,
-        'grant_type': grant_type
-    }
-    
-    response = requests.post(token_url, headers=headers, data=data, verify=True)
-    if response.status_code == 200:
-        token_data = response.json()
-        new_access_token = token_data.get('access_token')
-        expires_in = token_data.get('expires_in', 3600)
-        token_expiry_time = datetime.now() + timedelta(seconds=expires_in)
-        return new_access_token
-    else:
-        print(f"Failed to retrieve access token: {response.status_code} - {response.text}")
-        return None
-
-def refresh_token_if_needed():
-    global token_expiry_time, access_token
-    if token_expiry_time is None or datetime.now() >= token_expiry_time:
-        access_token = get_access_token()
+import tjt_client
 
 def fetch_events():
-    refresh_token_if_needed()
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Content-Type': 'application/json'
-    }
-    response = requests.get(event_list_url, headers=headers)
-    
-    if response.status_code == 200:
-        events_data = response.json()
-        return events_data.get('Data', {}).get('Events', [])
-    else:
-        print(f"Failed to retrieve event list: {response.status_code} - {response.text}")
+    """
+    Events (with their HospitalityPackages / Locations) from the Events/List
+    fetch shared with the sales pipeline (see tjt_client.get_events), so the
+    inventory and the sales snapshot describe the same event list.
+    """
+    try:
+        # A stale list would be published as current: fail like a direct fetch
+        return tjt_client.get_events(allow_stale=False)
+    except tjt_client.TJTError as e:
+        print(f"Failed to retrieve event list: {e}")
         return []
 
 def flatten_events(events):
@@ -142,9 +106,7 @@ def get_inventory_data(stock_file="/Users/cmunthali/Documents/PYTHON/APPS/stock_
     4. Merges on columns ["EventName", "PackageName"] (you can add more if you want)
     5. Returns the merged DataFrame
     """
-    global access_token
     # 1) Fetch
-    access_token = get_access_token()
     raw_events = fetch_events()
     
     # 2) Flatten
@@ -0,0 +1,287 @@
+"""
+Local stand-in for the TJT export API, for offline runs and benchmarking.
+
+Serves the endpoints our code calls:
+    POST /export_arsenal/token
+    GET  /export_arsenal/Events/List
+    GET  /export_arsenal/Accounts/List
+    GET  /export_arsenal/HospitalitySaleTransactions/List?EventId=<id>
+    GET  /export_arsenal/CateringPreorders/List?EventId=<id>
+    GET  /_stats                          (request counters, not part of TJT)
+
+Payloads come from a data directory laid out as:
+    <data>/events.json                    list of Events
+    <data>/accounts.json                  list of Guests
+    <data>/transactions/<EventId>.json    list of HospitalitySaleTransactions
+    <data>/preorders/<EventId>.json       list of CateringPreorders
+Missing files are served as empty lists. Fill the directory from the live API
+with the `record` command.
+
+Usage:
+    python tjt_mock_server.py record --data tjt_mock_data
+    python tjt_mock_server.py serve --data tjt_mock_data --port 8765 --latency 0.05 --failure-rate 0.02
+    TJT_BASE_URL=http://127.0.0.1:8765/export_arsenal python tjt_refresher.py --once
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tjt_mock_data')
+API_PREFIX = '/export_arsenal'
+
+# endpoint -> (key under Data, whether the payload is per EventId)
+ENDPOINTS = {
+    'Events/List': ('Events', False),
+    'Accounts/List': ('Guests', False),
+    'HospitalitySaleTransactions/List': ('HospitalitySaleTransactions', True),
+    'CateringPreorders/List': ('CateringPreorders', True),
+}
+
+# Data-directory file for each endpoint
+_FILES = {
+    'Events/List': 'events.json',
+    'Accounts/List': 'accounts.json',
+    'HospitalitySaleTransactions/List': 'transactions',
+    'CateringPreorders/List': 'preorders',
+}
+
+
+class MockConfig:
+    """
+    Behaviour knobs for the mock server.
+
+    latency       - base seconds added to every response
+    jitter        - extra random seconds (uniform 0..jitter) per response
+    failure_rate  - fraction of API calls answered with failure_status
+    failure_status
+    fail_events   - EventIds whose per-event calls always get failure_status
+    scale         - replicate each transaction list this many times (with
+                    fresh Ids) to grow payload sizes
+    token_ttl     - expires_in for issued tokens
+    etag          - send ETags and honour If-None-Match with 304s
+    """
+
+    def __init__(self, data_dir=DEFAULT_DATA_DIR, latency=0.0, jitter=0.0, failure_rate=0.0,
+                 failure_status=503, scale=1, token_ttl=3600, etag=True, fail_events=()):
+        self.data_dir = data_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.scale = max(1, int(scale))
+        self.token_ttl = token_ttl
+        self.etag = etag
+        self.fail_events = {str(event_id) for event_id in fail_events}
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def _scale_records(records, scale):
+    if scale <= 1 or not records:
+        return records
+    max_id = max((record.get('Id') or 0 for record in records), default=0)
+    scaled = list(records)
+    for copy in range(1, scale):
+        scaled.extend({**record, 'Id': (record.get('Id') or 0) + copy * (max_id + 1)} for record in records)
+    return scaled
+
+
+class PayloadStore:
+    """
+    Loads, scales and caches encoded response bodies (+ ETags) per endpoint.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def body(self, endpoint, event_id=None):
+        key = (endpoint, event_id)
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = self._load(endpoint, event_id)
+            return self._cache[key]
+
+    def _load(self, endpoint, event_id):
+        data_key, per_event = ENDPOINTS[endpoint]
+        path = os.path.join(self.config.data_dir, _FILES[endpoint])
+        if per_event:
+            path = os.path.join(path, f'{event_id}.json')
+        records = _read_json(path)
+        if endpoint == 'HospitalitySaleTransactions/List':
+            records = _scale_records(records, self.config.scale)
+        body = json.dumps({'Data': {data_key: records}}).encode()
+        return body, '"' + hashlib.sha1(body).hexdigest() + '"'
+
+    def reload(self):
+        with self._lock:
+            self._cache.clear()
+
+
+def make_handler(config, payloads, stats):
+
+    class MockTJTHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, so client connection pooling is exercised
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body=b'', headers=None):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _delay(self):
+            delay = config.latency + (random.uniform(0, config.jitter) if config.jitter else 0)
+            if delay:
+                time.sleep(delay)
+
+        def do_POST(self):
+            parsed = urlparse(self.path)
+            length = int(self.headers.get('Content-Length') or 0)
+            self.rfile.read(length)
+            stats['token'] += 1
+            if parsed.path != f'{API_PREFIX}/token':
+                return self._send(404)
+            self._delay()
+            token = f"mock-token-{stats['token']}"
+            self._send(200, json.dumps({'access_token': token, 'expires_in': config.token_ttl}).encode())
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            if parsed.path == '/_stats':
+                return self._send(200, json.dumps(stats).encode())
+
+            endpoint = parsed.path[len(API_PREFIX) + 1:] if parsed.path.startswith(API_PREFIX + '/') else None
+            if endpoint not in ENDPOINTS:
+                return self._send(404)
+            stats[endpoint] += 1
+
+            if not (self.headers.get('Authorization') or '').startswith('Bearer mock-token-'):
+                stats['unauthorized'] += 1
+                return self._send(401)
+
+            self._delay()
+            if config.failure_rate and random.random() < config.failure_rate:
+                stats['failed'] += 1
+                return self._send(config.failure_status, b'{"Message": "mock failure"}')
+
+            event_id = None
+            if ENDPOINTS[endpoint][1]:
+                event_id = (parse_qs(parsed.query).get('EventId') or [None])[0]
+                if event_id is None:
+                    return self._send(400, b'{"Message": "EventId is required"}')
+                if event_id in config.fail_events:
+                    stats['failed'] += 1
+                    return self._send(config.failure_status, b'{"Message": "mock failure"}')
+
+            body, etag = payloads.body(endpoint, event_id)
+            if config.etag and self.headers.get('If-None-Match') == etag:
+                stats['not_modified'] += 1
+                return self._send(304, headers={'ETag': etag})
+            stats['bytes'] += len(body)
+            self._send(200, body, headers={'ETag': etag} if config.etag else None)
+
+    return MockTJTHandler
+
+
+def start_server(config=None, host='127.0.0.1', port=0):
+    """
+    Starts the mock server on a background thread.
+    Returns (server, base_url); call server.shutdown() to stop it.
+    server.stats holds request counters, server.config the MockConfig and
+    server.payloads.reload() re-reads the data directory.
+    """
+    config = config or MockConfig()
+    stats = Counter()
+    payloads = PayloadStore(config)
+    server = ThreadingHTTPServer((host, port), make_handler(config, payloads, stats))
+    server.daemon_threads = True
+    server.config = config
+    server.stats = stats
+    server.payloads = payloads
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_port}{API_PREFIX}'
+
+
+def record(data_dir=DEFAULT_DATA_DIR):
+    """
+    Records the live TJT payloads (via tjt_client) into data_dir.
+    """
+    import tjt_client
+
+    def dump(records, *parts):
+        path = os.path.join(data_dir, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(records, f)
+
+    events = tjt_client.client.get_json('Events/List')[0].get('Data', {}).get('Events', [])
+    dump(events, 'events.json')
+    guests = tjt_client.client.get_json('Accounts/List')[0].get('Data', {}).get('Guests', [])
+    dump(guests, 'accounts.json')
+    for event in events:
+        for endpoint, folder in (('HospitalitySaleTransactions/List', 'transactions'), ('CateringPreorders/List', 'preorders')):
+            try:
+                payload, _ = tjt_client.client.get_json(endpoint, params={'EventId': event['Id']}, conditional=False)
+            except tjt_client.TJTError as e:
+                print(f"Skipping {endpoint} for EventId {event['Id']}: {e}")
+                continue
+            dump(payload.get('Data', {}).get(ENDPOINTS[endpoint][0], []), folder, f"{event['Id']}.json")
+    print(f"Recorded {len(events)} events and {len(guests)} guests into {data_dir}")
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Local TJT API stand-in.")
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help="Serve payloads from a data directory")
+    serve_parser.add_argument('--data', default=DEFAULT_DATA_DIR)
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.add_argument('--latency', type=float, default=0.0, help="Base seconds per response")
+    serve_parser.add_argument('--jitter', type=float, default=0.0, help="Extra random seconds per response")
+    serve_parser.add_argument('--failure-rate', type=float, default=0.0, help="Fraction of calls that fail")
+    serve_parser.add_argument('--failure-status', type=int, default=503)
+    serve_parser.add_argument('--scale', type=int, default=1, help="Replicate transactions N times")
+    serve_parser.add_argument('--token-ttl', type=int, default=3600)
+    serve_parser.add_argument('--no-etag', action='store_true', help="Don't send ETags / 304s")
+
+    record_parser = commands.add_parser('record', help="Record live TJT payloads into a data directory")
+    record_parser.add_argument('--data', default=DEFAULT_DATA_DIR)
+
+    args = arg_parser.parse_args(argv)
+    if args.command == 'record':
+        record(args.data)
+        return
+
+    config = MockConfig(args.data, args.latency, args.jitter, args.failure_rate, args.failure_status,
+                        args.scale, args.token_ttl, etag=not args.no_etag)
+    server, base_url = start_server(config, args.host, args.port)
+    print(f"Mock TJT API serving {args.data} at {base_url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
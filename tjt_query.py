@@ -0,0 +1,137 @@
+"""
+Read-only queries over the SQLite copy of the latest sales snapshot.
+
+tjt_store writes sales.sqlite next to each snapshot's Parquet files (unless
+TJT_SQLITE=0): table 'sales' (the filtered_df_without_seats columns), indexed
+on CreatedOn, (EventId, CreatedOn) and (CreatedBy, CreatedOn).
+Filtering and aggregating here keeps the work in SQLite instead of copying
+the whole frame into every Streamlit session.
+
+Timestamps are ISO 'YYYY-MM-DDTHH:MM:SS' text and IsPaid is 0/1.
+
+Usage:
+    import tjt_query
+    today = tjt_query.sales_totals(['CreatedBy'], ['Price'], start=today_start, end=today_end)
+    by_fixture = tjt_query.sales_totals(['Fixture Name'], ['TotalPrice', 'Seats'],
+                                        filters={'EventCompetition': 'Premier League', 'IsPaid': True})
+    df = tjt_query.query('SELECT * FROM sales WHERE "CreatedBy" = ? LIMIT 10', ['dmontague'])
+"""
+import sqlite3
+from contextlib import closing
+from datetime import date, datetime
+
+import pandas as pd
+
+import tjt_store
+
+# table columns per database file, so identifiers can be validated
+_columns_cache = {}
+
+
+class QueryError(Exception):
+    """Raised when no sales database is available or a query names an unknown column."""
+
+
+def connect(version=None):
+    """
+    Opens a read-only connection to a snapshot's (latest by default) sales
+    database. Close it when done (or use it via query()).
+    """
+    path = tjt_store.sqlite_path(version)
+    if path is None:
+        raise QueryError("No SQLite sales snapshot has been published yet "
+                         "(is tjt_refresher.py running, without TJT_SQLITE=0?)")
+    return sqlite3.connect(f'file:{path}?mode=ro', uri=True, check_same_thread=False)
+
+
+def query(sql, params=(), version=None):
+    """
+    Runs a SQL query against the sales database and returns a DataFrame.
+    """
+    with closing(connect(version)) as connection:
+        return pd.read_sql_query(sql, connection, params=params)
+
+
+def table_columns(version=None):
+    """
+    Returns the column names of the 'sales' table.
+    """
+    path = tjt_store.sqlite_path(version)
+    if path not in _columns_cache:
+        with closing(connect(version)) as connection:
+            _columns_cache[path] = [row[1] for row in connection.execute('PRAGMA table_info(sales)')]
+    return _columns_cache[path]
+
+
+def _quote(column, known):
+    if column not in known:
+        raise QueryError(f"Unknown sales column: {column!r}")
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _sql_value(value):
+    if isinstance(value, (datetime, date)):
+        return pd.Timestamp(value).strftime('%Y-%m-%dT%H:%M:%S')
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def _where(filters, start, end, date_column, known):
+    """
+    Builds a WHERE clause (and its parameters) from equality / IN filters and
+    a [start, end) range on date_column.
+    """
+    clauses, params = [], []
+    if start is not None:
+        clauses.append(f'{_quote(date_column, known)} >= ?')
+        params.append(_sql_value(start))
+    if end is not None:
+        clauses.append(f'{_quote(date_column, known)} < ?')
+        params.append(_sql_value(end))
+    for column, value in (filters or {}).items():
+        quoted = _quote(column, known)
+        if value is None:
+            clauses.append(f'{quoted} IS NULL')
+        elif isinstance(value, (list, tuple, set, frozenset, pd.Index, pd.Series)):
+            values = list(value)
+            if not values:
+                clauses.append('0')
+                continue
+            clauses.append(f'{quoted} IN ({", ".join("?" * len(values))})')
+            params.extend(_sql_value(item) for item in values)
+        else:
+            clauses.append(f'{quoted} = ?')
+            params.append(_sql_value(value))
+    return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+
+def sales_rows(select=None, filters=None, start=None, end=None, date_column='CreatedOn', version=None):
+    """
+    Returns the sales rows matching the filters, with only the `select`
+    columns (all by default).
+
+    filters maps column -> value (equality), list of values (IN) or None
+    (IS NULL). start/end bound date_column as [start, end).
+    """
+    known = table_columns(version)
+    selected = ', '.join(_quote(col, known) for col in select) if select else '*'
+    where, params = _where(filters, start, end, date_column, known)
+    return query(f'SELECT {selected} FROM sales{where}', params, version)
+
+
+def sales_totals(group_by=(), values=('TotalPrice',), filters=None, start=None, end=None,
+                 date_column='CreatedOn', version=None):
+    """
+    Returns SUM(value) for each value column plus a 'Rows' count, grouped by
+    the group_by columns, over the rows matching the filters (see
+    sales_rows). With no group_by the result is a single row.
+    """
+    known = table_columns(version)
+    groups = [_quote(col, known) for col in group_by]
+    sums = [f'COALESCE(SUM({_quote(col, known)}), 0) AS {_quote(col, known)}' for col in values]
+    where, params = _where(filters, start, end, date_column, known)
+    sql = f'SELECT {", ".join(groups + sums + ["COUNT(*) AS Rows"])} FROM sales{where}'
+    if groups:
+        sql += f' GROUP BY {", ".join(groups)} ORDER BY {", ".join(groups)}'
+    return query(sql, params, version)
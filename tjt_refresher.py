@@ -0,0 +1,114 @@
+"""
+Standalone TJT ingestion process.
+
+Owns every TJT API call made for the dashboards: it refreshes the hospitality
+sales data (tjt_hosp_api.refresh) and the event inventory
+(tjt_inventory.get_inventory_data) on its own schedule and publishes them
+through tjt_store. The Streamlit apps only read what it publishes, so API load
+no longer scales with the number of open browsers. (If it stops or falls
+behind, tjt_data refreshes in the background of one dashboard process; the
+store's refresh locks keep the two from refreshing the same data at once.)
+
+Sales are polled per event on a hot/warm/cold cadence (see tjt_schedule): the
+loop wakes every --sales-interval seconds (the hot tier's interval) and only
+fetches the events whose tier interval has elapsed.
+
+Usage:
+    python tjt_refresher.py                       # run forever, default intervals
+    python tjt_refresher.py --sales-interval 60 --inventory-interval 300
+    python tjt_refresher.py --hot-days 21 --warm-interval 600 --cold-interval 43200
+    python tjt_refresher.py --once                # single refresh, then exit
+    python tjt_refresher.py --once --full         # rebuild the store from scratch
+"""
+import argparse
+import logging
+import time
+
+import tjt_hosp_api
+import tjt_inventory
+import tjt_schedule
+import tjt_store
+
+logging.basicConfig(
+    format="%(asctime)s - [%(levelname)s] - %(message)s",
+    level=logging.INFO,
+)
+
+DEFAULT_SALES_INTERVAL = tjt_schedule.TIER_INTERVALS['hot']   # seconds between sales passes
+DEFAULT_INVENTORY_INTERVAL = 300   # seconds between inventory refreshes
+
+
+def refresh_sales(full=False, schedule=None):
+    started = time.time()
+    try:
+        # Waits out a refresh a dashboard process started (see tjt_data)
+        with tjt_store.refresh_lock('sales', blocking=True):
+            sales_df = tjt_hosp_api.refresh(full=full, schedule=schedule)
+    except Exception:
+        logging.exception("❌ Sales refresh failed; dashboards keep serving the previous snapshot")
+        return
+    logging.info(f"✅ Sales snapshot {tjt_store.latest_version()} published: "
+                 f"{len(sales_df)} rows in {time.time() - started:.1f}s")
+    stale = tjt_store.stale_events()
+    if stale:
+        logging.warning(f"⚠️ {len(stale)} events served from their last good refresh, retrying: {sorted(stale)}")
+
+
+def refresh_inventory():
+    started = time.time()
+    try:
+        with tjt_store.refresh_lock('inventory', blocking=True):
+            inventory_df = tjt_inventory.get_inventory_data()
+            if inventory_df.empty:
+                # Events/List failed: an empty table would replace the last good one
+                logging.warning("⚠️ No inventory retrieved; dashboards keep serving the previous table")
+                return
+            tjt_store.write_table('inventory', inventory_df)
+    except Exception:
+        logging.exception("❌ Inventory refresh failed; dashboards keep serving the previous table")
+        return
+    logging.info(f"✅ Inventory published: {len(inventory_df)} rows in {time.time() - started:.1f}s")
+
+
+def run(sales_interval=DEFAULT_SALES_INTERVAL, inventory_interval=DEFAULT_INVENTORY_INTERVAL, once=False, full=False,
+        schedule=None):
+    schedule = schedule or tjt_schedule.TieredSchedule({'hot': sales_interval})
+    next_sales = next_inventory = 0.0
+    while True:
+        now = time.time()
+        if now >= next_sales:
+            refresh_sales(full=full, schedule=schedule)
+            full = False  # Only the first pass rebuilds
+            next_sales = now + sales_interval
+        if now >= next_inventory:
+            refresh_inventory()
+            next_inventory = now + inventory_interval
+        if once:
+            return
+        time.sleep(max(0.0, min(next_sales, next_inventory) - time.time()))
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Refresh TJT hospitality data and publish snapshots.")
+    arg_parser.add_argument("--sales-interval", type=float, default=DEFAULT_SALES_INTERVAL,
+                            help="Seconds between sales passes; hot events are polled every pass (default: %(default)s)")
+    arg_parser.add_argument("--warm-interval", type=float, default=tjt_schedule.TIER_INTERVALS['warm'],
+                            help="Seconds between polls of later-this-season events (default: %(default)s)")
+    arg_parser.add_argument("--cold-interval", type=float, default=tjt_schedule.TIER_INTERVALS['cold'],
+                            help="Seconds between polls of past or next-season events (default: %(default)s)")
+    arg_parser.add_argument("--hot-days", type=float, default=tjt_schedule.HOT_DAYS,
+                            help="Events kicking off within this many days are hot (default: %(default)s)")
+    arg_parser.add_argument("--inventory-interval", type=float, default=DEFAULT_INVENTORY_INTERVAL,
+                            help="Seconds between inventory refreshes (default: %(default)s)")
+    arg_parser.add_argument("--once", action="store_true", help="Refresh once and exit")
+    arg_parser.add_argument("--full", action="store_true", help="Discard stored data and watermarks first")
+    args = arg_parser.parse_args(argv)
+
+    logging.info("🔄 TJT refresher starting")
+    schedule = tjt_schedule.TieredSchedule(
+        {'hot': args.sales_interval, 'warm': args.warm_interval, 'cold': args.cold_interval}, hot_days=args.hot_days)
+    run(args.sales_interval, args.inventory_interval, once=args.once, full=args.full, schedule=schedule)
+
+
+if __name__ == "__main__":
+    main()
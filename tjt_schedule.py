@@ -0,0 +1,150 @@
+"""
+Tiered refresh scheduling for TJT events.
+
+Sales land mostly on fixtures kicking off in the next few weeks, so events are
+polled at a cadence set by how close they are:
+
+    hot   - kicks off within HOT_DAYS (or kicked off within MATCHDAY_GRACE),
+            or went on sale within HOT_DAYS
+    warm  - kicks off later this season
+    cold  - already played, or in a later season
+
+tjt_hosp_api.refresh(schedule=...) only fetches the events a schedule reports
+as due; tjt_refresher.py owns the schedule and marks events as they refresh.
+
+Events whose last fetch failed (tjt_hosp_api keeps serving their last good
+rows, marked stale) sit in a retry queue instead: they are due again after
+RETRY_DELAY, doubling with each failed attempt up to RETRY_MAX_DELAY,
+whatever their tier.
+
+Settings (env):
+    TJT_HOT_DAYS, TJT_HOT_INTERVAL, TJT_WARM_INTERVAL, TJT_COLD_INTERVAL,
+    TJT_RETRY_DELAY, TJT_RETRY_MAX_DELAY
+"""
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+HOT_DAYS = float(os.getenv('TJT_HOT_DAYS', '14'))
+TIER_INTERVALS = {                                  # seconds between polls of one event
+    'hot': float(os.getenv('TJT_HOT_INTERVAL', '60')),
+    'warm': float(os.getenv('TJT_WARM_INTERVAL', '900')),
+    'cold': float(os.getenv('TJT_COLD_INTERVAL', '21600')),
+}
+RETRY_DELAY = float(os.getenv('TJT_RETRY_DELAY', '60'))           # seconds before a failed event is retried
+RETRY_MAX_DELAY = float(os.getenv('TJT_RETRY_MAX_DELAY', '1800'))  # cap on the doubling retry delay
+MATCHDAY_GRACE = timedelta(hours=24)   # Matchday sales and amendments land after kick-off
+SEASON_START_MONTH = 7                 # Seasons run July to June
+
+
+def _parse(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+def season_end(now):
+    """
+    Returns the start of the next season after `now` (exclusive season end).
+    """
+    year = now.year + 1 if now.month >= SEASON_START_MONTH else now.year
+    return datetime(year, SEASON_START_MONTH, 1)
+
+
+def classify_event(event, now=None, hot_days=HOT_DAYS):
+    """
+    Returns 'hot', 'warm' or 'cold' for an Events/List entry, from its
+    KickOffEventStart and GoLiveDate. Events without a usable kick-off are
+    treated as warm.
+    """
+    now = now or datetime.now()
+    kick_off = _parse(event.get('KickOffEventStart'))
+    go_live = _parse(event.get('GoLiveDate'))
+    hot_window = timedelta(days=hot_days)
+
+    if kick_off is None:
+        return 'warm'
+    if kick_off < now - MATCHDAY_GRACE:
+        return 'cold'
+    if kick_off <= now + hot_window:
+        return 'hot'
+    if go_live is not None and now - hot_window <= go_live <= now:
+        return 'hot'   # Launch spike: just gone on sale
+    if kick_off < season_end(now):
+        return 'warm'
+    return 'cold'
+
+
+def retry_due(failure, now=None):
+    """
+    Returns True once a failed event may be retried. failure is its
+    stale_events entry from the snapshot meta ('attempts', 'last_attempt').
+    """
+    now = now or datetime.now()
+    last_attempt = _parse(failure.get('last_attempt'))
+    if last_attempt is None:
+        return True
+    delay = min(RETRY_MAX_DELAY, RETRY_DELAY * 2 ** max(0, failure.get('attempts', 1) - 1))
+    return now - last_attempt >= timedelta(seconds=delay)
+
+
+class TieredSchedule:
+    """
+    Remembers when each event was last refreshed and reports which events are
+    due under their tier's interval. Events never refreshed are always due.
+    """
+
+    def __init__(self, intervals=None, hot_days=HOT_DAYS):
+        self.intervals = {**TIER_INTERVALS, **(intervals or {})}
+        self.hot_days = hot_days
+        self.last_refreshed = {}   # EventId (str) -> time.time()
+
+    def tier(self, event, now=None):
+        return classify_event(event, now, self.hot_days)
+
+    def due(self, events, now=None, failures=None):
+        """
+        Returns the events whose tier interval has elapsed since their last
+        refresh. Events in failures ({EventId (str): stale_events entry}) are
+        due when their retry backoff has elapsed instead (see retry_due).
+        """
+        clock = time.time()
+        failures = failures or {}
+        due = []
+        for event in events:
+            event_id = str(event['Id'])
+            if event_id in failures:
+                if retry_due(failures[event_id], now):
+                    due.append(event)
+                continue
+            last = self.last_refreshed.get(event_id)
+            if last is None or clock - last >= self.intervals[self.tier(event, now)]:
+                due.append(event)
+        return due
+
+    def mark(self, event_ids):
+        clock = time.time()
+        for event_id in event_ids:
+            self.last_refreshed[str(event_id)] = clock
+
+    def seed(self, refreshed_at):
+        """
+        Records refreshes made elsewhere, from a snapshot meta's refreshed_at
+        ({EventId (str): ISO time}), so a new process (or one another process
+        refreshes for) doesn't treat those events as due. Later marks win.
+        """
+        for event_id, refreshed in (refreshed_at or {}).items():
+            moment = _parse(refreshed)
+            if moment is not None:
+                clock = moment.timestamp()
+                self.last_refreshed[str(event_id)] = max(clock, self.last_refreshed.get(str(event_id), clock))
+
+    def summary(self, events, now=None):
+        """
+        Returns {tier: event count}, for logging.
+        """
+        return dict(Counter(self.tier(event, now) for event in events))
@@ -0,0 +1,764 @@
+import json
+import os
+import shutil
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    import fcntl
+except ImportError:  # Windows: refreshes are only single-flight within a process
+    fcntl = None
+
+# Versioned Parquet snapshots of the TJT hospitality data, partitioned by the
+# season of each event's kick-off (rows grouped by event within a season):
+#   tjt_store/snapshots/<version>/merged/season=<2024-25>.parquet
+#                                                  - raw event + transaction + guest rows
+#   tjt_store/snapshots/<version>/sales/season=<2024-25>.parquet
+#                                                  - filtered_df_without_seats
+#   tjt_store/snapshots/<version>/sales.sqlite    - sales as an indexed SQLite table (see tjt_query)
+#   tjt_store/snapshots/<version>/meta.json       - version info, row counts, watermarks,
+#                                                   partition stats (for pruning), stale events
+#   tjt_store/snapshots/LATEST                    - name of the newest complete version; its mtime is
+#                                                   when the data was last confirmed current
+#   tjt_store/tables/<name>.parquet               - standalone frames (e.g. inventory, guests)
+#   tjt_store/history/<time>-<kind>.parquet       - transaction change log, with checkpoints (see append_history)
+#   tjt_store/locks/<name>.lock                   - held while a process refreshes <name> (see refresh_lock)
+STORE_DIR = os.getenv('TJT_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tjt_store'))
+SNAPSHOT_DIR = os.path.join(STORE_DIR, 'snapshots')
+LATEST_FILE = os.path.join(SNAPSHOT_DIR, 'LATEST')
+TABLE_DIR = os.path.join(STORE_DIR, 'tables')
+HISTORY_DIR = os.path.join(STORE_DIR, 'history')
+LOCK_DIR = os.path.join(STORE_DIR, 'locks')
+KEEP_VERSIONS = 5
+
+# The change log is folded into a checkpoint (the state of every transaction)
+# after HISTORY_CHECKPOINT_PARTS change parts, so an as-of read never replays
+# more than that many. Parts older than HISTORY_RETENTION_DAYS are deleted,
+# except the baseline/checkpoint that as-of reads from the cutoff start from.
+HISTORY_CHECKPOINT_PARTS = int(os.getenv('TJT_HISTORY_CHECKPOINT_PARTS', '100'))
+HISTORY_RETENTION_DAYS = float(os.getenv('TJT_HISTORY_RETENTION_DAYS', '400'))
+
+# The sales frame is also written to SQLite (table 'sales', indexed on
+# SQLITE_INDEXES) so filters and aggregations can be pushed down via tjt_query.
+# Each snapshot's database is the previous one with only the changed events'
+# rows replaced (see _update_sqlite). Set TJT_SQLITE=0 to skip it.
+SQLITE_ENABLED = os.getenv('TJT_SQLITE', '1') == '1'
+SQLITE_FILE = 'sales.sqlite'
+SQLITE_INDEXES = {
+    'sales_created_on': ['CreatedOn'],
+    'sales_event': ['EventId', 'CreatedOn'],
+    'sales_created_by': ['CreatedBy', 'CreatedOn'],
+}
+
+# Excel exports written by export_excel() (previously a side effect of every refresh)
+MERGED_EXCEL = 'merged_events_transactions1.xlsx'
+SALES_EXCEL = 'filtered_hosp_data2.xlsx'
+
+SEASON_START_MONTH = 7   # Seasons run July to June (as in tjt_schedule)
+SALES_OPEN_MONTH_DAY = (6, 18)   # Sales for a season's fixtures open before it starts (24/25 on 18 June 2024)
+SNAPSHOT_FRAMES = ('merged', 'sales')
+
+_SIMPLE_TYPES = {'string', 'empty', 'boolean', 'integer', 'floating', 'datetime', 'datetime64', 'date', 'bytes'}
+
+
+def _json_columns(df):
+    """
+    Returns the object columns holding nested values (the Locations /
+    HospitalityPackages lists) or mixed scalar types, which are stored as JSON.
+    """
+    return [col for col in df.columns
+            if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) not in _SIMPLE_TYPES]
+
+
+def _encode_frame(df, json_columns=None):
+    """
+    Makes a frame Parquet-safe. JSON columns (see _json_columns, or the given
+    list, so that partitions of one frame agree) are stored as JSON text;
+    their names go in the file metadata so they can be decoded. Rows of one
+    event share the same nested objects, so each distinct object is encoded
+    once.
+    """
+    df = df.copy()
+    json_columns = _json_columns(df) if json_columns is None else [col for col in json_columns if col in df.columns]
+    for col in json_columns:
+        encoded = {}   # id(value) -> (value, JSON); holding value keeps its id unique
+
+        def encode(value):
+            hit = encoded.get(id(value))
+            if hit is None or hit[0] is not value:
+                hit = encoded[id(value)] = (value, json.dumps(value, default=str))
+            return hit[1]
+
+        df[col] = df[col].map(encode)
+    return df, json_columns
+
+
+def _decode_frame(df, json_columns):
+    """
+    Decodes JSON columns. They are read dictionary-encoded (categorical), so
+    each distinct value is parsed once and shared by every row holding it.
+    """
+    for col in json_columns:
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            categories = values.cat.categories
+            parsed = np.empty(len(categories) + 1, dtype=object)   # Last slot (code -1) stays None
+            for i, text in enumerate(categories):
+                parsed[i] = json.loads(text)
+            df[col] = pd.Series(parsed[values.cat.codes.to_numpy()], index=values.index)
+        else:
+            df[col] = values.map(json.loads)
+    return df
+
+
+def _write_parquet(df, path, json_columns=None):
+    encoded, json_columns = _encode_frame(df, json_columns)
+    table = pa.Table.from_pandas(encoded, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b'tjt_json_columns'] = json.dumps(json_columns).encode()
+    pq.write_table(table.replace_schema_metadata(metadata), path)
+
+
+def _read_arrow(path, columns=None):
+    """
+    Returns (Arrow table, JSON column names) for one file written by
+    _write_parquet; JSON columns are read dictionary-encoded.
+    """
+    metadata = pq.read_schema(path, memory_map=True).metadata or {}
+    json_columns = json.loads(metadata.get(b'tjt_json_columns', b'[]'))
+    if columns is not None:
+        json_columns = [col for col in json_columns if col in columns]
+    table = pq.read_table(path, columns=columns, memory_map=True, read_dictionary=json_columns or None,
+                          partitioning=None)   # Partition values live in meta, not in the path
+    return table, json_columns
+
+
+def _read_parquet(path, columns=None):
+    table, json_columns = _read_arrow(path, columns)
+    return _decode_frame(table.to_pandas(), json_columns)
+
+
+def _read_partitions(paths, columns=None):
+    """
+    Reads and concatenates partition files. When they agree on their JSON
+    columns (the usual case) they are concatenated as Arrow tables and
+    converted to pandas once; otherwise each is decoded on its own first.
+    """
+    if not paths:
+        return pd.DataFrame()
+    tables = [_read_arrow(path, columns) for path in paths]
+    json_sets = {tuple(sorted(json_columns)) for _, json_columns in tables}
+    if len(json_sets) > 1:
+        return _concat_frames([_decode_frame(table.to_pandas(), json_columns) for table, json_columns in tables])
+    combined = pa.concat_tables([table for table, _ in tables], promote_options='permissive')
+    return _decode_frame(combined.to_pandas(), tables[0][1])
+
+
+def _sqlite_rows(df):
+    """
+    Encodes the sales frame for SQLite: timestamps as ISO 'YYYY-MM-DDTHH:MM:SS'
+    text (which sorts and compares correctly), categoricals as text, booleans
+    as 0/1, missing values as NULL and any nested values as JSON text.
+    """
+    columns = {}
+    for col in df.columns:
+        values = df[col]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = pd.Series(np.datetime_as_string(values.to_numpy(dtype='datetime64[s]'), unit='s'),
+                               index=values.index).where(values.notna())
+        elif isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(object)
+        elif pd.api.types.is_bool_dtype(values):
+            values = values.astype('Int64')
+        columns[col] = values.astype(object).where(values.notna(), None)
+    encoded = pd.DataFrame(columns, index=df.index)
+    if not encoded.empty:
+        encoded, _ = _encode_frame(encoded)
+    return encoded
+
+
+def _sqlite_type(values):
+    """
+    Declared SQLite type for a sales column (the column affinity decides how
+    values are stored and compared, so numbers must not be declared TEXT).
+    """
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_integer_dtype(values):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(values):
+        return 'REAL'
+    return 'TEXT'
+
+
+def _insert_sqlite(connection, df):
+    encoded = _sqlite_rows(df)
+    placeholders = ', '.join('?' * len(encoded.columns))
+    connection.executemany(f'INSERT INTO sales VALUES ({placeholders})', encoded.itertuples(index=False, name=None))
+
+
+def _write_sqlite(df, path):
+    """
+    Writes the sales frame as table 'sales', sorted by CreatedOn, with
+    SQLITE_INDEXES (values encoded as in _sqlite_rows).
+    """
+    df = df.sort_values('CreatedOn', kind='stable') if 'CreatedOn' in df.columns else df
+
+    # A fresh file inside the snapshot's temp directory: no journal needed
+    with sqlite3.connect(path) as connection:
+        connection.execute('PRAGMA journal_mode = OFF')
+        connection.execute('PRAGMA synchronous = OFF')
+        declared = ', '.join('"{}" {}'.format(col.replace('"', '""'), _sqlite_type(df[col])) for col in df.columns)
+        connection.execute(f'CREATE TABLE sales ({declared})')
+        _insert_sqlite(connection, df)
+        for name, index_columns in SQLITE_INDEXES.items():
+            if all(col in df.columns for col in index_columns):
+                quoted = ', '.join(f'"{col}"' for col in index_columns)
+                connection.execute(f'CREATE INDEX "{name}" ON sales ({quoted})')
+        connection.execute('ANALYZE')
+    connection.close()
+
+
+def _update_sqlite(base_path, path, df, unchanged_events):
+    """
+    Writes the sales database for df as a copy of an earlier snapshot's
+    (base_path) in which only the rows of events outside unchanged_events
+    are replaced, so the cost follows the changed events rather than the
+    whole table. Returns False, writing nothing, if the base table's columns
+    (or their declared types) don't match df's.
+    """
+    shutil.copy2(base_path, path)
+    kept = [(event_id.item() if hasattr(event_id, 'item') else event_id,) for event_id in unchanged_events]
+    with sqlite3.connect(path) as connection:
+        columns = [(row[1], row[2]) for row in connection.execute('PRAGMA table_info(sales)')]
+        matches = columns == [(col, _sqlite_type(df[col])) for col in df.columns] and 'EventId' in df.columns
+        if matches:
+            connection.execute('PRAGMA journal_mode = OFF')
+            connection.execute('PRAGMA synchronous = OFF')
+            connection.execute('CREATE TEMP TABLE kept_events (EventId PRIMARY KEY)')
+            connection.executemany('INSERT OR IGNORE INTO kept_events VALUES (?)', kept)
+            connection.execute('DELETE FROM sales WHERE "EventId" IS NULL '
+                               'OR "EventId" NOT IN (SELECT EventId FROM kept_events)')
+            _insert_sqlite(connection, df[~df['EventId'].isin([event_id for event_id, in kept])])
+    connection.close()
+    if not matches:
+        os.remove(path)
+    return matches
+
+
+def season_of(timestamp):
+    """
+    Returns the season label ('2024-25') a kick-off time falls in, or None.
+    """
+    if timestamp is None or pd.isna(timestamp):
+        return None
+    start_year = timestamp.year if timestamp.month >= SEASON_START_MONTH else timestamp.year - 1
+    return f'{start_year}-{(start_year + 1) % 100:02d}'
+
+
+def current_season(now=None):
+    """
+    Returns the season label for now, or TJT_SEASON if set (to pin dashboards
+    to a season).
+    """
+    return os.getenv('TJT_SEASON') or season_of(now or datetime.now())
+
+
+def sales_season(now=None):
+    """
+    Returns the season whose fixtures are on sale at `now`: the current
+    season, or the next one from its sales-open day (SALES_OPEN_MONTH_DAY)
+    on. TJT_SEASON overrides it, as in current_season.
+    """
+    now = now or datetime.now()
+    if now.month < SEASON_START_MONTH and (now.month, now.day) >= SALES_OPEN_MONTH_DAY:
+        now = datetime(now.year, SEASON_START_MONTH, 1)
+    return current_season(now)
+
+
+def sales_open_date(season):
+    """
+    Returns the day sales opened for a season label's fixtures.
+    """
+    return datetime(int(season.split('-')[0]), *SALES_OPEN_MONTH_DAY)
+
+
+def season_bounds(season):
+    """
+    Returns (start, end) datetimes of a season label; end is exclusive.
+    """
+    start_year = int(season.split('-')[0])
+    return datetime(start_year, SEASON_START_MONTH, 1), datetime(start_year + 1, SEASON_START_MONTH, 1)
+
+
+def _partition_keys(df):
+    """
+    Returns a Series of 'season=<season>' partition keys, one per row, from
+    each event's KickOffEventStart.
+    """
+    if df.empty or 'EventId' not in df.columns:
+        return pd.Series('season=unknown', index=df.index)
+    event_ids = df['EventId'].astype(object).where(df['EventId'].notna(), None)
+    kickoffs = df['KickOffEventStart'] if 'KickOffEventStart' in df.columns else pd.Series(None, index=df.index)
+    first_kickoff = kickoffs.groupby(event_ids, dropna=False, sort=False).first()
+    parsed = pd.to_datetime(first_kickoff.astype(object), errors='coerce', format='ISO8601')
+    keys = {event_id: f"season={season_of(kickoff) or 'unknown'}" for event_id, kickoff in zip(first_kickoff.index, parsed)}
+    return event_ids.map(lambda event_id: keys.get(event_id, 'season=unknown'))
+
+
+def _partition_stats(part):
+    stats = {'rows': len(part)}
+    if 'EventId' in part.columns:
+        stats['events'] = sorted(str(event_id) for event_id in part['EventId'].dropna().unique())
+    if 'CreatedOn' in part.columns and pd.api.types.is_datetime64_any_dtype(part['CreatedOn']):
+        created = part['CreatedOn'].dropna()
+        if not created.empty:
+            stats['created_min'] = created.min().isoformat()
+            stats['created_max'] = created.max().isoformat()
+    return stats
+
+
+def _link_or_copy(source, target):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def _write_partitions(df, frame_dir, base_dir=None, base_stats=None, reuse_events=()):
+    """
+    Writes df as one Parquet file per season partition under frame_dir, rows
+    grouped by event. A partition holding exactly the same events as in
+    base_dir (the same frame in an earlier snapshot), all of them in
+    reuse_events, is hard-linked instead of rewritten.
+    Returns ({key: stats}, number of partitions written).
+    """
+    stats = {}
+    written = 0
+    reuse = {str(event_id) for event_id in reuse_events}
+    json_columns = _json_columns(df)
+    keys = _partition_keys(df)
+    for key, positions in sorted(keys.groupby(keys).indices.items()):
+        path = os.path.join(frame_dir, f'{key}.parquet')
+        part = df.iloc[positions]
+        events = sorted(str(event_id) for event_id in part['EventId'].dropna().unique()) if 'EventId' in part.columns else []
+        base = (base_stats or {}).get(key)
+        if base_dir and base and base.get('events') == events and reuse.issuperset(events):
+            _link_or_copy(os.path.join(base_dir, f'{key}.parquet'), path)
+            stats[key] = base
+            continue
+        if 'EventId' in part.columns:
+            part = part.sort_values('EventId', kind='stable')
+        os.makedirs(frame_dir, exist_ok=True)
+        _write_parquet(part, path, json_columns)
+        stats[key] = _partition_stats(part)
+        written += 1
+    return stats, written
+
+
+def _concat_frames(frames):
+    """
+    Concatenates partition frames, keeping columns that are categorical in
+    every frame categorical (over the union of their categories).
+    """
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    categorical = [col for col in frames[0].columns
+                   if all(col in frame.columns and isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames)]
+    combined = pd.concat(frames, ignore_index=True)
+    for col in categorical:
+        combined[col] = pd.api.types.union_categoricals([frame[col] for frame in frames], ignore_order=True)
+    return combined
+
+
+def select_partitions(partition_stats, seasons=None, event_ids=None, created_from=None, created_to=None):
+    """
+    Returns the partition keys to read: those in the given seasons, holding
+    any of the given events, whose CreatedOn range (where recorded) overlaps
+    [created_from, created_to).
+    """
+    seasons = None if seasons is None else {str(season) for season in seasons}
+    events = None if event_ids is None else {str(event_id) for event_id in event_ids}
+    selected = []
+    for key, stats in partition_stats.items():
+        if seasons is not None and key.split('=', 1)[1] not in seasons:
+            continue
+        if events is not None and 'events' in stats and not events.intersection(stats['events']):
+            continue
+        if created_from is not None and 'created_max' in stats and datetime.fromisoformat(stats['created_max']) < created_from:
+            continue
+        if created_to is not None and 'created_min' in stats and datetime.fromisoformat(stats['created_min']) >= created_to:
+            continue
+        selected.append(key)
+    return selected
+
+
+def latest_version():
+    """
+    Returns the name of the newest complete snapshot, or None if there isn't one.
+    """
+    try:
+        with open(LATEST_FILE) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return version if os.path.isdir(os.path.join(SNAPSHOT_DIR, version)) else None
+
+
+def mark_current():
+    """
+    Records that the latest snapshot was just confirmed current (a refresh
+    found nothing to publish), so snapshot_age() starts again from zero.
+    """
+    try:
+        os.utime(LATEST_FILE)
+    except FileNotFoundError:
+        pass
+
+
+def snapshot_age():
+    """
+    Returns the seconds since the latest snapshot was published or last
+    confirmed current (see mark_current), or None if there isn't one.
+    """
+    try:
+        return datetime.now().timestamp() - os.path.getmtime(LATEST_FILE)
+    except OSError:
+        return None
+
+
+@contextmanager
+def refresh_lock(name, blocking=False):
+    """
+    Cross-process lock held while refreshing `name` ('sales', 'inventory'),
+    so the refresher and dashboard processes never refresh the same data at
+    once. Yields True if the lock was acquired; without blocking, yields
+    False straight away when another process holds it.
+    """
+    if fcntl is None:
+        yield True
+        return
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    with open(os.path.join(LOCK_DIR, f'{name}.lock'), 'w') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def write_snapshot(merged_df, sales_df, meta=None, base_version=None, unchanged_events=()):
+    """
+    Writes a new snapshot version atomically: files go into a temporary
+    directory that is renamed into place, then LATEST is swapped to point at
+    it. Readers therefore only ever see complete snapshots.
+
+    Both frames are partitioned by season. Seasons whose events are all in
+    unchanged_events are hard-linked from base_version (when it is
+    partitioned) rather than rewritten, as is its SQLite database when no
+    sales partition changed; otherwise that database is copied and only the
+    rows of events outside unchanged_events are replaced.
+    Returns the new version name.
+    """
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    version = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+    tmp_dir = os.path.join(SNAPSHOT_DIR, f'.{version}.tmp')
+    os.makedirs(tmp_dir)
+
+    base_partitions = load_meta(base_version).get('partitions', {}) if base_version else {}
+    partitions, rewritten = {}, {}
+    for name, df in zip(SNAPSHOT_FRAMES, (merged_df, sales_df)):
+        partitions[name], rewritten[name] = _write_partitions(
+            df, os.path.join(tmp_dir, name),
+            base_dir=os.path.join(SNAPSHOT_DIR, base_version, name) if base_version else None,
+            base_stats=base_partitions.get(name), reuse_events=unchanged_events)
+
+    if SQLITE_ENABLED:
+        base_sqlite = sqlite_path(base_version) if base_version else None
+        sqlite_file = os.path.join(tmp_dir, SQLITE_FILE)
+        if base_sqlite and not rewritten['sales'] and set(partitions['sales']) == set(base_partitions.get('sales', {})):
+            _link_or_copy(base_sqlite, sqlite_file)
+        elif not (base_sqlite and _update_sqlite(base_sqlite, sqlite_file, sales_df, unchanged_events)):
+            _write_sqlite(sales_df, sqlite_file)
+    meta = {
+        **(meta or {}),
+        'version': version,
+        'created_at': datetime.now().isoformat(),
+        'merged_rows': len(merged_df),
+        'sales_rows': len(sales_df),
+        'partitions': partitions,
+        'partitions_written': rewritten,
+    }
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2, default=str)
+
+    os.replace(tmp_dir, os.path.join(SNAPSHOT_DIR, version))
+    with open(LATEST_FILE + '.tmp', 'w') as f:
+        f.write(version)
+    os.replace(LATEST_FILE + '.tmp', LATEST_FILE)
+
+    prune_snapshots()
+    return version
+
+
+def prune_snapshots(keep=KEEP_VERSIONS):
+    """
+    Deletes all but the newest `keep` snapshot versions.
+    """
+    versions = sorted(name for name in os.listdir(SNAPSHOT_DIR) if not name.startswith('.') and name != 'LATEST')
+    for version in versions[:-keep]:
+        shutil.rmtree(os.path.join(SNAPSHOT_DIR, version), ignore_errors=True)
+
+
+def load_snapshot(name='sales', version=None, columns=None, seasons=None, event_ids=None,
+                  created_from=None, created_to=None):
+    """
+    Loads one frame ('sales' or 'merged') from a snapshot (latest by default),
+    memory-mapping the Parquet files. Returns an empty DataFrame if no
+    snapshot exists yet.
+
+    seasons / event_ids / created_from / created_to prune whole season
+    partitions (see select_partitions); event_ids also filters rows, but rows
+    of a partition that is read are not filtered by date.
+    """
+    version = version or latest_version()
+    if version is None:
+        return pd.DataFrame()
+    partition_stats = load_meta(version).get('partitions', {}).get(name)
+    if partition_stats is None:
+        # Snapshot from before partitioning: one file per frame
+        return _read_parquet(os.path.join(SNAPSHOT_DIR, version, f'{name}.parquet'), columns=columns)
+    keys = select_partitions(partition_stats, seasons, event_ids, created_from, created_to)
+    frame_dir = os.path.join(SNAPSHOT_DIR, version, name)
+    df = _read_partitions([os.path.join(frame_dir, f'{key}.parquet') for key in keys], columns=columns)
+    if event_ids is not None and 'EventId' in df.columns:
+        df = df[df['EventId'].isin(list(event_ids))].reset_index(drop=True)
+    return df
+
+
+def sqlite_path(version=None):
+    """
+    Returns the path of a snapshot's (latest by default) SQLite sales
+    database, or None if it wasn't written.
+    """
+    version = version or latest_version()
+    path = os.path.join(SNAPSHOT_DIR, version, SQLITE_FILE) if version else None
+    return path if path and os.path.exists(path) else None
+
+
+def load_meta(version=None):
+    """
+    Returns the meta.json dict for a snapshot (latest by default), or {}.
+    """
+    version = version or latest_version()
+    if version is None:
+        return {}
+    with open(os.path.join(SNAPSHOT_DIR, version, 'meta.json')) as f:
+        return json.load(f)
+
+
+def stale_events(version=None):
+    """
+    Returns {EventId (str): entry} for the events a snapshot (latest by
+    default) serves from their last good refresh because TJT kept failing
+    for them. Each entry has name, error, attempts, failed_since,
+    last_attempt and last_refreshed (None if the event was never fetched).
+    """
+    return load_meta(version).get('stale_events', {})
+
+
+def stale_warning(version=None):
+    """
+    Returns a one-line notice naming the stale events for the dashboards, or
+    None when every event is current.
+    """
+    stale = stale_events(version)
+    if not stale:
+        return None
+    names = ', '.join(sorted(str(entry.get('name') or event_id) for event_id, entry in stale.items()))
+    return (f"TJT could not refresh {len(stale)} event(s) recently; their figures are from the last "
+            f"successful refresh: {names}")
+
+
+# (name, pruning) -> (version, DataFrame) of the last snapshot frame read in this process
+_latest_cache = {}
+
+def read_latest(name='sales', seasons=None, created_from=None):
+    """
+    Returns a frame from the latest snapshot, re-reading Parquet only when a
+    newer version has been published. The frame is shared between callers in
+    this process (every Streamlit session), so treat it as read-only.
+    seasons / created_from prune partitions as in load_snapshot.
+    """
+    version = latest_version()
+    cache_key = (name, tuple(seasons) if seasons is not None else None, created_from)
+    cached = _latest_cache.get(cache_key)
+    if cached is None or cached[0] != version:
+        cached = (version, load_snapshot(name, version, seasons=seasons, created_from=created_from))
+        _latest_cache[cache_key] = cached
+    return cached[1]
+
+
+def write_table(name, df):
+    """
+    Atomically replaces a standalone (unversioned) frame, e.g. 'inventory'.
+    """
+    os.makedirs(TABLE_DIR, exist_ok=True)
+    path = os.path.join(TABLE_DIR, f'{name}.parquet')
+    _write_parquet(df, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def read_table(name):
+    """
+    Loads a standalone frame written by write_table(), or an empty DataFrame.
+    """
+    path = os.path.join(TABLE_DIR, f'{name}.parquet')
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    return _read_parquet(path)
+
+
+def table_age(name):
+    """
+    Returns the seconds since a standalone frame was last written, or None if
+    it doesn't exist.
+    """
+    try:
+        return datetime.now().timestamp() - os.path.getmtime(os.path.join(TABLE_DIR, f'{name}.parquet'))
+    except OSError:
+        return None
+
+
+def append_history(changes_df, changed_at, baseline=False):
+    """
+    Appends one refresh's transaction changes to the history log as a new,
+    never rewritten part. changes_df holds one row per transaction with a
+    'Change' column ('new', 'updated' or 'removed'); a baseline part holds
+    every transaction and makes all earlier parts redundant for as-of reads.
+    Every HISTORY_CHECKPOINT_PARTS change parts are followed by a checkpoint,
+    and parts past HISTORY_RETENTION_DAYS are pruned (see prune_history).
+    Returns the part's path (None if there was nothing to write).
+    """
+    if changes_df.empty and not baseline:
+        return None
+    changes_df = changes_df.assign(ChangedAt=pd.Timestamp(changed_at))
+    path = _write_history_part(changes_df, changed_at, 'baseline' if baseline else 'changes')
+
+    parts = _history_parts()
+    starts = [i for i, (_, kind, _) in enumerate(parts) if kind in _HISTORY_STARTS]
+    if len(parts) - 1 - (starts[-1] if starts else -1) >= HISTORY_CHECKPOINT_PARTS:
+        # Same time as the last change part, sorting after it ('changes' < 'checkpoint')
+        _write_history_part(history_as_of(changed_at), changed_at, 'checkpoint')
+    prune_history(changed_at - timedelta(days=HISTORY_RETENTION_DAYS))
+    return path
+
+
+# Part kinds holding every transaction, that as-of reads can start from
+_HISTORY_STARTS = ('baseline', 'checkpoint')
+
+
+def _write_history_part(df, changed_at, kind):
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    path = os.path.join(HISTORY_DIR, f"{changed_at:%Y%m%dT%H%M%S%f}-{kind}.parquet")
+    _write_parquet(df, path + '.tmp')
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def prune_history(cutoff):
+    """
+    Deletes the history parts that as-of reads at or after `cutoff` don't
+    need: everything before the newest baseline or checkpoint at or before
+    it. Returns the number of parts deleted.
+    """
+    parts = _history_parts(cutoff)
+    starts = [i for i, (_, kind, _) in enumerate(parts) if kind in _HISTORY_STARTS]
+    if not starts:
+        return 0
+    for _, _, path in parts[:starts[-1]]:
+        os.remove(path)
+    return starts[-1]
+
+
+def _history_parts(until=None):
+    """
+    Returns [(time, kind, path)] for every history part up to `until`, oldest first.
+    """
+    try:
+        names = sorted(name for name in os.listdir(HISTORY_DIR) if name.endswith('.parquet'))
+    except FileNotFoundError:
+        return []
+    parts = []
+    for name in names:
+        stamp, kind = name[:-len('.parquet')].split('-', 1)
+        changed_at = datetime.strptime(stamp, '%Y%m%dT%H%M%S%f')
+        if until is None or changed_at <= until:
+            parts.append((changed_at, kind, os.path.join(HISTORY_DIR, name)))
+    return parts
+
+
+def read_history(since=None, until=None):
+    """
+    Returns the logged changes with since < ChangedAt <= until (either bound
+    optional), oldest first. Checkpoints aren't changes and are skipped.
+    """
+    parts = [part for part in _history_parts(until)
+             if part[1] != 'checkpoint' and (since is None or part[0] > since)]
+    if not parts:
+        return pd.DataFrame()
+    return pd.concat([_read_parquet(path) for _, _, path in parts], ignore_index=True)
+
+
+def history_as_of(when, event_ids=None):
+    """
+    Rebuilds the transactions as they stood at `when`: the last logged state
+    of each transaction Id up to then, without removed ones. Only the newest
+    baseline or checkpoint at or before `when` and the parts after it are
+    read. Times before the retained history (see prune_history) give an
+    empty DataFrame.
+    """
+    parts = _history_parts(pd.Timestamp(when).to_pydatetime())
+    starts = [i for i, (_, kind, _) in enumerate(parts) if kind in _HISTORY_STARTS]
+    parts = parts[starts[-1]:] if starts else parts
+    if not parts:
+        return pd.DataFrame()
+
+    frames = [_read_parquet(path) for _, _, path in parts]
+    if event_ids is not None:
+        frames = [frame[frame['EventId'].isin(event_ids)] for frame in frames]
+    history = pd.concat(frames, ignore_index=True)
+    latest = history.drop_duplicates(subset='Id', keep='last')
+    return latest[latest['Change'] != 'removed'].reset_index(drop=True)
+
+
+def export_excel(version=None, merged_path=MERGED_EXCEL, sales_path=SALES_EXCEL):
+    """
+    Writes a snapshot out to the legacy Excel files on demand.
+    """
+    merged_df = load_snapshot('merged', version)
+    sales_df = load_snapshot('sales', version)
+
+    merged_df.to_excel(merged_path, index=False)
+    print(f'{merged_path} saved')
+    with pd.ExcelWriter(sales_path) as writer:
+        sales_df.to_excel(writer, sheet_name='Without seating information', index=False)
+    print(f'{sales_path} saved')
+
+
+if __name__ == "__main__":
+    # Export the latest snapshot to Excel
+    export_excel()
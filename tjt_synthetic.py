@@ -0,0 +1,414 @@
+"""
+Synthetic TJT data at a configurable multiple of a real season.
+
+Writes the tjt_mock_server data directory layout (events.json, accounts.json,
+transactions/<EventId>.json, preorders/<EventId>.json) with Events (incl.
+HospitalityPackages and Locations), Guests, HospitalitySaleTransactions (incl.
+TMSessionId seat JSON) and CateringPreorders shaped like the live export.
+
+Scale 1 matches the volumes in merged_events_transactions1.xlsx (one season:
+48 events, ~8.6k transactions, ~6.5k guests); scale 10 / 100 generate 10 / 100
+seasons' worth. Output is deterministic for a given scale and seed.
+
+Usage:
+    python tjt_synthetic.py --scale 10 --out tjt_mock_data/x10
+    python tjt_mock_server.py serve --data tjt_mock_data/x10
+    TJT_BASE_URL=http://127.0.0.1:8765/export_arsenal python tjt_refresher.py --once --full
+"""
+import argparse
+import json
+import math
+import os
+import random
+from datetime import datetime, timedelta
+
+# Per-season volumes in merged_events_transactions1.xlsx
+BASELINE_EVENTS = 48
+BASELINE_TRANSACTIONS = 8598
+BASELINE_GUESTS = 6514
+LATEST_SEASON_START = datetime(2024, 8, 1)
+LATEST_SEASON_ID = 7
+
+# (competition, category, gender, fixtures per season, relative demand)
+SEASON_FIXTURES = [
+    ("Premier League", "Football", "Male", 19, 1.4),
+    ("UEFA Champions League", "Football", "Male", 5, 1.9),
+    ("Carabao Cup", "Football", "Male", 2, 1.4),
+    ("FA Cup", "Football", "Male", 2, 0.7),
+    (None, "Football", "Male", 3, 0.2),                     # Pre-season
+    ("Barclays Women's Super League", "Football AWFC", "Female", 11, 0.4),
+    ("UEFA Women's Champions League", "Football AWFC", "Female", 4, 0.4),
+    (None, "Concert", None, 2, 0.5),
+]
+MEN_OPPONENTS = [
+    "Manchester United", "Newcastle United", "Crystal Palace", "Leicester City", "Brentford", "Fulham",
+    "Chelsea", "West Ham United", "Manchester City", "Aston Villa", "Tottenham Hotspur", "Ipswich Town",
+    "Everton", "Nottingham Forest", "Liverpool", "Southampton", "A.F.C. Bournemouth", "Brighton", "Wolves",
+]
+EUROPEAN_OPPONENTS = [
+    "Paris Saint-Germain", "Real Madrid", "PSV", "Dinamo Zagreb", "AS Monaco", "Shakhtar Donetsk",
+    "Bayer 04 Leverkusen", "Olympique Lyonnais", "Inter", "Atalanta",
+]
+CUP_OPPONENTS = ["Bolton Wanderers", "Preston North End", "Bristol City", "Coventry City", "Sunderland"]
+WOMEN_OPPONENTS = [
+    "Manchester United Women", "Leicester Women", "Liverpool Women", "Tottenham Hotspur Women",
+    "Aston Villa Women", "Brighton Women", "Chelsea Women", "Everton Women", "Manchester City Women",
+    "West Ham United Women", "Crystal Palace Women",
+]
+WOMEN_EUROPEAN_OPPONENTS = [
+    "Olympique Lyonnais Féminin", "Real Madrid Women", "FC Bayern Munich Women", "Juventus Women",
+    "Vålerenga Women",
+]
+CONCERT_DAYS = ["Friday", "Saturday"]
+
+# (PackageId, name, price per seat, seat counts, LocationType, LocationId, LocationName, GLCode, type, demand, event kinds)
+# Event kinds: M = men's match, W = AWFC match, P = pre-season, C = concert
+PACKAGES = [
+    (5, "The Academy", 525.0, (1, 2, 2, 2, 3, 4), "Lounge", 3, "Club Level", "1571-10-35-240", "Ad hoc", 3114, "M"),
+    (43, "Club 1886", 745.0, (1, 2, 2, 2, 4), "Lounge", 9, "Dial Square Gallery", "1560-10-35-240", "Ad hoc", 1028, "M"),
+    (29, "Woolwich Arsenal", 795.0, (2, 2, 4), "Lounge", 3, "Club Level", "1557-10-35-240", "Ad hoc", 747, "M"),
+    (2, "Foundry Legends", 1095.0, (2, 2, 4), "Lounge", 2, "Foundry", "1561-10-35-240", "Ad hoc", 636, "M"),
+    (58, "Woolwich Restaurant", 134.4, (2, 2, 4, 6), "Lounge", 12, "Woolwich Restaurant", None, "Ad hoc", 302, "MW"),
+    (51, "Royal Arsenal", 847.5, (2, 2, 4), "Lounge", 3, "Club Level", "1557-10-35-240", "Ad hoc", 269, "M"),
+    (31, "Women's Super Lounge +", 185.0, (1, 2, 2, 4), "Lounge", 1, "The Avenell Club", None, "Ad hoc", 236, "W"),
+    (47, "Clock End", 105.0, (1, 2, 2, 4), "Lounge", 9, "Dial Square Gallery", None, "Ad hoc", 181, "W"),
+    (32, "Women's Super Lounge", 145.0, (1, 2, 2, 4), "Lounge", 1, "The Avenell Club", None, "Ad hoc", 174, "W"),
+    (57, "The Academy +", 762.5, (2, 2, 4), "Lounge", 3, "Club Level", "1571-10-35-240", "Ad hoc", 167, "M"),
+    (1, "The Avenell", 1295.0, (2, 2, 4), "Lounge", 1, "The Avenell Club", "1569-10-35-240", "Ad hoc", 164, "M"),
+    (39, "Club 1886 - Pre-Season", 145.0, (2, 2, 4), "Lounge", 9, "Dial Square Gallery", "1475-10-20-160", "Ad hoc", 125, "P"),
+    (37, "Diamond Package - Pre-Season", 295.0, (2, 2, 4), "Lounge", 6, "Diamond Club", "1475-10-20-160", "Ad hoc", 121, "P"),
+    (14, "Box Arsenal", 1021.25, (2, 2, 4), "Lounge", 14, "Executive Box 106 Lounge", "1580-10-35-240", "Ad hoc", 116, "M"),
+    (44, "INTERNAL MBM BOX", 0.0, (12, 15), "Suite", 123, "Executive Box 123", None, "Ad hoc", 113, "M"),
+    (26, "N7 Executive Box", 1349.0, (10, 12, 15), "Suite", 107, "Executive Box 107", "1580-10-35-240", "Ad hoc", 104, "M"),
+    (6, "The Heritage", 1595.0, (2, 2, 4), "Lounge", 11, "WM", "1559-10-35-240", "Ad hoc", 94, "M"),
+    (15, "Platinum", 134.4, (2, 2, 4), "Lounge", 12, "Woolwich Restaurant", None, "Seasonal Membership", 93, "M"),
+    (27, "N5 Executive Box", 995.0, (10, 12, 15), "Suite", 104, "Executive Box 104", "1580-10-35-240", "Ad hoc", 87, "M"),
+    (60, "Diamond Concert Package", 595.0, (1, 2, 3, 4), "Lounge", 6, "Diamond Club", "1475-10-20-161", "Ad hoc", 76, "C"),
+    (54, "AWFC Executive Box - Ticket + F&B", 0.0, (12, 15), "Suite", 73, "Executive Box 73 & 74", None, "Ad hoc", 55, "W"),
+    (53, "AWFC Executive Box - Ticket Only", 0.0, (10, 12), "Suite", 137, "Executive Box 137", None, "Ad hoc", 47, "W"),
+    (61, "Executive Box - Concert Package", 495.0, (10, 12, 15), "Suite", 8, "Executive Box 7", "1580-10-20-161", "Ad hoc", 46, "C"),
+    (59, "Gold Concert Package", 515.0, (2, 4, 4), "Lounge", 1, "The Avenell Club", "1475-10-20-161", "Ad hoc", 28, "C"),
+    (3, "Inner Circle Package", 1945.0, (2, 4, 4), "Lounge", 2, "Foundry", "1565-10-35-240", "Ad hoc", 25, "M"),
+    (4, "Hero Experience", 2495.0, (2, 4, 4), "Lounge", 2, "Foundry", "1566-10-35-240", "Ad hoc", 19, "M"),
+    (40, "Executive Box Package - Pre-Season", 250.0, (10, 12), "Suite", 104, "Executive Box 104", "1580-10-20-160", "Ad hoc", 18, "P"),
+    (34, "Signature Experience", 305.0, (2, 4, 4), "Lounge", 14, "Executive Box 106 Lounge", None, "Ad hoc", 16, "M"),
+    (30, "Pitchside Experience", 255.0, (2, 4, 4), "Lounge", 14, "Executive Box 106 Lounge", None, "Ad hoc", 10, "M"),
+]
+
+STAFF_USERS = [
+    "bgardiner", "dcoppin", "dmontague", "jedwards", "Grace", "MunaL", "HayleyA", "ksmith", "tobrien",
+    "rpatel", "lwhite", "jmorgan", "acole", "sbrown", "mkhan",
+]
+DISCOUNT_CODES = [("PLDL", 0.1), ("CL League MemberPLDL 20%", 0.2), ("Corporate 15%", 0.15), ("Loyalty 5%", 0.05)]
+FIRST_NAMES = ["James", "Olivia", "Adam", "Sophie", "Mohammed", "Emily", "Daniel", "Grace", "Ryo", "Chloe",
+               "Thomas", "Amelia", "Lucas", "Hannah", "Samuel", "Isla", "David", "Mia", "Kwame", "Priya"]
+SURNAMES = ["Smith", "Jones", "Keswick", "Williams", "Taylor", "Brown", "Patel", "Nakamura", "Wilson", "Evans",
+            "Walker", "Okafor", "Murphy", "Khan", "Clarke", "Hughes", "Lee", "Wright", "Green", "Hall"]
+# (CountryCode, weight, cities)
+COUNTRIES = [
+    ("GB", 57, ["London", "LONDON", "St Albans", "Brighton", "South Gloucestershire", "Manchester"]),
+    ("US", 19, ["New York", "Los Angeles", "Chicago", "Boston"]),
+    ("AU", 3, ["Sydney", "Melbourne"]), ("JP", 2, ["Tokyo"]), ("CA", 1, ["Toronto"]),
+    ("SG", 1, ["Singapore"]), ("IE", 1, ["Dublin"]), (None, 2, [None]),
+]
+FOOD_MENUS = [("Seasonal Sharing Menu", 65.0), ("Chef's Tasting Menu", 95.0), ("Classic Carvery", 55.0)]
+DRINK_MENUS = [("Premium Drinks Package", 45.0), ("Wine Package", 60.0), ("Soft Drinks Package", 20.0)]
+KIDS_MENUS = [("Kids Menu", 25.0)]
+PREORDER_ITEMS = [("Champagne (bottle)", 95.0), ("Birthday Cake", 40.0), ("Match Programme", 5.0),
+                  ("Signed Shirt", 150.0), ("Cheese Board", 30.0)]
+
+
+def _iso(ts):
+    return ts.isoformat(timespec='milliseconds')
+
+
+def _event_kind(category, competition):
+    if category == "Concert":
+        return "C"
+    if category == "Football AWFC":
+        return "W"
+    return "M" if competition else "P"
+
+
+def _fixture_name(rng, competition, category, index, season_year):
+    if category == "Concert":
+        return f"Stadium Concert Live {season_year + 1} ({CONCERT_DAYS[index % len(CONCERT_DAYS)]})"
+    if category == "Football AWFC":
+        pool = WOMEN_EUROPEAN_OPPONENTS if competition and "Champions" in competition else WOMEN_OPPONENTS
+        return f"Arsenal Women v {pool[index % len(pool)]}"
+    if competition == "Premier League":
+        pool = MEN_OPPONENTS
+    elif competition in ("UEFA Champions League", None):
+        pool = EUROPEAN_OPPONENTS
+    else:
+        pool = CUP_OPPONENTS
+    return f"Arsenal v {pool[(index + rng.randrange(len(pool))) % len(pool)]}"
+
+
+def generate_events(rng, seasons):
+    """
+    Returns [(event, package_rows, demand, season_id, kick_off)] for `seasons`
+    seasons ending with the latest one.
+    """
+    events = []
+    event_id = 1
+    for season in range(seasons):
+        season_id = LATEST_SEASON_ID - (seasons - 1 - season)
+        season_start = LATEST_SEASON_START.replace(year=LATEST_SEASON_START.year - (seasons - 1 - season))
+        fixtures = [(competition, category, gender, demand, index)
+                    for competition, category, gender, count, demand in SEASON_FIXTURES
+                    for index in range(count)]
+        rng.shuffle(fixtures)
+        for number, (competition, category, gender, demand, index) in enumerate(fixtures):
+            kick_off = (season_start + timedelta(days=number * 6 + rng.randrange(3))).replace(
+                hour=rng.choice((12, 15, 17, 20)), minute=rng.choice((0, 30)))
+            kind = _event_kind(category, competition)
+            packages = [package for package in PACKAGES if kind in package[10]]
+            go_live = kick_off - timedelta(days=3)
+            hospitality_packages = [{
+                "PackageId": package_id,
+                "GuestRefNumber": None,
+                "PackageName": name,
+                "Type": package_type,
+                "LocationType": location_type,
+                "Price": price,
+                "Seats": min(seat_counts),
+                "MaxOrderCount": 10,
+                "IncludeFood": location_type == "Lounge",
+                "IncludeBeverage": location_type == "Lounge",
+                "CRCCode": str(900 + package_id),
+                "MaxSaleQuantity": int(weight * demand * 0.2) + 10,
+                "AvailableSeats": "",
+                "Locations": [{"PackageId": package_id, "EventId": event_id, "LocationId": location_id,
+                               "LocationName": location_name, "Type": "Included",
+                               "Capacity": max(seat_counts) if location_type == "Suite" else 0,
+                               "Price": 0.0, "CRCCode": ""}],
+            } for package_id, name, price, seat_counts, location_type, location_id, location_name, _, package_type, weight, _ in packages]
+            event = {
+                "Id": event_id,
+                "Name": _fixture_name(rng, competition, category, index, season_start.year),
+                "StartTime": _iso(kick_off - timedelta(hours=3)),
+                "EndTime": _iso(kick_off + timedelta(hours=5)),
+                "ParLevelName": "Large",
+                "Status": "Active",
+                "Type": "Ad hoc",
+                "GoLiveDate": _iso(go_live),
+                "LastOrdersDate": _iso(go_live),
+                "EventCategory": category,
+                "EventCompetition": competition,
+                "KickOffEventStart": _iso(kick_off),
+                "Gender": gender,
+                "Locations": [location for package in hospitality_packages for location in package["Locations"]],
+                "HospitalityPackages": hospitality_packages,
+                "CRCCode": None,
+                "LastYearRevenue": 0,
+                "Budget": 0,
+            }
+            events.append((event, packages, demand, season_id, kick_off))
+            event_id += 1
+    return events
+
+
+def generate_guests(rng, count):
+    guests = []
+    country_weights = [weight for _, weight, _ in COUNTRIES]
+    for guest_id in range(1, count + 1):
+        first_name = rng.choice(FIRST_NAMES)
+        surname = rng.choice(SURNAMES)
+        country_code, _, cities = rng.choices(COUNTRIES, weights=country_weights)[0]
+        guests.append({
+            "GuestId": guest_id,
+            "FirstName": first_name,
+            "Surname": surname,
+            "Email": f"{first_name}.{surname}{guest_id}@example.com".lower(),
+            "CountryCode": country_code,
+            "PostCode": f"N{rng.randrange(1, 20)} {rng.randrange(1, 9)}AB" if country_code == "GB" else None,
+            "City": rng.choice(cities),
+            "CompanyName": f"{surname} & Co" if rng.random() < 0.15 else None,
+            "DOB": None,
+            "Status": "Active",
+            "IsSeasonal": int(rng.random() < 0.1),
+        })
+    return guests
+
+
+def _seat_session(rng, event_id, package, seats, seat_ids):
+    package_id, name, _, _, _, location_id, location_name = package[:7]
+    area_id = 2000 + location_id
+    row = rng.randrange(1, 30)
+    first_number = rng.randrange(1, 60)
+    return json.dumps({
+        "EventId": 3000 + event_id,
+        "LockSessionId": rng.randrange(10 ** 7, 10 ** 8),
+        "Seats": [{
+            "Id": next(seat_ids),
+            "AreaId": area_id,
+            "AreaName": location_name,
+            "BlockId": 300 + location_id,
+            "BlockName": location_name,
+            "Row": row,
+            "Number": first_number + offset,
+            "PriceBandId": 50 + package_id,
+            "PriceBandName": name,
+            "CrcId": 900 + package_id,
+            "CrcName": name,
+        } for offset in range(seats)],
+    }, separators=(',', ':'))
+
+
+def generate_transactions(rng, event, packages, season_id, kick_off, count, first_id, guest_count, seat_ids):
+    transactions = []
+    weights = [package[9] for package in packages]
+    for transaction_id in range(first_id, first_id + count):
+        package = rng.choices(packages, weights=weights)[0]
+        package_id, name, price, seat_counts, location_type, location_id, location_name, gl_code, package_type = package[:9]
+        seats = rng.choice(seat_counts)
+        gross = price * seats
+        discount, discount_value = None, 0.0
+        if gross and rng.random() < 0.08:
+            discount, rate = rng.choice(DISCOUNT_CODES)
+            discount_value = round(gross * rate, 2)
+        created = kick_off - timedelta(days=rng.expovariate(1 / 40), seconds=rng.randrange(86400))
+        paid = created + timedelta(minutes=rng.randrange(1, 60 * 48))
+        website = rng.random() < 0.67
+        guest_id = rng.randrange(1, guest_count + 1)
+        transactions.append({
+            "Id": transaction_id,
+            "Name": name,
+            "Type": package_type,
+            "PackageId": package_id,
+            "EventId": event["Id"],
+            "GuestId": guest_id,
+            "GuestRefNumber": 4_000_000 + guest_id,
+            "SeasonId": season_id,
+            "LocationType": location_type,
+            "Seats": seats,
+            "Price": round(gross - discount_value, 2),
+            "Discount": discount,
+            "DiscountValue": discount_value,
+            "IsPaid": True,
+            "PaymentExpirationTime": _iso(created + timedelta(days=1)),
+            "IncludeFood": location_type == "Lounge",
+            "IncludeBeverage": location_type == "Lounge",
+            "MinParkPlaces": 0,
+            "MaxParkPlaces": 0,
+            "ReqSeatForParkPlace": 0,
+            "ParkPlacePrice": 0,
+            "AllowChaffeurPass": False,
+            "AllowDropOff": False,
+            "TMSessionId": _seat_session(rng, event["Id"], package, seats, seat_ids) if rng.random() > 0.046 else None,
+            "SuiteTransactionId": transaction_id + 20000 if location_type == "Suite" else None,
+            "CreatedOn": _iso(created),
+            "CreatedBy": f"guest{guest_id}" if website else rng.choice(STAFF_USERS),
+            "IsCancel": False,
+            "CancelTime": None,
+            "TotalPrice": round(gross - discount_value, 2),
+            "GLCode": gl_code,
+            "SaleLocation": "Hospitality website" if website else "Moto sale team",
+            "Discounts": [],
+            "ParkingPlaces": [],
+            "Accessibility": False,
+            "HighChair": False,
+            "AccessibilityComment": None,
+            "PaymentTime": _iso(paid),
+            "Locations": [{"Id": transaction_id + 10000, "PackageId": package_id, "EventId": event["Id"],
+                           "LocationId": location_id, "LocationName": location_name, "Type": "Included",
+                           "Capacity": None, "Price": 0.0, "CRCCode": None}],
+        })
+    return transactions
+
+
+def generate_preorders(rng, event, transactions, guests_by_id):
+    """
+    One CateringPreorder per box (Suite) booking and for ~10% of lounge bookings.
+    """
+    preorders = []
+    for transaction in transactions:
+        if transaction["LocationType"] != "Suite" and rng.random() > 0.1:
+            continue
+        guest = guests_by_id[transaction["GuestId"]]
+        seats = transaction["Seats"]
+        food, food_price = rng.choice(FOOD_MENUS)
+        drink, drink_price = rng.choice(DRINK_MENUS)
+        kids, kids_price = KIDS_MENUS[0]
+        preorders.append({
+            "Id": transaction["Id"],
+            "EventId": event["Id"],
+            "Event": event["Name"],
+            "KickOffEventStart": event["KickOffEventStart"],
+            "Location": transaction["Locations"][0]["LocationName"],
+            "Guest": f"{guest['FirstName']} {guest['Surname']} ({guest['Email']})",
+            "Status": rng.choice(("Submitted", "Submitted", "Confirmed", "Draft")),
+            "FoodMenu": {"Name": food, "Quantity": seats, "Price": food_price},
+            "KidsFoodMenu": {"Name": kids, "Quantity": 1, "Price": kids_price} if rng.random() < 0.2 else None,
+            "DrinkMenu": {"Name": drink, "Quantity": seats, "Price": drink_price},
+            "KidsDrinkMenu": None,
+            "PreOrderItems": [{"ProductName": item, "OrderedAmount": rng.randrange(1, 4), "Price": price}
+                              for item, price in rng.sample(PREORDER_ITEMS, rng.randrange(0, 3))],
+        })
+    return preorders
+
+
+def _write_json(records, *parts):
+    path = os.path.join(*parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(records, f, separators=(',', ':'))
+
+
+def generate(out_dir, scale=1.0, seed=0):
+    """
+    Writes a synthetic data directory at `scale` x one real season.
+    Returns a dict of row counts.
+    """
+    rng = random.Random(seed)
+    seasons = max(1, math.ceil(scale))
+    total_transactions = max(1, round(BASELINE_TRANSACTIONS * scale))
+    guest_count = max(1, round(BASELINE_GUESTS * scale))
+
+    events = generate_events(rng, seasons)
+    if scale < 1:
+        events = events[-max(1, round(BASELINE_EVENTS * scale)):]
+    guests = generate_guests(rng, guest_count)
+    guests_by_id = {guest["GuestId"]: guest for guest in guests}
+
+    # Split transactions across events in proportion to fixture demand (with noise)
+    shares = [demand * rng.uniform(0.6, 1.4) for _, _, demand, _, _ in events]
+    counts = [int(total_transactions * share / sum(shares)) for share in shares]
+    for i in range(total_transactions - sum(counts)):
+        counts[i % len(counts)] += 1
+
+    seat_ids = iter(range(80_000_000, 10 ** 10))
+    next_id = 10_000
+    preorder_count = 0
+    for (event, packages, _, season_id, kick_off), count in zip(events, counts):
+        transactions = generate_transactions(rng, event, packages, season_id, kick_off, count,
+                                             next_id, guest_count, seat_ids)
+        next_id += count
+        preorders = generate_preorders(rng, event, transactions, guests_by_id)
+        preorder_count += len(preorders)
+        _write_json(transactions, out_dir, 'transactions', f"{event['Id']}.json")
+        _write_json(preorders, out_dir, 'preorders', f"{event['Id']}.json")
+
+    _write_json([event for event, _, _, _, _ in events], out_dir, 'events.json')
+    _write_json(guests, out_dir, 'accounts.json')
+
+    counts = {'events': len(events), 'guests': len(guests), 'transactions': sum(counts), 'preorders': preorder_count}
+    print(f"Generated {counts} at {scale}x into {out_dir}")
+    return counts
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Generate synthetic TJT data for tjt_mock_server.py.")
+    arg_parser.add_argument('--scale', type=float, default=1.0,
+                            help="Multiple of one real season's volume, e.g. 1, 10, 100 (default: %(default)s)")
+    arg_parser.add_argument('--out', default=None, help="Output directory (default: tjt_mock_data/x<scale>)")
+    arg_parser.add_argument('--seed', type=int, default=0)
+    args = arg_parser.parse_args(argv)
+
+    out_dir = args.out or os.path.join('tjt_mock_data', f'x{args.scale:g}')
+    generate(out_dir, args.scale, args.seed)
+
+
+if __name__ == "__main__":
+    main()